@@ -14,13 +14,39 @@ This python script can be imported to another script so you can use the API.
 """
 
 import os
+import re
 import sys
+import html
 import json
+import mmap
+import codecs
+import asyncio
+import time
+import errno
+import random
+import shutil
+import hashlib
+import sqlite3
+import tarfile
 import datetime
+import email.utils
+import threading
+import contextlib
+import http.server
+import urllib.parse
+import multiprocessing
+import xml.sax.saxutils
 
 from typing import Any
 from typing import Final
+from typing import Callable
+from typing import Awaitable
+from typing import Iterable
 from typing import Optional
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
 from html.parser import HTMLParser
 
 try:
@@ -38,456 +64,6307 @@ except ImportError:  # tqdm module is optional.
     print("[i] tqdm module in not installed, falling back to old progress bar.")
     TQDM_INSTALLED: Final[bool] = False  # type: ignore
 
+try:
+    import h2  # noqa: F401  # Needed by httpx for HTTP/2 support.
+    HTTP2_INSTALLED: Final[bool] = True
+
+except ImportError:  # h2 module is optional.
+    HTTP2_INSTALLED: Final[bool] = False  # type: ignore
+
+try:
+    import blake3
+    BLAKE3_INSTALLED: Final[bool] = True
+
+except ImportError:  # blake3 module is optional.
+    BLAKE3_INSTALLED: Final[bool] = False  # type: ignore
+
+CHECKSUM_ALGORITHM: Final[str] = "blake3" if BLAKE3_INSTALLED else "sha256"  # Used for new checksums.
+
+try:
+    import fcntl
+    REFLINK_SUPPORTED: Final[bool] = sys.platform.startswith("linux")  # `FICLONE` is Linux-only.
+
+except ImportError:  # fcntl module is not available on Windows.
+    REFLINK_SUPPORTED: Final[bool] = False  # type: ignore
+
+try:
+    from PIL import Image
+    PILLOW_INSTALLED: Final[bool] = True
+
+except ImportError:  # Pillow module is optional. (Only needed for the thumbnail variants)
+    PILLOW_INSTALLED: Final[bool] = False  # type: ignore
+
 
 class HTMLFilter(HTMLParser):
     """
-    Filters out all HTML tags.
+    Filters out all HTML tags. `<br>` tags are converted to new lines.
     """
 
-    text: str = ''
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: list[str] = []  # Joined once at the end instead of concatenating every piece.
+
+    @property
+    def text(self) -> str:
+        return ''.join(self._parts)
+
+    def handle_starttag(self, tag: str, attrs):
+        if tag == "br":
+            self._parts.append('\n')
+
+    def handle_startendtag(self, tag: str, attrs):
+        self.handle_starttag(tag, attrs)
 
     def handle_data(self, data: str):
-        self.text += data
+        self._parts.append(data)
+
+
+_BR_PATTERN: Final[re.Pattern] = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_TAG_PATTERN: Final[re.Pattern] = re.compile(r"<[a-zA-Z/!][^>]*>")
+
+
+def _htmlToText(text: str) -> str:
+    """
+    Convert <text> from HTML to plain text. Same as `HTMLFilter`, but in a single linear pass of each regex.
+
+    :param text: The HTML to convert.
+
+    :returns: The text without the HTML tags.
+    """
+
+    return html.unescape(_TAG_PATTERN.sub('', _BR_PATTERN.sub('\n', text)))
+
+
+# The NFO template. The values are XML-escaped before they are inserted.
+NFO_TEMPLATE: Final[str] = """<?xml version="1.0" encoding="utf-8" standalone="yes"?>
+<episodedetails>
+  <plot>{plot}</plot>
+  <outline />
+  <lockdata>true</lockdata>
+  <title>{title}</title>
+  <imdbid>tt11289784</imdbid>
+  <actor>
+    <name>Mark Fishbach</name>
+    <role>Markiplier</role>
+    <type>Actor</type>
+    <sortorder>0</sortorder>
+  </actor>
+  <actor>
+    <name>Ethan Nestor</name>
+    <role>CrankGameplays</role>
+    <type>Actor</type>
+    <sortorder>1</sortorder>
+  </actor>
+  <episode>{episode}</episode>
+  <season>{season}</season>{aired}
+</episodedetails>"""
+
 
+class _ProgressBar:
+    """
+    A thread-safe progress bar that uses tqdm if it is installed.
+
+    Updates are accumulated and only drawn every <interval> seconds,
+    so writing large amounts of data is not slowed down by the bar.
+    """
 
-class API:
-    def __init__(self, timeout: int = 60):
+    def __init__(self, desc: str, total: int, initial: int = 0, position: Optional[int] = None, interval: float = 0.1):
         """
-        :param timeout: The timeout of the httpx module in seconds.
+        :param desc:     The description of the progress bar.
+        :param total:    The expected size of the file.
+        :param initial:  How many bytes are already downloaded.
+        :param position: The line of the tqdm progress bar when several downloads run at the same time.
+        :param interval: The minimum time (in seconds) between redraws.
         """
 
-        self._cdn = "https://stream.unusann.us"
-        self._endpoint = "https://unusann.us"
+        self.desc = desc
+        self.total = total
+        self.n = initial
+        self.position = position
+        self.interval = interval
+        self._pending = 0  # Bytes not yet shown by the bar.
+        self._last_draw = 0.0
+        self._lock = threading.Lock()
+        self._bar = tqdm(
+            desc = desc,
+            total = total,
+            initial = initial,
+            unit = 'iB',
+            unit_scale = True,
+            unit_divisor = 1024,
+            position = position,
+            leave = position is None
+        ) if TQDM_INSTALLED else None
 
-        self.timeout: int = timeout  # Timeout for httpx
+    def _draw(self) -> None:
+        if self._bar is not None:
+            self._bar.update(self._pending)
 
-    @property
-    def _extensions(self) -> dict[str, str | list[str]]:
-        return {
-            "video": "mp4",
-            "subtitles": "vtt",
-            "thumbnail": ["jpg", "webp"],
-            "nfo": "nfo"
-        }
+        elif self.position is None:  # The old progress bar cannot be shared with other downloads.
+            bar_size = 40  # the bar will take up 40 characters of space
+            percentage = (self.n / self.total) * 100 if self.total else 100
+            bar = f"{'=' * round(percentage / 100 * bar_size)}{' ' * (bar_size - round(percentage / 100 * bar_size))}"
+            sys.stdout.write(f"\r{self.desc} [{bar}] ({round(percentage, 2)}%)")
+            sys.stdout.flush()
 
-    @property
-    def _video_qualities(self) -> tuple[int, ...]:
-        return (2160, 1440, 1080, 720, 480, 360, 240)
+        self._pending = 0
+        self._last_draw = time.monotonic()
 
-    def _download(self, url: str, fname: str, s: Optional[int] = None, e: Optional[int] = None) -> int:
-        """
-        Download <url> with tqdm progress bar.
+    def update(self, size: int) -> None:
+        with self._lock:
+            self.n += size
+            self._pending += size
+            if time.monotonic() - self._last_draw >= self.interval:
+                self._draw()
 
-        :param url:   The URL of the file to be downloaded.
-        :param fname: The filename of the output; Where to write the data to.
-        :param s:     Season number.
-        :param e:     Episode number.
+    def close(self) -> None:
+        with self._lock:
+            self._draw()
 
-        :returns: `0` if download is successful.
-                  `1` if the download is not completed.
-                  `2` if the downloaded file is larger than the expected size.
-                  If there is an unknown httpx error, it will return the httpx object's status code.
-        """
+        if self._bar is not None:
+            self._bar.close()
 
-        with httpx.stream("GET", url, timeout=self.timeout) as resp:
-            total = int(resp.headers.get('content-length', 0))
-            desc = f"Downloading to {fname}..." if (s is None or e is None) else f"Downloading S{s}E{e}..."
+        elif self.position is None:
+            print('\r')
 
-            if resp.status_code != 200:  # Check if response is "OK".
-                return resp.status_code
 
-            if TQDM_INSTALLED:  # Use tqdm module if it is installed.
-                with open(fname, 'wb') as file, tqdm(
-                    desc = desc,
-                    total = total,
-                    unit = 'iB',
-                    unit_scale = True,
-                    unit_divisor = 1024
-                ) as bar:
-                    downloaded_size = 0
-                    for data in resp.iter_bytes(chunk_size=1024):
-                        size = file.write(data)
-                        bar.update(size)
-                        downloaded_size += size
+def _parseSize(value: str) -> int:
+    """
+    Convert a human-readable size to bytes. (e.g., `512K`, `20M`, `1.5G`)
 
-            else:  # Fallback to the old method if tqdm is not installed.
-                with open(fname, 'wb') as file:
-                    downloaded_size = 0
-                    bar_size = 40  # the bar will take up 40 characters of space
-                    percentage = 0  # Percent downloaded
-                    for data in resp.iter_bytes(chunk_size=1024):
-                        size = file.write(data)
-                        downloaded_size += size
-                        percentage = (downloaded_size / total) * 100
-                        bar = f"{'=' * round(percentage / 100 * bar_size)}{' ' * (bar_size - round(percentage / 100 * bar_size))}"
-                        sys.stdout.write(f"\r{desc} [{bar}] ({round(percentage, 2)}%)")
-                        sys.stdout.flush()
+    :param value: The size. Suffixes are powers of 1024.
 
-                    print('\r')
+    :returns: The size in bytes.
+    """
 
-            return 0 if downloaded_size == total else 1
+    units = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+    value = value.strip().upper().removesuffix('B').removesuffix('I')
+    suffix = value[-1] if value and value[-1] in units else ''
+    return int(float(value[:len(value) - len(suffix)]) * units[suffix])
 
-    @staticmethod
-    def _checkValueFormat(value: Optional[int | str], vtype: Optional[str]) -> str:
-        """
-        Check if the value is right, depending on type.
 
-        :param value: The value to check.
-        :param vtype: `s` for season numbers or `e` for episode numbers.
+def _formatSize(size: float) -> str:
+    """
+    Convert bytes to a human-readable size. (The opposite of `_parseSize()`)
 
-        :returns: Processed version of the value.
-        """
+    :param size: The size in bytes.
 
-        if vtype == 's':
-            if len(str(value)) < 2:
-                value = f"0{value}"  # type: ignore
+    :returns: The size. (e.g., `1.5 GiB`)
+    """
 
-        elif vtype == 'e':
-            while len(str(value)) < 3:
-                value = f"0{value}"  # type: ignore
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} {unit}"
 
-        return str(value)
+        size /= 1024
 
-    def getMetadata(self, s: Optional[int | str] = None, e: Optional[int | str] = None, dl_all: bool = False) -> dict[str, Any]:
-        """
-        Get episode <e> of season <s> metadata from <self.endpoint>.
+    return f"{size:.1f} TiB"
 
-        :param s:      Season number (Not needed if `dl_all` is True)
-        :param e:      Episode number (Not needed if `dl_all` is True)
-        :param dl_all: Download all season and episode metadata
 
-        :returns: httpx response object.
-        """
+def _newHasher(algorithm: str = CHECKSUM_ALGORITHM):
+    """
+    Create a new hash object.
 
-        # This downloads the whole page and then parses it, which is not the best way to do it.
-        page: str = httpx.get(self._endpoint, timeout=self.timeout).text
-        data: dict[str, Any] = json.loads(page.partition("<script id=\"__NEXT_DATA__\" type=\"application/json\">")[2].partition("</script>")[0])
-        return data["props"]["pageProps"] if dl_all else data["props"]["pageProps"]["seasons"][int(s)][int(e) - 1]  # type: ignore
+    :param algorithm: `sha256` or `blake3`. (Requires the `blake3` module)
 
-    def getThumbnail(self, s: int, e: int) -> tuple[str, bytes]:
-        """
-        Get thumbnail of season <s> episode <e>.
+    :returns: The hash object.
+    """
 
-        :param s: Season number.
-        :param e: Episode number.
+    if algorithm == "blake3":
+        if not BLAKE3_INSTALLED:
+            raise ValueError("The `blake3` module is needed to check BLAKE3 checksums.")
 
-        :returns: A tuple containing the thumbnail extension and data.
-        """
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
 
-        for thumbnail_ext in self._extensions["thumbnail"]:
-            result = httpx.get(
-                "{0}/thumbnails/{1}/{2}.{3}".format(
-                    self._cdn,
-                    self._checkValueFormat(s, 's'),
-                    self._checkValueFormat(e, 'e'),
-                    thumbnail_ext
-                ),
-                timeout = self.timeout
-            )
+    return hashlib.new(algorithm)
 
-            if result.status_code == 200:
-                return (thumbnail_ext, result.content)
 
-            continue
+def _hashFile(path: str, hasher=None, block_size: int = 16 * 1024 ** 2):
+    """
+    Hash the file at <path> using a memory-mapped read.
 
-        raise ValueError("Unable to download thumbnail.")
+    The file is fed to the hash object in blocks of <block_size> bytes without copying it,
+    and the hash functions release the GIL, so several files can be hashed in parallel threads.
 
-    def getVideoData(self, season: int, episode: int, filepath: str, quality: int = 1080) -> int:
-        """
-        Get the actual video data from the CDN.
+    :param path:       The path of the file.
+    :param hasher:     The hash object to update. [Default: a new `CHECKSUM_ALGORITHM` hash object]
+    :param block_size: How many bytes are hashed at a time.
 
-        :param season:   Season number
-        :param episode:  Episode number
-        :param filepath: Where to store the downloaded video.
-        :param quality:  `1080` for 1080p, (Other options: `2160`, `1440`, `720`, `480`, `360`, `240`)
+    :returns: The hash object.
+    """
 
-        :returns: The error code.
-        """
+    hasher = _newHasher() if hasher is None else hasher
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:  # Empty files cannot be mapped.
+            return hasher
 
-        if quality not in self._video_qualities:
-            raise ValueError("Invalid quality parameter!")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            for start in range(0, len(view), block_size):
+                hasher.update(view[start:start + block_size])
 
-        return self._download(
-            "{0}/{1}/{2}/{3}.{4}".format(
-                self._cdn,
-                self._checkValueFormat(season, 's'),
-                self._checkValueFormat(episode, 'e'),
-                quality,
-                self._extensions['video']
-            ),
-            filepath,
-            season,
-            episode
-        )
+    return hasher
 
-    def getSubtitle(self, s: int, e: int, language: str | None = None, dl_all: bool = False) -> dict[str, bytes]:
+
+class TokenBucket:
+    """
+    A thread-safe token bucket, used to limit the bandwidth and the request rate.
+
+    The rate can be changed at any time, even while downloads are waiting on it.
+    """
+
+    def __init__(self, rate: float = 0, burst: Optional[float] = None):
+        """
+        :param rate:  How many tokens are added per second. (`0` for no limit)
+        :param burst: The maximum number of tokens that can be saved up. [Default: <rate>]
         """
-        Get subtitles of season <s> episode <e>.
 
-        :param s:        Season number.
-        :param e:        Episode number.
-        :param language: The language to download. (Country code like `en` for English)
-        :param dl_all:   Download all available subtitles.
+        self._lock = threading.Lock()
+        self._rate: float = 0
+        self._burst: Optional[float] = burst
+        self._tokens: float = 0
+        self._updated = time.monotonic()
+        self.setRate(rate)
 
-        :returns: A dictionary containing the subtitles in <bytes>. Returns an empty dictionary if no subtitles are found.
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def setRate(self, rate: float) -> None:
         """
+        Change the rate of the bucket.
 
-        if dl_all:
-            episode_metadata = self.getMetadata(s, e)
-            result = {}
-            for tracks in episode_metadata["tracks"]:
-                result[tracks["srclang"]] = httpx.get(
-                    "{0}/subs/{1}/{2}.{3}.{4}".format(
-                        self._cdn,
-                        self._checkValueFormat(s, 's'),
-                        self._checkValueFormat(e, 'e'),
-                        tracks['srclang'],
-                        self._extensions['subtitles']
-                    ),
-                    timeout = self.timeout
-                ).content
+        :param rate: How many tokens are added per second. (`0` for no limit)
+        """
 
-            return result
+        with self._lock:
+            self._refill()
+            self._rate = max(0.0, rate)
+            self._tokens = min(self._tokens, self._capacity)
 
-        else:
-            if language is None:
-                raise ValueError("You need to set `language` if dl_all is False.")
+    @property
+    def _capacity(self) -> float:
+        return self._rate if self._burst is None else self._burst
 
-            r = httpx.get(
-                # <root>/subs/<season>/<episode>.<language>.<extension>
-                "{0}/subs/{1}/{2}.{3}.{4}".format(
-                    self._cdn,
-                    self._checkValueFormat(s, 's'),
-                    self._checkValueFormat(e, 'e'),
-                    language,
-                    self._extensions['subtitles']
-                ),
-                timeout = self.timeout
-            )
-            if r.status_code == 200:
-                return {language: r.content}
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self._rate > 0:
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
 
-            else:
-                return {}
+        self._updated = now
 
-    def genNFO(self, s: int, e: int) -> str:
+    def _reserve(self, amount: float) -> None:
+        with self._lock:
+            if self._rate > 0:
+                self._refill()
+                self._tokens -= amount  # Go into debt; the caller waits until it is paid back.
+
+    def _wait(self) -> float:
+        """
+        :returns: How long to sleep before checking again, or `0` if the debt is paid back.
         """
-        Generate NFO using self.getMetadata().
-        NOTE: This method have hardcoded variables.
 
-        :param s: Season number.
-        :param e: Episode number.
+        with self._lock:
+            if self._rate <= 0:  # The limit has been removed.
+                self._tokens = 0
+                return 0
 
-        :returns: NFO output.
+            self._refill()
+            if self._tokens >= 0:
+                return 0
+
+            return min(-self._tokens / self._rate, 0.25)  # Wake up regularly in case the rate changes.
+
+    def acquire(self, amount: float = 1) -> None:
         """
+        Take <amount> tokens from the bucket, waiting if there are not enough.
 
-        meta: dict[str, Any] = self.getMetadata(s, e)
-        title: str = meta.get("title", "Unus Annus")
+        :param amount: How many tokens to take. (e.g., bytes or requests)
+        """
 
-        # Process the plot.
-        plot: str = meta.get("description", "")
-        plot_parser = HTMLFilter()
-        plot_parser.feed(plot.replace("<br>", '\n'))
-        plot = plot_parser.text
+        if self._rate <= 0:
+            return
 
-        date: str | None = str(meta.get("date", None))
-        if date is not None:
-            date = "\n  <aired>{0}</aired>".format(
-                datetime.datetime.fromtimestamp(
-                    int(date[:-3])  # Remove the last three characters from the integer.
-                ).strftime("%Y-%m-%d")
-            )
+        self._reserve(amount)
+        while (wait := self._wait()) > 0:
+            time.sleep(wait)
 
-        else:
-            date = ""
+    async def acquireAsync(self, amount: float = 1) -> None:
+        """
+        Same as `acquire()`, but waits without blocking the event loop.
 
-        return f"""<?xml version="1.0" encoding="utf-8" standalone="yes"?>
-<episodedetails>
-  <plot>{plot}</plot>
-  <outline />
-  <lockdata>true</lockdata>
-  <title>{title}</title>
-  <imdbid>tt11289784</imdbid>
-  <actor>
-    <name>Mark Fishbach</name>
-    <role>Markiplier</role>
-    <type>Actor</type>
-    <sortorder>0</sortorder>
-  </actor>
-  <actor>
-    <name>Ethan Nestor</name>
-    <role>CrankGameplays</role>
-    <type>Actor</type>
-    <sortorder>1</sortorder>
-  </actor>
-  <episode>{e}</episode>
-  <season>{s}</season>{date}
-</episodedetails>"""
+        :param amount: How many tokens to take. (e.g., bytes or requests)
+        """
 
+        if self._rate <= 0:
+            return
 
-class Main:
-    def __init__(self, season: int, episode: int, quality: int = 1080, metadata_only: bool = False):
-        self.s = season
-        self.e = episode
-        self.quality = quality
-        self.metadata_only = metadata_only
+        self._reserve(amount)
+        while (wait := self._wait()) > 0:
+            await asyncio.sleep(wait)
 
-        self._api = API()
-        self.retries = 3  # Maximum retries
 
-    def main(self) -> int:
-        s = self._api._checkValueFormat(self.s, 's')
-        e = self._api._checkValueFormat(self.e, 'e')
-        filename = f"Unus Annus S{self.s}E{self.e}"
-        sf = f"Season {s}"  # Season folder
-        ef = os.path.join(f"{sf}", f"Unus Annus S{self.s}E{self.e}")  # Episode folder
+# Shared by every API object so the limits apply to the whole process.
+BANDWIDTH_LIMITER: Final[TokenBucket] = TokenBucket()  # Bytes per second
+REQUEST_LIMITER: Final[TokenBucket] = TokenBucket()  # Requests per second
 
-        if "error" in self._api.getMetadata(s, e):
-            print("Episode not found!")
-            return 1
 
-        print("Creating folder...")
-        os.makedirs(ef, exist_ok=True)
+def _watchRateFile(path: str, bucket: TokenBucket, interval: float = 2) -> threading.Thread:
+    """
+    Update the rate of <bucket> whenever the file at <path> changes.
 
-        print("Downloading subtitles...")
-        subs = self._api.getSubtitle(
-            s=self.s,
-            e=self.e,
-            language=None,
-            dl_all=True
-        )
-        print("Downloading thumbnail...")
-        poster = self._api.getThumbnail(
-            s=self.s,
-            e=self.e
-        )
+    The file contains a single rate, like `20M` or `0` for no limit.
 
-        print("Writing thumbnail to file...")
-        with open(os.path.join(ef, f"{filename}-thumb.{poster[0]}"), 'wb') as f:
-            f.write(poster[1])
+    :param path:     The path of the file to watch.
+    :param bucket:   The token bucket to update.
+    :param interval: How often (in seconds) to check the file.
 
-        for lang in subs:
-            print(f"Writing `{lang}` subtitles to file...")
-            with open(os.path.join(ef, f"{filename}.{lang}.{self._api._extensions['subtitles']}"), 'wb') as f:
-                f.write(subs[lang])
+    :returns: The (daemon) thread watching the file.
+    """
 
-        print("Generating NFO...")
-        with open(os.path.join(ef, f"{filename}.{self._api._extensions['nfo']}"), 'wb') as f:
-            f.write(self._api.genNFO(self.s, self.e).encode("utf-8"))
+    def watch() -> None:
+        last_mtime = None
+        while True:
+            try:
+                mtime = os.path.getmtime(path)
+                if mtime != last_mtime:
+                    last_mtime = mtime
+                    with open(path, 'r', encoding="utf-8") as f:
+                        rate = _parseSize(f.read() or '0')
 
-        if os.path.isfile(os.path.join(ef, f"{filename}.{self._api._extensions['video']}")):
-            print("Skipping video because it already exists.")
+                    if rate != bucket.rate:
+                        _print(f"[i] Rate limit changed to {rate} B/s." if rate else "[i] Rate limit removed.")
+                        bucket.setRate(rate)
 
-        else:
-            print("Downloading video... (Might take a long time)")
-            video_dl_retries = 0
-            while True:
-                dlerrcode = self._api.getVideoData(  # Try downloading the file.
-                    season=self.s,
-                    episode=self.e,
-                    filepath=os.path.join(ef, f"{filename}.{self._api._extensions['video']}"),
-                    quality=self.quality
-                )
-                if (dlerrcode != 0) and (video_dl_retries == self.retries):  # If the maximum retries is reached, break.
-                    print("Failed to download video and maximum retries reached.")
-                    break
+            except (OSError, ValueError):
+                pass
 
-                if dlerrcode != 0:  # If the download failed
-                    video_dl_retries += 1
-                    print(f"Video download of S{s}E{e} failed. [Error {dlerrcode}] Retrying... ({video_dl_retries}/{self.retries})")
+            time.sleep(interval)
 
-                    try:  # Remove the incomplete file.
-                        os.remove(os.path.join(ef, f"{filename}.{self._api._extensions['video']}"))
+    thread = threading.Thread(target=watch, name="rate-file-watcher", daemon=True)
+    thread.start()
+    return thread
 
-                    except FileNotFoundError:
-                        pass
 
-                    continue
+DISK_SPACE_MARGIN: Final[int] = 64 * 1024 ** 2  # Always left free, so the sidecars and the manifest can still be written.
 
-                else:  # If the download is successful
-                    if video_dl_retries == 1:
-                        retry_grammar = "retry"
 
-                    else:
-                        retry_grammar = "retries"
+def _freeSpace(path: str) -> int:
+    """
+    :returns: How many bytes can still be written to the disk of <path>, minus `DISK_SPACE_MARGIN`.
+    """
 
-                    print(f"Download successful with {video_dl_retries} {retry_grammar}.")
-                    break
+    return shutil.disk_usage(os.path.dirname(os.path.abspath(path)) or '.').free - DISK_SPACE_MARGIN
 
-        print("Done!")
-        return 0
 
+class DiskBudget:
+    """
+    A thread-safe reservation of disk space, used so concurrent downloads never need more space than there is.
 
-if __name__ == "__main__":
-    def __dl(s, e, q, m):
+    Every download reserves the bytes it still has to write before it starts, and is held
+    until the other downloads have released enough space for it. The bytes a running download
+    has already written are measured from its `.part` files, so they are not counted twice.
+    """
+
+    def __init__(self, limit: Optional[int] = None, path: str = '.', interval: float = 5):
         """
-        A private function to be used below.
+        :param limit:    The maximum number of bytes the running downloads can reserve together. (`None` for no limit)
+                         The free space of the disk is always a limit too.
+        :param path:     A path on the disk the files are downloaded to.
+        :param interval: How often (in seconds) to check the free space again while a download is held.
         """
 
-        print(f"Downloading S{s}E{e}...")
-        return Main(
-            season=s,
-            episode=e,
-            quality=q,
-            metadata_only=m
-        ).main()
+        self.limit = limit
+        self.path = path
+        self.interval = interval
+        self.reserved: int = 0
+        self._reservations: dict[int, tuple[int, dict[str, int]]] = {}  # ID -> size, the files being written -> their size at the start
+        self._next_id = 1
+        self._condition = threading.Condition()
 
-    try:
-        s = int(sys.argv[1])
-        if '-' not in sys.argv[2]:
-            e = int(sys.argv[2])
+    @staticmethod
+    def _allocated(path: str) -> int:
+        """
+        :returns: How many bytes <path> takes on the disk. (`0` if it does not exist)
+        """
 
-        else:
-            e = (int(sys.argv[2].partition('-')[0]), int(sys.argv[2].partition('-')[2]))
-            if e[0] == e[1]:
-                e = e[0]
+        try:
+            stat = os.stat(path)
 
-            elif e[0] > e[1]:
-                i = -1  # Generate a range object with step of -1; Decrement.
+        except OSError:
+            return 0
 
-            else:
-                i = 1
+        blocks = getattr(stat, "st_blocks", None)  # Not available on Windows.
+        return stat.st_size if blocks is None else blocks * 512
 
-    except (IndexError, ValueError):
-        print(f"USAGE: {sys.argv[0]} <season number> <episode number> <optional quality>")
-        print(f"USAGE: {sys.argv[0]} <season number> <episode number range> <optional quality>")
-        print()
-        print("EXAMPLES:")
-        print(f"    {sys.argv[0]} 1 3        # Downloads Season 1 Episode 3")
-        print(f"    {sys.argv[0]} 0 6 720    # Downloads Season 0 Episode 6 in 720p")
-        print(f"    {sys.argv[0]} 1 2-5      # Downloads Season 1 Episodes 2, 3, 4, and 5.")
-        print()
-        print("AVAILABLE QUALITIES:")
-        print('p, '.join(map(str, API()._video_qualities)) + 'p')
-        sys.exit(1)
+    def written(self) -> int:
+        """
+        :returns: How many of the reserved bytes are already written to the disk.
+        """
 
-    try:
-        q = int(sys.argv[3])
+        with self._condition:
+            return sum(
+                min(size, sum(max(0, self._allocated(path) - start) for path, start in paths.items()))
+                for size, paths in self._reservations.values()
+            )
 
-    except IndexError:
-        q = 1080  # Default quality
+    def _fits(self, size: int) -> bool:
+        # The free space already excludes what the running downloads have written,
+        # so only the part of their reservations they have not written yet is subtracted.
+        # The free space is measured every time, so space used or freed by other programs counts too.
+        available = _freeSpace(os.path.join(self.path, '.')) - (self.reserved - self.written())
+        return size <= available and (self.limit is None or self.reserved + size <= self.limit)
 
-    except ValueError:
-        q = 1080  # It is an optional parameter so this might be `--metadata-only` instead of a quality profile.
+    def acquire(self, size: int, paths: Iterable[str] = ()) -> Optional[int]:
+        """
+        Reserve <size> bytes, waiting until the other downloads have released enough space.
 
-    metadata_only = True if "--metadata-only" in sys.argv else False
+        :param size:  How many bytes the download will write.
+        :param paths: The files the download writes the bytes to. (e.g., the `.part` files of the videos)
+                      Without them, the whole reservation is counted as unwritten until it is released.
 
-    if type(e) is int:
-        sys.exit(__dl(s, e, q, metadata_only))
+        :returns: The ID of the reservation, or `None` if it will never fit. (Even with nothing else running)
+        """
 
-    else:
-        ec = 0  # Error code
-        if i == -1:  # type: ignore
-            e_range = range(e[0], (e[1] - 1), i)  # type: ignore
+        with self._condition:
+            while not self._fits(size):
+                if self.reserved == 0:
+                    return None
 
-        else:
-            e_range = range(e[0], (e[1] + 1), i)  # type: ignore
+                self._condition.wait(self.interval)
 
-        print(f"Downloading S{s}E{e[0]}-{e[1]}... ({len(e_range)} episodes)")  # type: ignore
+            reservation = self._next_id
+            self._next_id += 1
+            self._reservations[reservation] = (size, {path: self._allocated(path) for path in paths})  # Resumed files are partly written already.
+            self.reserved += size
+            return reservation
 
-        for current_episode in e_range:
-            print()
-            ec += __dl(s, current_episode, q, metadata_only)
-            pass
+    def release(self, reservation: int) -> None:
+        """
+        Release a reservation made with `acquire()`.
 
-        sys.exit(ec)
+        :param reservation: The ID of the reservation.
+        """
+
+        with self._condition:
+            self.reserved -= self._reservations.pop(reservation)[0]
+            self._condition.notify_all()
+
+
+class Telemetry:
+    """
+    Collects structured events about the requests, downloads, and episodes of a run.
+
+    Every event is written to a JSON-lines log file (if one is opened), and is aggregated
+    into counters and histograms that can be served in the Prometheus text format on a
+    local `/metrics` endpoint. (See `serve()`)
+
+    Events:
+
+    - `request`:  `method`, `url`, `status`, `latency` (seconds until the headers are received), `bytes`
+    - `download`: `url`, `path`, `season`, `episode`, `status` (the exit code of `_download()`), `bytes`,
+                  `duration`, `ttfb` (time to first byte), and `throughput` (bytes per second)
+    - `retry`:    `kind` (`segment` or `video`), `url` or `season`/`episode`, `attempt`, `status`
+    - `episode`:  `season`, `episode`, `quality`, `exit_code`, `duration`, `retries`
+    - `mirror`:   `mirror`, `latency`, `throughput` (bytes per second), `failed` (See `MirrorSet`)
+    """
+
+    _BUCKETS: Final[tuple[float, ...]] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)  # In seconds.
+
+    def __init__(self, log_path: Optional[str] = None):
+        """
+        :param log_path: Append the events to this file. (`None` to only aggregate them)
+        """
+
+        self._lock = threading.Lock()
+        self._log = None
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self._gauges: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}  # Bucket counts, sum, count
+        self._server: Optional[http.server.ThreadingHTTPServer] = None
+
+        if log_path is not None:
+            self.open(log_path)
+
+    def open(self, log_path: str) -> None:
+        """
+        Start appending the events to <log_path>.
+
+        :param log_path: The path of the JSON-lines log file.
+        """
+
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+
+            self._log = open(log_path, 'a', encoding="utf-8", buffering=1)  # Line-buffered, so `tail -f` works.
+
+    def close(self) -> None:
+        """
+        Close the log file and stop the `/metrics` endpoint.
+        """
+
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _count(self, name: str, labels: dict[str, Any], value: float = 1) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name: str, labels: dict[str, Any], value: float) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        histogram = self._histograms.setdefault(key, [0] * (len(self._BUCKETS) + 2))
+        for i, bound in enumerate(self._BUCKETS):
+            if value <= bound:
+                histogram[i] += 1
+
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def _aggregate(self, event: str, fields: dict[str, Any]) -> None:
+        """
+        Update the metrics with an event. <self._lock> must be held.
+        """
+
+        if event == "request":
+            host = urllib.parse.urlsplit(fields["url"]).netloc
+            self._count("tuaa_requests_total", {"method": fields["method"], "host": host, "status": fields["status"]})
+            self._observe("tuaa_request_latency_seconds", {"method": fields["method"], "host": host}, fields["latency"])
+
+        elif event == "download":
+            self._count("tuaa_downloads_total", {"status": fields["status"]})
+            self._count("tuaa_downloaded_bytes_total", {}, fields["bytes"])
+            self._observe("tuaa_download_duration_seconds", {}, fields["duration"])
+            if fields["ttfb"] is not None:
+                self._observe("tuaa_time_to_first_byte_seconds", {}, fields["ttfb"])
+
+            self._gauges[("tuaa_last_download_throughput_bytes_per_second", ())] = fields["throughput"]
+
+        elif event == "retry":
+            self._count("tuaa_retries_total", {"kind": fields["kind"]})
+
+        elif event == "episode":
+            self._count("tuaa_episodes_total", {"exit_code": fields["exit_code"]})
+            self._observe("tuaa_episode_duration_seconds", {}, fields["duration"])
+
+        elif event == "mirror":
+            if fields["failed"]:
+                self._count("tuaa_mirror_failures_total", {"mirror": fields["mirror"]})
+
+            if fields["throughput"] is not None:
+                self._gauges[("tuaa_mirror_throughput_bytes_per_second", (("mirror", fields["mirror"]),))] = fields["throughput"]
+
+    def emit(self, event: str, **fields) -> None:
+        """
+        Record an event.
+
+        :param event:  The type of the event. (See the docstring of the class)
+        :param fields: The data of the event.
+        """
+
+        with self._lock:
+            self._aggregate(event, fields)
+            if self._log is not None:
+                self._log.write(json.dumps({"time": time.time(), "event": event, **fields}) + '\n')
+
+    def render(self) -> str:
+        """
+        :returns: The metrics in the Prometheus text exposition format.
+        """
+
+        def formatLabels(labels: tuple[tuple[str, str], ...], extra: str = '') -> str:
+            pairs = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+            return '{' + ','.join(pairs) + '}' if pairs else ''
+
+        lines: list[str] = []
+        with self._lock:
+            for kind, metrics in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({key[0] for key in metrics}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    lines += [f"{name}{formatLabels(labels)} {value}" for (n, labels), value in metrics.items() if n == name]
+
+            for name in sorted({key[0] for key in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (n, labels), histogram in self._histograms.items():
+                    if n != name:
+                        continue
+
+                    for bound, count in zip(self._BUCKETS + ("+Inf",), histogram[:-2] + histogram[-1:]):
+                        bucket_labels = formatLabels(labels, f'le="{bound}"')
+                        lines.append(f"{name}_bucket{bucket_labels} {count}")
+
+                    lines.append(f"{name}_sum{formatLabels(labels)} {histogram[-2]}")
+                    lines.append(f"{name}_count{formatLabels(labels)} {histogram[-1]}")
+
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> http.server.ThreadingHTTPServer:
+        """
+        Serve the metrics on `http://<host>:<port>/metrics` from a daemon thread.
+
+        :param port: The port to listen on.
+        :param host: The address to listen on. (Only the local machine by default)
+
+        :returns: The HTTP server.
+        """
+
+        telemetry = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = telemetry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # Do not break the progress bars.
+                pass
+
+        self._server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self._server
+
+
+# Shared by every API object so the events of the whole process end up in the same log and metrics.
+TELEMETRY: Final[Telemetry] = Telemetry()
+
+
+class CircuitOpenError(httpx.TransportError):
+    """
+    Raised instead of sending a request to a host that is considered down. (See `RetryPolicy`)
+    """
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are retried, and how long to wait before retrying them.
+
+    - Timeouts, dropped connections, `408`, `425`, `429`, and `5xx` responses are retried using
+      exponential backoff with full jitter, or after the delay in the `Retry-After` header.
+    - Other `4xx` responses (e.g., `404`) are permanent; they are returned immediately.
+    - If a host fails <failure_threshold> times in a row, the circuit breaker opens and requests
+      to it fail immediately with `CircuitOpenError` for <cooldown> seconds. After that, one
+      request is let through; if it succeeds the circuit closes again, otherwise it stays open.
+    """
+
+    RETRYABLE_STATUS_CODES: Final[frozenset[int]] = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+    def __init__(
+        self,
+        retries: int = 3,
+        base_delay: float = 1,
+        max_delay: float = 60,
+        max_retry_after: float = 300,
+        failure_threshold: int = 5,
+        cooldown: float = 60
+    ):
+        """
+        :param retries:           How many times a request is retried before giving up.
+        :param base_delay:        The delay (in seconds) before the first retry. It doubles after every retry.
+        :param max_delay:         The maximum delay (in seconds) between retries.
+        :param max_retry_after:   The maximum delay (in seconds) accepted from a `Retry-After` header.
+        :param failure_threshold: How many failures in a row open the circuit breaker of a host.
+        :param cooldown:          How long (in seconds) the circuit breaker stays open.
+        """
+
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._failures: dict[str, int] = {}  # host -> failures in a row
+        self._open_until: dict[str, float] = {}  # host -> when the circuit breaker can be tried again
+
+    def isRetryable(self, status_code: int) -> bool:
+        return status_code in self.RETRYABLE_STATUS_CODES
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Get how long to wait before retrying.
+
+        :param attempt:     How many times the request has been retried so far.
+        :param retry_after: The value of the `Retry-After` header of the response, if any.
+
+        :returns: The delay in seconds.
+        """
+
+        if retry_after is not None:
+            try:
+                seconds = float(retry_after)
+
+            except ValueError:  # It is an HTTP date instead.
+                try:
+                    seconds = email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time()
+
+                except (TypeError, ValueError):
+                    seconds = None  # type: ignore
+
+            if seconds is not None:
+                return min(max(0, seconds), self.max_retry_after)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))  # Full jitter.
+
+    def isOpen(self, host: str) -> bool:
+        """
+        :returns: `True` if requests to <host> are currently blocked by the circuit breaker.
+        """
+
+        with self._lock:
+            return self._open_until.get(host, 0) > time.monotonic()
+
+    def _checkCircuit(self, host: str) -> None:
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return
+
+            if open_until > time.monotonic():
+                raise CircuitOpenError(f"{host} is not responding; not sending any requests to it for now.")
+
+            # Half-open: let this request through, but open the circuit again at once if it fails.
+            self._failures[host] = self.failure_threshold - 1
+            del self._open_until[host]
+
+    def _recordSuccess(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+
+    def _recordFailure(self, host: str) -> None:
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.failure_threshold:
+                if host not in self._open_until:
+                    _print(f"[W] {host} failed {self._failures[host]} times in a row, pausing requests to it for {self.cooldown} seconds.")
+
+                self._open_until[host] = time.monotonic() + self.cooldown
+
+    def _afterAttempt(self, host: str, attempt: int, resp: Optional[httpx.Response], err: Optional[Exception]) -> Optional[float]:
+        """
+        Record the result of an attempt.
+
+        :returns: How long to wait before retrying, or `None` if the result should be returned (or raised) now.
+        """
+
+        if err is None:
+            if not self.isRetryable(resp.status_code):  # type: ignore
+                self._recordSuccess(host)  # The host is up, even if the file is not there.
+                return None
+
+            if resp.status_code != 429:  # type: ignore  # Rate limiting does not mean that the host is down.
+                self._recordFailure(host)
+
+        else:
+            self._recordFailure(host)
+
+        if attempt >= self.retries:
+            return None
+
+        return self.delay(attempt, None if resp is None else resp.headers.get("retry-after", None))
+
+    def call(
+        self,
+        url: str,
+        send: Callable[[], httpx.Response],
+        on_retry: Optional[Callable[[int, Optional[int], float], None]] = None
+    ) -> httpx.Response:
+        """
+        Send a request, retrying it according to this policy.
+
+        :param url:      The URL of the request. (Used for the circuit breaker)
+        :param send:     A function that sends the request and returns the response.
+        :param on_retry: Called with (attempt, status code or `None`, delay) before every retry.
+
+        :returns: The last response. Exceptions of the last attempt are raised.
+        """
+
+        host = urllib.parse.urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self._checkCircuit(host)
+            resp: Optional[httpx.Response] = None
+            try:
+                resp = send()
+                wait = self._afterAttempt(host, attempt, resp, None)
+
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as err:
+                wait = self._afterAttempt(host, attempt, None, err)
+                if wait is None:
+                    raise
+
+            if wait is None:
+                return resp  # type: ignore
+
+            if resp is not None:
+                resp.close()
+
+            attempt += 1
+            if on_retry is not None:
+                on_retry(attempt, None if resp is None else resp.status_code, wait)
+
+            time.sleep(wait)
+
+    async def callAsync(
+        self,
+        url: str,
+        send: Callable[[], Awaitable[httpx.Response]],
+        on_retry: Optional[Callable[[int, Optional[int], float], None]] = None
+    ) -> httpx.Response:
+        """
+        Same as `call()`, but for async requests.
+        """
+
+        host = urllib.parse.urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self._checkCircuit(host)
+            resp: Optional[httpx.Response] = None
+            try:
+                resp = await send()
+                wait = self._afterAttempt(host, attempt, resp, None)
+
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as err:
+                wait = self._afterAttempt(host, attempt, None, err)
+                if wait is None:
+                    raise
+
+            if wait is None:
+                return resp  # type: ignore
+
+            if resp is not None:
+                await resp.aclose()
+
+            attempt += 1
+            if on_retry is not None:
+                on_retry(attempt, None if resp is None else resp.status_code, wait)
+
+            await asyncio.sleep(wait)
+
+
+# Shared by every API object so the circuit breaker sees the failures of the whole process.
+RETRY_POLICY: Final[RetryPolicy] = RetryPolicy()
+
+
+CATALOG_CACHE_PATH: Final[str] = os.path.join(os.path.expanduser('~'), ".cache", "tuaa", "catalog.json")
+CATALOG_CACHE_TTL: Final[int] = 86400  # Re-validate the cached catalog after a day.
+CDN_URL: Final[str] = "https://stream.unusann.us"  # The videos, subtitles, and thumbnails.
+ENDPOINT_URL: Final[str] = "https://unusann.us"  # The site, with the catalog in its homepage.
+
+
+class MirrorSet:
+    """
+    The CDN and its mirrors, ranked by how fast they are.
+
+    Every URL is built on the first mirror (the canonical one), so the `.part` files, the manifest,
+    and the archives do not depend on where a file came from. `route()` moves a URL to the fastest
+    healthy mirror right before it is requested.
+
+    - The latency (time to the first byte) of every mirror is measured by `probe()`, and its
+      throughput by `probe()` and every finished download. (See `report()`) Both are kept as moving averages.
+    - Mirrors are ranked by how long they would take to send <reference_size> bytes. Mirrors that
+      have not been measured yet keep their order, after the measured ones.
+    - A mirror that fails (`fail()`), or whose circuit breaker is open (See `RetryPolicy`), is
+      skipped for <cooldown> seconds, unless no other mirror is left.
+    - A download that is slower than <slow_ratio> of another mirror for <slow_window> seconds is
+      moved to the other mirror. (See `watch()`)
+    """
+
+    def __init__(
+        self,
+        bases: str | Iterable[str] = CDN_URL,
+        retry_policy: Optional[RetryPolicy] = None,
+        telemetry: Optional[Telemetry] = None,
+        cooldown: float = 60,
+        slow_ratio: float = 0.25,
+        slow_window: float = 5,
+        reference_size: int = 8 * 1024 ** 2,
+        smoothing: float = 0.3
+    ):
+        """
+        :param bases:          The root URL of the CDN, or a list of mirrors of it. (The first one is the canonical one)
+        :param retry_policy:   Whose circuit breakers tell which mirrors are down. [Default: `RETRY_POLICY`]
+        :param telemetry:      Where the `mirror` events are sent. [Default: `TELEMETRY`]
+        :param cooldown:       How long (in seconds) a failed mirror is skipped.
+        :param slow_ratio:     A download is moved to another mirror if it is slower than this share of the other mirror's throughput.
+        :param slow_window:    How long (in seconds) a download has to be slow before it is moved.
+        :param reference_size: The size of a typical file in bytes, used to weigh latency against throughput.
+        :param smoothing:      The weight (0 to 1) of a new measurement in the moving averages.
+        """
+
+        self.bases: list[str] = [base.rstrip('/') for base in ([bases] if isinstance(bases, str) else bases)]
+        if not self.bases:
+            raise ValueError("At least one CDN URL is needed.")
+
+        self.retry_policy: RetryPolicy = RETRY_POLICY if retry_policy is None else retry_policy
+        self.telemetry: Telemetry = TELEMETRY if telemetry is None else telemetry
+        self.cooldown = cooldown
+        self.slow_ratio = slow_ratio
+        self.slow_window = slow_window
+        self.reference_size = reference_size
+        self.smoothing = smoothing
+        self.probed = False  # Set by `API.probeMirrors()`.
+
+        self._lock = threading.Lock()
+        self._latency: dict[str, float] = {}  # base -> seconds
+        self._throughput: dict[str, float] = {}  # base -> bytes per second
+        self._failed_until: dict[str, float] = {}  # base -> when the mirror can be used again
+
+    def __len__(self) -> int:
+        return len(self.bases)
+
+    @property
+    def canonical(self) -> str:
+        return self.bases[0]
+
+    def baseOf(self, url: str) -> Optional[str]:
+        """
+        :returns: The mirror <url> belongs to, or `None` if it is not a URL of the CDN.
+        """
+
+        for base in sorted(self.bases, key=len, reverse=True):  # The longest match, in case a mirror is inside another.
+            if url == base or url.startswith(base + '/'):
+                return base
+
+        return None
+
+    def _isHealthy(self, base: str, now: float) -> bool:
+        return self._failed_until.get(base, 0) <= now and not self.retry_policy.isOpen(urllib.parse.urlsplit(base).netloc)
+
+    def _cost(self, base: str) -> Optional[float]:
+        if base not in self._latency or base not in self._throughput:
+            return None
+
+        return self._latency[base] + self.reference_size / max(1, self._throughput[base])
+
+    def ranked(self, exclude: Iterable[str] = ()) -> list[str]:
+        """
+        :param exclude: The mirrors to leave out. (e.g., the ones a request was already sent to)
+
+        :returns: The mirrors from the best to the worst. The unhealthy ones are last.
+        """
+
+        now = time.monotonic()
+        excluded = set(exclude)
+        with self._lock:
+            def rank(base: str) -> tuple[bool, bool, float, int]:
+                cost = self._cost(base)
+                return (not self._isHealthy(base, now), cost is None, cost or 0, self.bases.index(base))
+
+            return sorted((base for base in self.bases if base not in excluded), key=rank)
+
+    def best(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        :returns: The fastest healthy mirror, or `None` if every mirror is excluded.
+        """
+
+        if len(self.bases) == 1:
+            return None if self.bases[0] in exclude else self.bases[0]
+
+        ranked = self.ranked(exclude)
+        return ranked[0] if ranked else None
+
+    def route(self, url: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Move a URL of the CDN to the best mirror. Other URLs (e.g., of the site) are returned as they are.
+
+        :param url:     A URL built on the canonical mirror.
+        :param exclude: The mirrors to leave out.
+
+        :returns: The URL on the best mirror, or `None` if every mirror is excluded.
+        """
+
+        if len(self.bases) == 1 or not url.startswith(self.canonical + '/'):
+            return None if self.baseOf(url) in exclude else url
+
+        base = self.best(exclude)
+        return None if base is None else base + url[len(self.canonical):]
+
+    def _average(self, values: dict[str, float], base: str, value: float) -> None:
+        values[base] = value if base not in values else values[base] + self.smoothing * (value - values[base])
+
+    def record(self, base: str, latency: Optional[float] = None, throughput: Optional[float] = None) -> None:
+        """
+        Add a measurement of <base> to its moving averages.
+
+        :param base:       The mirror.
+        :param latency:    The time to the first byte in seconds.
+        :param throughput: The download speed in bytes per second.
+        """
+
+        with self._lock:
+            if latency is not None:
+                self._average(self._latency, base, latency)
+
+            if throughput is not None:
+                self._average(self._throughput, base, throughput)
+
+        self.telemetry.emit("mirror", mirror=base, latency=latency, throughput=throughput, failed=False)
+
+    def report(self, url: str, size: int, duration: float) -> None:
+        """
+        Report the speed of a download from <url>. Small files are ignored, because their speed is mostly latency.
+
+        :param url:      The URL the file was downloaded from.
+        :param size:     How many bytes were downloaded.
+        :param duration: How long (in seconds) the body took to download.
+        """
+
+        base = self.baseOf(url)
+        if len(self.bases) > 1 and base is not None and size >= 1024 ** 2 and duration > 0:
+            self.record(base, throughput=size / duration)
+
+    def fail(self, url: str, reason: str = "failed") -> None:
+        """
+        Skip the mirror of <url> for <self.cooldown> seconds.
+
+        :param url:    A URL of the mirror, or the mirror itself.
+        :param reason: Why, for the warning.
+        """
+
+        base = self.baseOf(url)
+        if len(self.bases) == 1 or base is None:
+            return
+
+        with self._lock:
+            failed = self._failed_until.get(base, 0) > time.monotonic()
+            self._failed_until[base] = time.monotonic() + self.cooldown
+
+        if not failed:
+            _print(f"[W] The mirror {base} {reason}, using the other mirrors for {self.cooldown} seconds.")
+            self.telemetry.emit("mirror", mirror=base, latency=None, throughput=None, failed=True)
+
+    def failover(self, url: str, tried: list[str], status: Optional[int] = None) -> bool:
+        """
+        Decide if a failed request should be sent to another mirror.
+
+        :param url:    The URL the request was sent to.
+        :param tried:  The mirrors the request was already sent to. (Updated in place)
+        :param status: The status code of the response, or `None` if there is no response.
+
+        :returns: `True` if the request should be sent again, to the next mirror.
+        """
+
+        if status is not None and status != 404 and status not in RetryPolicy.RETRYABLE_STATUS_CODES:
+            return False
+
+        base = self.baseOf(url)
+        if len(self.bases) == 1 or base is None:
+            return False
+
+        if status != 404:  # A mirror may not have every file, but that does not make it unhealthy.
+            self.fail(base, "stopped responding" if status is None else f"answered with {status}")
+
+        tried.append(base)
+        following = self.best(tried)
+        if following is None:
+            return False
+
+        # The unhealthy mirrors are only a last resort for errors; a missing file is reported as missing.
+        with self._lock:
+            return status != 404 or self._isHealthy(following, time.monotonic())
+
+    def isSlow(self, base: str, speed: float) -> bool:
+        """
+        :returns: `True` if <speed> (in bytes per second) is less than <self.slow_ratio> of another healthy mirror.
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            others = [
+                self._throughput[other]
+                for other in self.bases
+                if other != base and other in self._throughput and self._isHealthy(other, now)
+            ]
+
+        return bool(others) and speed < self.slow_ratio * max(others)
+
+    def watch(self, url: str) -> Optional[Callable[[int], bool]]:
+        """
+        Watch the speed of a download from <url>.
+
+        :returns: A function to call with the size of every chunk. It returns `True` once the download has been
+                  slow (See `isSlow()`) for <self.slow_window> seconds, after marking the mirror as failed.
+                  `None` if there is no other mirror to move to.
+        """
+
+        base = self.baseOf(url)
+        if len(self.bases) == 1 or base is None:
+            return None
+
+        window_start = time.monotonic()
+        received = 0
+
+        def check(size: int) -> bool:
+            nonlocal window_start, received
+            received += size
+            elapsed = time.monotonic() - window_start
+            if elapsed < self.slow_window:
+                return False
+
+            speed = received / elapsed
+            window_start, received = time.monotonic(), 0
+            if not self.isSlow(base, speed):
+                return False
+
+            self.fail(base, f"slowed down to {_formatSize(speed)}/s")
+            return True
+
+        return check
+
+
+class Episode:
+    """
+    The metadata of an episode in the catalog.
+
+    Stored in `__slots__` instead of a dictionary, because the catalog of every episode is kept
+    in memory for as long as the API object lives. Use `asDict()` to get the metadata as a dictionary.
+    """
+
+    __slots__ = ("title", "description", "date", "tracks", "extra")
+    FIELDS: Final[tuple[str, ...]] = ("title", "description", "date", "tracks")
+
+    def __init__(self, metadata: dict[str, Any]):
+        """
+        :param metadata: The episode metadata from the `pageProps` of the homepage.
+        """
+
+        self.title: Optional[str] = metadata.get("title")
+        self.description: Optional[str] = metadata.get("description")
+        self.date: Optional[int] = metadata.get("date")
+        self.tracks: Optional[tuple[dict[str, Any], ...]] = None if metadata.get("tracks") is None else tuple(metadata["tracks"])
+        # Keys that are not used by the downloader are kept too, so `asDict()` returns everything.
+        self.extra: Optional[dict[str, Any]] = {key: value for key, value in metadata.items() if key not in self.FIELDS} or None
+
+    def asDict(self) -> dict[str, Any]:
+        """
+        :returns: The episode metadata as a new dictionary, in the format of the `pageProps`.
+        """
+
+        metadata: dict[str, Any] = {} if self.extra is None else dict(self.extra)
+        for field in ("title", "description", "date"):
+            if getattr(self, field) is not None:
+                metadata[field] = getattr(self, field)
+
+        if self.tracks is not None:
+            metadata["tracks"] = list(self.tracks)
+
+        return metadata
+
+
+class _NextDataScanner:
+    """
+    Extracts the catalog from the `__NEXT_DATA__` script tag while the homepage is being downloaded.
+
+    The page before the script tag is dropped as soon as it is searched, and the JSON is decoded
+    one episode at a time as it arrives, so only the current chunk and the episode records are kept
+    in memory. (The peak memory usage does not grow with the size of the page)
+    """
+
+    START: Final[bytes] = b"<script id=\"__NEXT_DATA__\" type=\"application/json\">"
+
+    def __init__(self):
+        self._buffer = bytearray()  # The end of the page that is searched for the script tag.
+        self._found = False  # If the script tag has been found.
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._text = ''  # The JSON that has been received, but not parsed yet. (From <self._pos>)
+        self._pos = 0
+        self._parser = self._parseRoot()
+        next(self._parser)  # Run until it needs the first chunk.
+
+        self.props: dict[str, Any] = {}  # The `pageProps` without the seasons.
+        self.seasons: list[list[Episode]] = []
+        self.done = False
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Parse the next chunk of the page.
+
+        :param chunk: The next bytes of the page.
+
+        :returns: `True` once the whole catalog is parsed. (The rest of the page is not needed)
+
+        :raises ValueError: If the JSON is not valid.
+        """
+
+        if self.done:
+            return True
+
+        if not self._found:
+            self._buffer += chunk
+            start = self._buffer.find(self.START)
+            if start == -1:  # Keep the end, in case the tag is split between two chunks.
+                del self._buffer[:max(0, len(self._buffer) - len(self.START) + 1)]
+                return False
+
+            chunk = bytes(self._buffer[start + len(self.START):])
+            self._buffer = bytearray()
+            self._found = True
+
+        try:
+            self._parser.send(self._decoder.decode(chunk))
+
+        except StopIteration:
+            self.done = True
+
+        return self.done
+
+    # The parser is a generator that pauses (`yield`) whenever it needs the next chunk.
+
+    def _more(self):
+        text = yield
+        self._text = self._text[self._pos:] + text  # Drop what has been parsed already.
+        self._pos = 0
+
+    def _peek(self):
+        """
+        Skip the whitespace and return the next character.
+        """
+
+        while True:
+            while self._pos < len(self._text) and self._text[self._pos] in " \t\r\n":
+                self._pos += 1
+
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+
+            yield from self._more()
+
+    def _next(self, expected: str):
+        """
+        Consume the next character, which must be one of <expected>.
+        """
+
+        char = yield from self._peek()
+        if char not in expected:
+            raise ValueError(f"Unexpected `{char}` in the catalog, expected one of `{expected}`.")
+
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """
+        Decode the next JSON value.
+        """
+
+        yield from self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._text, self._pos)
+                if end < len(self._text):  # A value is always followed by something, so a number cannot be cut short.
+                    self._pos = end
+                    return value
+
+            except json.JSONDecodeError:  # Incomplete; wait for the rest of it.
+                pass
+
+            yield from self._more()
+
+    def _object(self, member: Callable[[str], Any]):
+        """
+        Parse an object, using <member>(key) to parse the value of every key.
+        """
+
+        yield from self._next('{')
+        if (yield from self._peek()) == '}':
+            self._pos += 1
+            return
+
+        while True:
+            key = yield from self._value()
+            yield from self._next(':')
+            yield from member(key)
+            if (yield from self._next(",}")) == '}':
+                return
+
+    def _array(self, item: Callable[[], Any]):
+        """
+        Parse an array, using <item>() to parse every item.
+        """
+
+        yield from self._next('[')
+        if (yield from self._peek()) == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield from item()
+            if (yield from self._next(",]")) == ']':
+                return
+
+    def _skipValue(self):
+        yield from self._value()
+
+    def _parseRoot(self):
+        # {"props": {"pageProps": {"seasons": [[<episode>, ...], ...], ...}}, ...}
+        yield from self._object(lambda key: self._object(self._parseProps) if key == "props" else self._skipValue())
+
+    def _parseProps(self, key: str):
+        yield from (self._object(self._parsePageProps) if key == "pageProps" else self._skipValue())
+
+    def _parsePageProps(self, key: str):
+        if key == "seasons":
+            yield from self._array(self._parseSeason)
+
+        else:
+            self.props[key] = yield from self._value()
+
+    def _parseSeason(self):
+        self.seasons.append([])
+        yield from self._array(self._parseEpisode)
+
+    def _parseEpisode(self):
+        self.seasons[-1].append(Episode((yield from self._value())))
+
+
+class Catalog:
+    """
+    Keeps the `pageProps` of the Unus Annus Archive homepage in memory and in an on-disk cache file.
+
+    The homepage is only downloaded when the cache is missing or older than <ttl>,
+    and even then it is re-validated using the `ETag`/`Last-Modified` headers first.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        timeout: int = 60,
+        cache_path: Optional[str] = CATALOG_CACHE_PATH,
+        ttl: int = CATALOG_CACHE_TTL,
+        client: Optional[httpx.Client] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        """
+        :param endpoint:     The URL of the Unus Annus Archive homepage.
+        :param timeout:      The timeout of the httpx module in seconds.
+        :param cache_path:   Where to store the cached catalog. (`None` to keep it in memory only)
+        :param ttl:          How long (in seconds) the cached catalog is considered fresh.
+        :param client:       The httpx client to use. (Uses a new connection per request if `None`)
+        :param retry_policy: How failed requests are retried. [Default: `RETRY_POLICY`]
+        """
+
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.client = client
+        self.retry_policy: RetryPolicy = RETRY_POLICY if retry_policy is None else retry_policy
+        self.cache_path = cache_path
+        self.ttl = ttl
+
+        self._props: Optional[dict[str, Any]] = None  # The `pageProps` without the seasons. (`None` until loaded)
+        self._seasons: list[list[Episode]] = []  # [season][episode - 1]
+        self._fetched: float = 0  # When the catalog was last downloaded or re-validated.
+        self._failed: float = 0  # When re-validating the catalog last failed. (The cached copy is used for <ttl> after it)
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None  # Created by `refreshAsync()` inside the event loop.
+
+    def _setPageProps(self, page_props: dict[str, Any]) -> None:
+        self._seasons = [[Episode(episode) for episode in episodes] for episodes in page_props.get("seasons", [])]
+        self._props = {key: value for key, value in page_props.items() if key != "seasons"}
+
+    def _setScanned(self, scanner: _NextDataScanner) -> None:
+        if not scanner.done:
+            raise ValueError("The catalog is not in the homepage.")
+
+        self._seasons = scanner.seasons
+        self._props = scanner.props
+
+    def _buildPageProps(self) -> dict[str, Any]:
+        return {**self._props, "seasons": [[episode.asDict() for episode in episodes] for episodes in self._seasons]}  # type: ignore
+
+    def _load(self) -> bool:
+        """
+        Load the catalog from <self.cache_path>.
+
+        :returns: `True` if the cache file is loaded.
+        """
+
+        if self.cache_path is None:
+            return False
+
+        try:
+            with open(self.cache_path, 'r', encoding="utf-8") as f:
+                cache: dict[str, Any] = json.load(f)
+
+            self._setPageProps(cache["pageProps"])
+
+        except (OSError, ValueError, KeyError):  # The cache is missing or corrupted.
+            return False
+
+        self._fetched = cache.get("fetched", 0)
+        self._etag = cache.get("etag", None)
+        self._last_modified = cache.get("last_modified", None)
+        return True
+
+    def _save(self) -> None:
+        """
+        Write the catalog to <self.cache_path>.
+        """
+
+        if self.cache_path is None:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "fetched": self._fetched,
+                        "etag": self._etag,
+                        "last_modified": self._last_modified,
+                        "pageProps": self._buildPageProps()
+                    },
+                    f
+                )
+
+            os.replace(tmp_path, self.cache_path)  # Do not leave a half-written cache behind.
+
+        except OSError as err:
+            _print(f"[W] Unable to write the catalog cache: {err}")
+
+    def _revalidationHeaders(self, force: bool) -> dict[str, str]:
+        """
+        Build the headers used to re-validate the cached catalog.
+
+        :param force: Ignore the `ETag`/`Last-Modified` of the cached catalog.
+
+        :returns: The request headers.
+        """
+
+        headers: dict[str, str] = {}
+        if not force and self._props is not None:
+            if self._etag is not None:
+                headers["If-None-Match"] = self._etag
+
+            if self._last_modified is not None:
+                headers["If-Modified-Since"] = self._last_modified
+
+        return headers
+
+    @staticmethod
+    def _checkStatus(resp: httpx.Response) -> None:
+        """
+        :raises httpx.HTTPStatusError: If the homepage request neither returned the page nor said that the cached copy is current.
+                                       (e.g., a `503` that was still failing after the retries)
+        """
+
+        if resp.status_code not in (200, 304):
+            raise httpx.HTTPStatusError(f"The site answered with {resp.status_code}.", request=resp.request, response=resp)
+
+    def _useCached(self, err: httpx.HTTPError) -> None:
+        """
+        Keep using the cached catalog after re-validating it failed.
+        The site is not asked again until <self.ttl> has passed, so an outage does not cost every lookup the retries.
+
+        :param err: Why re-validating the catalog failed.
+
+        :raises httpx.HTTPError: <err>, if there is no cached catalog.
+        """
+
+        if self._props is None:
+            raise err
+
+        _print(f"[W] Unable to re-validate the catalog, using the cached copy instead: {err}")
+        self._failed = time.time()
+
+    def _update(self, resp: httpx.Response, scanner: _NextDataScanner) -> None:
+        """
+        Update the catalog using the response of the homepage request.
+
+        :param resp:    The httpx response object.
+        :param scanner: The scanner the body of the response was fed to.
+        """
+
+        if resp.status_code == 304:  # The cached catalog is still up to date.
+            self._fetched = time.time()
+            self._save()
+            return
+
+        resp.raise_for_status()
+        self._setScanned(scanner)
+        self._fetched = time.time()
+        self._etag = resp.headers.get("etag", None)
+        self._last_modified = resp.headers.get("last-modified", None)
+        self._save()
+
+    def _fetch(self, force: bool = False) -> None:
+        """
+        Download the homepage, or re-validate the cached copy of it.
+
+        :param force: Ignore the `ETag`/`Last-Modified` of the cached catalog.
+        """
+
+        client = httpx.Client(timeout=self.timeout) if self.client is None else self.client
+        scanner = _NextDataScanner()
+        try:
+            resp = self.retry_policy.call(
+                self.endpoint,
+                lambda: client.send(
+                    client.build_request("GET", self.endpoint, headers=self._revalidationHeaders(force), timeout=self.timeout),
+                    stream = True
+                )
+            )
+            try:  # The page is searched while it is downloaded, and the download stops after the catalog.
+                if resp.status_code == 200:
+                    for chunk in resp.iter_bytes():
+                        if scanner.feed(chunk):
+                            break
+
+            finally:
+                resp.close()
+
+            self._checkStatus(resp)
+
+        except httpx.HTTPError as err:
+            self._useCached(err)
+            return
+
+        finally:
+            if self.client is None:
+                client.close()
+
+        self._update(resp, scanner)
+
+    def _isFresh(self) -> bool:
+        return self._props is not None and (time.time() - max(self._fetched, self._failed)) < self.ttl
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Make sure that the catalog is loaded and up to date.
+
+        :param force: Download the homepage even if the cached catalog is still fresh.
+        """
+
+        with self._lock:
+            if not force:
+                if self._isFresh():
+                    return
+
+                if self._props is None and self._load() and self._isFresh():
+                    return
+
+            self._fetch(force)
+
+    async def refreshAsync(self, client: httpx.AsyncClient, force: bool = False) -> None:
+        """
+        Same as `refresh()`, but downloads the homepage using an async client.
+
+        :param client: The httpx async client to use.
+        :param force:  Download the homepage even if the cached catalog is still fresh.
+        """
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            if not force:
+                if self._isFresh():
+                    return
+
+                if self._props is None and self._load() and self._isFresh():
+                    return
+
+            scanner = _NextDataScanner()
+            try:
+                resp = await self.retry_policy.callAsync(
+                    self.endpoint,
+                    lambda: client.send(
+                        client.build_request("GET", self.endpoint, headers=self._revalidationHeaders(force), timeout=self.timeout),
+                        stream = True
+                    )
+                )
+                try:
+                    if resp.status_code == 200:
+                        async for chunk in resp.aiter_bytes():
+                            if scanner.feed(chunk):
+                                break
+
+                finally:
+                    await resp.aclose()
+
+                self._checkStatus(resp)
+
+            except httpx.HTTPError as err:
+                self._useCached(err)
+                return
+
+            self._update(resp, scanner)
+
+    @property
+    def pageProps(self) -> dict[str, Any]:
+        """
+        The whole `pageProps`, rebuilt from the episode records. (Use `getEpisode()` for a single episode)
+        """
+
+        self.refresh()
+        return self._buildPageProps()
+
+    def getEpisode(self, s: int | str, e: int | str) -> dict[str, Any]:
+        """
+        Get the metadata of season <s> episode <e>.
+
+        :param s: Season number.
+        :param e: Episode number.
+
+        :returns: The episode metadata, or a dictionary with an `error` key if the episode does not exist.
+        """
+
+        self.refresh()
+        return self._lookup(s, e)
+
+    def _lookup(self, s: int | str, e: int | str) -> dict[str, Any]:
+        episode = self._record(s, e)
+        return {"error": "Episode not found."} if episode is None else episode.asDict()
+
+    def _record(self, s: int | str, e: int | str) -> Optional[Episode]:
+        """
+        :returns: The record of season <s> episode <e>, or `None` if it does not exist.
+        """
+
+        s, e = int(s), int(e)
+        if 0 <= s < len(self._seasons) and 1 <= e <= len(self._seasons[s]):
+            return self._seasons[s][e - 1]
+
+        return None
+
+    def episodes(self, season: Optional[int] = None) -> list[tuple[int, int]]:
+        """
+        List the episodes in the catalog.
+
+        :param season: Only list the episodes of this season. (`None` for every season)
+
+        :returns: A sorted list of (season, episode) pairs.
+        """
+
+        self.refresh()
+        return [
+            (season_number, episode_number)
+            for season_number, episodes in enumerate(self._seasons)
+            if season is None or season_number == season
+            for episode_number in range(1, len(episodes) + 1)
+        ]
+
+
+class _BaseAPI:
+    """
+    The parts of the API that do not depend on the httpx client. (Shared by `API` and `AsyncAPI`)
+    """
+
+    def __init__(
+        self,
+        timeout: int = 60,
+        http2: bool = False,
+        chunk_size: int = 1024 ** 2,
+        bandwidth_limiter: Optional[TokenBucket] = None,
+        request_limiter: Optional[TokenBucket] = None,
+        telemetry: Optional[Telemetry] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cdn: str | Iterable[str] = CDN_URL,
+        endpoint: str = ENDPOINT_URL
+    ):
+        """
+        :param timeout:           The timeout of the httpx module in seconds.
+        :param http2:             Enable HTTP/2. (Requires the `h2` module)
+        :param chunk_size:        The size of the write buffer (in bytes) used when downloading files.
+        :param bandwidth_limiter: Limits the download speed. [Default: `BANDWIDTH_LIMITER`, shared by the whole process]
+        :param request_limiter:   Limits the number of requests per second. [Default: `REQUEST_LIMITER`]
+        :param telemetry:         Where the request and download events are sent. [Default: `TELEMETRY`]
+        :param retry_policy:      How failed requests are retried. [Default: `RETRY_POLICY`]
+        :param cdn:               The root URL of the videos, subtitles, and thumbnails, or a list of mirrors of it. (See `MirrorSet`)
+        :param endpoint:          The root URL of the site.
+        """
+
+        self._endpoint = endpoint.rstrip('/')
+
+        self.timeout: int = timeout  # Timeout for httpx
+        self.chunk_size: int = chunk_size
+
+        if http2 and not HTTP2_INSTALLED:
+            print("[W] HTTP/2 needs the `h2` module (`pip install httpx[http2]`), falling back to HTTP/1.1.")
+            http2 = False
+
+        self.http2: bool = http2
+        self.bandwidth_limiter: TokenBucket = BANDWIDTH_LIMITER if bandwidth_limiter is None else bandwidth_limiter
+        self.request_limiter: TokenBucket = REQUEST_LIMITER if request_limiter is None else request_limiter
+        self.telemetry: Telemetry = TELEMETRY if telemetry is None else telemetry
+        self.retry_policy: RetryPolicy = RETRY_POLICY if retry_policy is None else retry_policy
+
+        # Every URL is built on the first mirror, and moved to the fastest one when it is requested.
+        self.mirrors = MirrorSet(cdn, self.retry_policy, self.telemetry)
+        self._cdn = self.mirrors.canonical
+
+        # (season, episode) -> {quality: size}, filled by `probeRenditions()`.
+        self._renditions: dict[tuple[int, int], dict[int, Optional[int]]] = {}
+        self._renditions_lock = threading.Lock()
+
+    def _retryReporter(self, url: str) -> Callable[[int, Optional[int], float], None]:
+        """
+        :returns: A callback for `RetryPolicy.call()` that reports the retries of <url> to the telemetry.
+        """
+
+        def report(attempt: int, status: Optional[int], delay: float) -> None:
+            self.telemetry.emit("retry", kind="request", url=url, attempt=attempt, status=status, delay=delay)
+
+        return report
+
+    @property
+    def _extensions(self) -> dict[str, str | list[str]]:
+        return {
+            "video": "mp4",
+            "subtitles": "vtt",
+            "thumbnail": ["jpg", "webp"],
+            "nfo": "nfo"
+        }
+
+    @property
+    def _video_qualities(self) -> tuple[int, ...]:
+        return (2160, 1440, 1080, 720, 480, 360, 240)
+
+    def _cachedRenditions(self, s: int, e: int, qualities: Iterable[int], refresh: bool = False) -> tuple[dict[int, Optional[int]], list[int]]:
+        """
+        Look up the probed renditions of season <s> episode <e>.
+
+        :param qualities: The qualities to look up.
+        :param refresh:   Ignore the cache.
+
+        :returns: The cached results, and the qualities that still need to be probed.
+        """
+
+        with self._renditions_lock:
+            cached = {} if refresh else dict(self._renditions.get((int(s), int(e)), {}))
+
+        qualities = list(qualities)
+        return ({q: cached[q] for q in qualities if q in cached}, [q for q in qualities if q not in cached])
+
+    def _recordRendition(self, s: int, e: int, quality: int, resp: httpx.Response) -> Optional[int]:
+        """
+        Cache what the HEAD response of a rendition tells about it.
+
+        :param s:       Season number.
+        :param e:       Episode number.
+        :param quality: The quality of the rendition.
+        :param resp:    The response to the HEAD request.
+
+        :returns: The size of the rendition (`-1` if the server does not tell), or `None` if it is not available.
+        """
+
+        if resp.status_code == 200:
+            size: Optional[int] = int(resp.headers.get("content-length", -1))
+
+        elif 400 <= resp.status_code < 500:
+            size = None
+
+        else:  # Not a definite answer (the retries ran out), so probe it again next time.
+            return None
+
+        with self._renditions_lock:
+            self._renditions.setdefault((int(s), int(e)), {})[quality] = size
+
+        return size
+
+    @staticmethod
+    def _pickQuality(renditions: dict[int, Optional[int]], max_quality: Optional[int] = None, max_size: Optional[int] = None) -> Optional[int]:
+        """
+        Pick the highest available quality within the limits.
+
+        :param renditions:  The result of `probeRenditions()`.
+        :param max_quality: Do not pick a higher quality than this.
+        :param max_size:    Do not pick a rendition bigger than this many bytes. (Renditions of unknown size are skipped)
+
+        :returns: The quality, or `None` if none of them fit.
+        """
+
+        for quality in sorted(renditions, reverse=True):
+            size = renditions[quality]
+            if size is None or (max_quality is not None and quality > max_quality):
+                continue
+
+            if max_size is not None and not 0 <= size <= max_size:
+                continue
+
+            return quality
+
+        return None
+
+    @staticmethod
+    def _loadPartState(state_path: str, url: str) -> Optional[dict[str, Any]]:
+        """
+        Load the state of a partially downloaded file.
+
+        :param state_path: The path of the state file.
+        :param url:        The URL the partial file was downloaded from.
+
+        :returns: The state, or `None` if there is no usable state.
+        """
+
+        try:
+            with open(state_path, 'r', encoding="utf-8") as f:
+                state: dict[str, Any] = json.load(f)
+
+        except (OSError, ValueError):
+            return None
+
+        return state if state.get("url") == url else None
+
+    @staticmethod
+    def _savePartState(state_path: str, state: dict[str, Any]) -> None:
+        with open(state_path, 'w', encoding="utf-8") as f:
+            json.dump(state, f)
+
+    @staticmethod
+    def _preallocate(fd: int, size: int) -> None:
+        """
+        Allocate <size> bytes for the file of <fd> in one go, so it is not fragmented and cannot run out of space halfway.
+        Falls back to a sparse file where `posix_fallocate` is not available. (e.g., Windows or some filesystems)
+
+        :raises OSError: `ENOSPC` if there is not enough free space.
+        """
+
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+                return
+
+            except OSError as err:
+                if err.errno not in (errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+
+        if os.fstat(fd).st_size != size:
+            os.ftruncate(fd, size)
+
+    @staticmethod
+    def _removePartFiles(*paths: str) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _checkValueFormat(value: Optional[int | str], vtype: Optional[str]) -> str:
+        """
+        Check if the value is right, depending on type.
+
+        :param value: The value to check.
+        :param vtype: `s` for season numbers or `e` for episode numbers.
+
+        :returns: Processed version of the value.
+        """
+
+        if vtype == 's':
+            if len(str(value)) < 2:
+                value = f"0{value}"  # type: ignore
+
+        elif vtype == 'e':
+            while len(str(value)) < 3:
+                value = f"0{value}"  # type: ignore
+
+        return str(value)
+
+    def _videoUrl(self, s: int, e: int, quality: int) -> str:
+        # <root>/<season>/<episode>/<quality>.<extension>
+        return "{0}/{1}/{2}/{3}.{4}".format(
+            self._cdn,
+            self._checkValueFormat(s, 's'),
+            self._checkValueFormat(e, 'e'),
+            quality,
+            self._extensions['video']
+        )
+
+    def _subtitleUrl(self, s: int, e: int, language: str) -> str:
+        # <root>/subs/<season>/<episode>.<language>.<extension>
+        return "{0}/subs/{1}/{2}.{3}.{4}".format(
+            self._cdn,
+            self._checkValueFormat(s, 's'),
+            self._checkValueFormat(e, 'e'),
+            language,
+            self._extensions['subtitles']
+        )
+
+    def _thumbnailUrl(self, s: int, e: int, extension: str) -> str:
+        # <root>/thumbnails/<season>/<episode>.<extension>
+        return "{0}/thumbnails/{1}/{2}.{3}".format(
+            self._cdn,
+            self._checkValueFormat(s, 's'),
+            self._checkValueFormat(e, 'e'),
+            extension
+        )
+
+    @staticmethod
+    def _resumeHeaders(state: Optional[dict[str, Any]], part_path: str) -> tuple[int, dict[str, str]]:
+        """
+        Build the headers needed to resume a partially downloaded file.
+
+        :param state:     The state of the partial file. (See `_loadPartState()`)
+        :param part_path: The path of the partial file.
+
+        :returns: The offset to resume from and the request headers.
+        """
+
+        offset = os.path.getsize(part_path) if (state is not None and os.path.isfile(part_path)) else 0
+        return _BaseAPI._rangeHeaders(state, offset)
+
+    @staticmethod
+    def _rangeHeaders(state: Optional[dict[str, Any]], offset: int) -> tuple[int, dict[str, str]]:
+        """
+        Build the headers needed to download a file from <offset>.
+
+        :param state:  The validators (`etag` and `last_modified`) of the part that is already downloaded.
+        :param offset: How many bytes are already downloaded.
+
+        :returns: The offset to resume from (`0` if the file cannot be resumed) and the request headers.
+        """
+
+        if state is None or offset == 0:
+            return (0, {})
+
+        # `If-Range` makes the server send the whole file instead if it has changed since.
+        # Weak ETags cannot be used for this, so use `Last-Modified` for them instead.
+        etag: Optional[str] = state.get("etag")  # type: ignore
+        validator = etag if (etag is not None and not etag.startswith("W/")) else state.get("last_modified")  # type: ignore
+        if validator is None:  # We cannot tell if the file has changed, so start over.
+            return (0, {})
+
+        return (offset, {"Range": f"bytes={offset}-", "If-Range": validator})
+
+    @staticmethod
+    def _newPartState(url: str, resp: httpx.Response) -> dict[str, Any]:
+        """
+        Create the state of a new download from its response.
+
+        :param url:  The URL of the file.
+        :param resp: The httpx response object.
+
+        :returns: The state to save with `_savePartState()`.
+        """
+
+        return {
+            "url": url,
+            "etag": resp.headers.get("etag", None),
+            "last_modified": resp.headers.get("last-modified", None),
+            "total": int(resp.headers.get('content-length', 0))
+        }
+
+    def _startPart(
+        self,
+        url: str,
+        fname: str,
+        resp: httpx.Response,
+        state: Optional[dict[str, Any]],
+        offset: int,
+        segments: int = 1,
+        min_segment_size: int = 0
+    ) -> tuple[Optional[int], int, int, Optional[dict[str, Any]]]:
+        """
+        Check the response to a download of <url> to <fname>, and prepare its `.part` file. (Shared by `API._transfer()` and `AsyncAPI._transfer()`)
+
+        :param resp:             The httpx response object, with the body not read yet.
+        :param state:            The state of the partial file. (See `_loadPartState()`)
+        :param offset:           The offset the download was resumed from. (See `_resumeHeaders()`)
+        :param segments:         Split the file into up to this many segments, if the server supports it.
+        :param min_segment_size: The minimum size of a segment in bytes.
+
+        :returns: The exit code (`None` if the body should be written), the offset to write from,
+                  the size of the file, and the state of the download.
+                  The exit code is `0` if the previous attempt already got everything; the file is in place, but not its checksum.
+        """
+
+        part_path = f"{fname}.part"
+        state_path = f"{fname}.part.json"
+        if resp.status_code == 416 and offset > 0 and offset == state.get("total"):  # type: ignore
+            os.replace(part_path, fname)  # The previous attempt already got everything.
+            self._removePartFiles(state_path)
+            return (0, offset, offset, state)
+
+        if resp.status_code == 206 and offset > 0:  # The server accepted the range.
+            if not resp.headers.get("content-range", '').startswith(f"bytes {offset}-"):
+                self._removePartFiles(part_path, state_path)  # Unexpected range; start over next time.
+                return (1, offset, 0, state)
+
+            total = offset + int(resp.headers.get('content-length', 0))
+
+        elif resp.status_code == 200:  # A new download, or the server ignored the range.
+            offset = 0
+            state = self._newPartState(url, resp)
+            total = state["total"]
+
+            segment_count = min(segments, total // max(1, min_segment_size))
+            if segment_count > 1 and resp.headers.get("accept-ranges", '') == "bytes":
+                segment_size = -(-total // segment_count)  # Round up so the segments cover the whole file.
+                state["segments"] = [
+                    [start, min(start + segment_size, total) - 1, 0]  # [start, end (inclusive), written]
+                    for start in range(0, total, segment_size)
+                ]
+
+            self._savePartState(state_path, state)
+
+        else:  # Check if response is "OK".
+            return (resp.status_code, offset, 0, state)
+
+        if total - offset > _freeSpace(part_path):  # Do not fill the disk halfway through.
+            return (3, offset, total, state)
+
+        return (None, offset, total, state)
+
+    @staticmethod
+    def _checksumPath(fname: str, algorithm: str = CHECKSUM_ALGORITHM) -> str:
+        return f"{fname}.{algorithm}"
+
+    @staticmethod
+    def _writeChecksum(fname: str, digest: str, algorithm: str = CHECKSUM_ALGORITHM) -> None:
+        """
+        Write the checksum of <fname> next to it, in the format of `sha256sum` and `b3sum`.
+
+        :param fname:     The path of the file.
+        :param digest:    The hex digest of the file.
+        :param algorithm: The hash algorithm used.
+        """
+
+        with open(_BaseAPI._checksumPath(fname, algorithm), 'w', encoding="utf-8") as f:
+            f.write(f"{digest}  {os.path.basename(fname)}\n")
+
+    @staticmethod
+    def _readChecksum(fname: str) -> Optional[tuple[str, str]]:
+        """
+        Read the checksum stored next to <fname>.
+
+        :param fname: The path of the file.
+
+        :returns: The hash algorithm and the hex digest, or `None` if there is no checksum.
+        """
+
+        for algorithm in ("blake3", "sha256"):
+            try:
+                with open(_BaseAPI._checksumPath(fname, algorithm), 'r', encoding="utf-8") as f:
+                    return (algorithm, f.read().partition(' ')[0].strip().lower())
+
+            except FileNotFoundError:
+                continue
+
+        return None
+
+    @staticmethod
+    def _renderNFO(meta: dict[str, Any], s: int, e: int) -> str:
+        """
+        Generate NFO from the episode metadata.
+        NOTE: This method have hardcoded variables. (See `NFO_TEMPLATE`)
+
+        :param meta: The episode metadata.
+        :param s:    Season number.
+        :param e:    Episode number.
+
+        :returns: NFO output.
+        """
+
+        date = meta.get("date", None)
+        if date is not None:
+            aired = "\n  <aired>{0}</aired>".format(
+                datetime.datetime.fromtimestamp(
+                    int(date) // 1000  # The date is in milliseconds.
+                ).strftime("%Y-%m-%d")
+            )
+
+        else:
+            aired = ""
+
+        return NFO_TEMPLATE.format(
+            plot = xml.sax.saxutils.escape(_htmlToText(meta.get("description", ""))),
+            title = xml.sax.saxutils.escape(meta.get("title", "Unus Annus")),
+            episode = int(e),
+            season = int(s),
+            aired = aired
+        )
+
+    def _nfoPath(self, s: int, e: int) -> str:
+        """
+        :returns: The path of the NFO of season <s> episode <e>, relative to the library folder.
+        """
+
+        return os.path.join(
+            f"Season {self._checkValueFormat(s, 's')}",
+            f"Unus Annus S{int(s)}E{int(e)}",
+            f"Unus Annus S{int(s)}E{int(e)}.{self._extensions['nfo']}"
+        )
+
+
+class API(_BaseAPI):
+    def __init__(
+        self,
+        timeout: int = 60,
+        catalog_path: Optional[str] = CATALOG_CACHE_PATH,
+        catalog_ttl: int = CATALOG_CACHE_TTL,
+        client: Optional[httpx.Client] = None,
+        http2: bool = False,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30,
+        max_connections_per_host: Optional[int] = None,
+        chunk_size: int = 1024 ** 2,
+        bandwidth_limiter: Optional[TokenBucket] = None,
+        request_limiter: Optional[TokenBucket] = None,
+        telemetry: Optional[Telemetry] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cdn: str | Iterable[str] = CDN_URL,
+        endpoint: str = ENDPOINT_URL
+    ):
+        """
+        :param timeout:                   The timeout of the httpx module in seconds.
+        :param catalog_path:              Where to cache the site catalog. (`None` to keep it in memory only)
+        :param catalog_ttl:               How long (in seconds) the cached catalog is considered fresh.
+        :param client:                    Use an existing httpx client instead of creating one.
+        :param http2:                     Enable HTTP/2. (Requires the `h2` module)
+        :param max_connections:           Maximum number of open connections in the pool.
+        :param max_keepalive_connections: Maximum number of idle connections kept alive in the pool.
+        :param keepalive_expiry:          How long (in seconds) an idle connection is kept alive.
+        :param max_connections_per_host:  Maximum number of concurrent requests to a single host. (`None` for no limit)
+        :param chunk_size:                The size of the write buffer (in bytes) used when downloading files.
+        :param bandwidth_limiter:         Limits the download speed. [Default: `BANDWIDTH_LIMITER`, shared by the whole process]
+        :param request_limiter:           Limits the number of requests per second. [Default: `REQUEST_LIMITER`]
+        :param telemetry:                 Where the request and download events are sent. [Default: `TELEMETRY`]
+        :param retry_policy:              How failed requests are retried. [Default: `RETRY_POLICY`]
+        :param cdn:                       The root URL of the videos, subtitles, and thumbnails, or a list of mirrors of it. (e.g., a LAN cache or a local test server)
+                                          They are probed before the first download, and every request goes to the fastest healthy one. (See `MirrorSet`)
+        :param endpoint:                  The root URL of the site.
+        """
+
+        super().__init__(timeout, http2, chunk_size, bandwidth_limiter, request_limiter, telemetry, retry_policy, cdn, endpoint)
+
+        # One long-lived client is shared by every request so connections are reused.
+        self._owns_client: bool = client is None
+        self.client: httpx.Client = httpx.Client(
+            timeout = timeout,
+            http2 = self.http2,
+            limits = httpx.Limits(
+                max_connections = max_connections,
+                max_keepalive_connections = max_keepalive_connections,
+                keepalive_expiry = keepalive_expiry
+            )
+        ) if client is None else client
+
+        self.catalog = Catalog(self._endpoint, timeout, catalog_path, catalog_ttl, self.client, self.retry_policy)
+
+        self.max_connections_per_host = max_connections_per_host
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+
+    def __enter__(self) -> "API":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the httpx client. (Only if it is created by this object)
+        """
+
+        if self._owns_client:
+            self.client.close()
+
+    @contextlib.contextmanager
+    def _hostSlot(self, url: str):
+        """
+        Wait until a connection to the host of <url> is allowed by <self.max_connections_per_host>.
+
+        :param url: The URL that is going to be requested.
+        """
+
+        if self.max_connections_per_host is None:
+            yield
+            return
+
+        host = urllib.parse.urlsplit(url).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_connections_per_host)
+
+            slot = self._host_slots[host]
+
+        with slot:
+            yield
+
+    def probeMirrors(self, size: int = 1024 ** 2) -> dict[str, Optional[tuple[float, Optional[float]]]]:
+        """
+        Measure the latency and throughput of every mirror of the CDN at the same time, by downloading
+        the first <size> bytes of the same video from each of them. (Done before the first request if there are several mirrors)
+
+        :param size: How many bytes to download from every mirror.
+
+        :returns: Mirror -> (latency in seconds, throughput in bytes per second or `None` if it does not have the video),
+                  or `None` if the mirror did not answer.
+        """
+
+        path = self._videoUrl(1, 1, 360)[len(self._cdn):]  # A small rendition of the first episode, which every mirror should have.
+
+        def probe(base: str) -> Optional[tuple[float, Optional[float]]]:
+            start = time.monotonic()
+            try:
+                with self.client.stream("GET", base + path, headers={"Range": f"bytes=0-{size - 1}"}) as resp:
+                    latency = time.monotonic() - start
+                    if self.retry_policy.isRetryable(resp.status_code):
+                        self.mirrors.fail(base, f"answered with {resp.status_code}")
+                        return None
+
+                    if resp.status_code not in (200, 206):
+                        self.mirrors.record(base, latency)
+                        return (latency, None)
+
+                    received = 0
+                    for data in resp.iter_raw():
+                        received += len(data)
+                        if received >= size:  # The server may have ignored the range.
+                            break
+
+                    elapsed = time.monotonic() - start - latency
+
+            except httpx.TransportError:
+                self.mirrors.fail(base, "is not responding")
+                return None
+
+            throughput = received / elapsed if elapsed > 0 else None
+            self.mirrors.record(base, latency, throughput)
+            return (latency, throughput)
+
+        with ThreadPoolExecutor(max_workers=len(self.mirrors)) as executor:
+            results = dict(zip(self.mirrors.bases, executor.map(probe, self.mirrors.bases)))
+
+        self.mirrors.probed = True
+        return results
+
+    def _route(self, url: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Move a URL of the CDN to the fastest healthy mirror, probing the mirrors first. (See `MirrorSet.route()`)
+        """
+
+        if len(self.mirrors) > 1 and not self.mirrors.probed:
+            with self._probe_lock:
+                if not self.mirrors.probed:
+                    self.probeMirrors()
+
+        return self.mirrors.route(url, exclude)
+
+    def _send(self, url: str, send: Callable[[str], httpx.Response]) -> httpx.Response:
+        """
+        Send a request to the best mirror, moving on to the next one if it fails. (See `MirrorSet.failover()`)
+
+        :param url:  The URL to request.
+        :param send: A function that sends the request to the URL it is given, and returns the response.
+
+        :returns: The httpx response object. Exceptions of the last mirror are raised.
+        """
+
+        tried: list[str] = []
+        while True:
+            routed: str = self._route(url, tried)  # type: ignore  # `failover()` makes sure a mirror is left.
+            try:
+                resp = self.retry_policy.call(routed, lambda: send(routed), self._retryReporter(routed))  # noqa: B023
+
+            except httpx.TransportError:
+                if self.mirrors.failover(routed, tried):
+                    continue
+
+                raise
+
+            if not self.mirrors.failover(routed, tried, resp.status_code):
+                return resp
+
+            resp.close()
+
+    def _get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a GET request using the shared client.
+
+        :param url: The URL to request.
+
+        :returns: The httpx response object.
+        """
+
+        def send(routed: str) -> httpx.Response:
+            self.request_limiter.acquire()
+            start = time.monotonic()
+            with self._hostSlot(routed):
+                resp = self.client.get(routed, **kwargs)
+
+            self.telemetry.emit("request", method="GET", url=routed, status=resp.status_code, latency=time.monotonic() - start, bytes=len(resp.content))
+            return resp
+
+        resp = self._send(url, send)
+        self.bandwidth_limiter.acquire(len(resp.content))
+        return resp
+
+    def _head(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a HEAD request using the shared client.
+
+        :param url: The URL to request.
+
+        :returns: The httpx response object.
+        """
+
+        def send(routed: str) -> httpx.Response:
+            self.request_limiter.acquire()
+            start = time.monotonic()
+            with self._hostSlot(routed):
+                resp = self.client.head(routed, **kwargs)
+
+            self.telemetry.emit("request", method="HEAD", url=routed, status=resp.status_code, latency=time.monotonic() - start, bytes=0)
+            return resp
+
+        return self._send(url, send)
+
+    def _conditionalGet(self, url: str, entry: Optional[dict[str, Any]] = None) -> httpx.Response:
+        """
+        Send a GET request that is answered with `304 Not Modified` if the file has not changed.
+
+        :param url:   The URL to request.
+        :param entry: The manifest entry of the local copy. (See `Manifest.get()`)
+
+        :returns: The httpx response object.
+        """
+
+        headers: dict[str, str] = {}
+        if entry is not None:
+            if entry["etag"] is not None:
+                headers["If-None-Match"] = entry["etag"]
+
+            if entry["last_modified"] is not None:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        return self._get(url, headers=headers)
+
+    @contextlib.contextmanager
+    def _stream(self, method: str, url: str, **kwargs):
+        """
+        Send a streaming request using the shared client.
+
+        :param method: The HTTP method to use.
+        :param url:    The URL to request.
+
+        :returns: A context manager that yields the httpx response object.
+        """
+
+        def send(routed: str) -> httpx.Response:
+            self.request_limiter.acquire()
+            start = time.monotonic()
+            resp = self.client.send(self.client.build_request(method, routed, **kwargs), stream=True)
+            # The body is not read yet, so this is the time to the first byte.
+            self.telemetry.emit("request", method=method, url=routed, status=resp.status_code, latency=time.monotonic() - start, bytes=None)
+            return resp
+
+        # Same as `_send()`, but the slot of the host is kept until the body is read.
+        tried: list[str] = []
+        while True:
+            routed: str = self._route(url, tried)  # type: ignore  # `failover()` makes sure a mirror is left.
+            with self._hostSlot(routed):
+                try:
+                    resp = self.retry_policy.call(routed, lambda: send(routed), self._retryReporter(routed))  # noqa: B023
+
+                except httpx.TransportError:
+                    if self.mirrors.failover(routed, tried):
+                        continue
+
+                    raise
+
+                if self.mirrors.failover(routed, tried, resp.status_code):
+                    resp.close()
+                    continue
+
+                try:
+                    yield resp
+
+                finally:
+                    resp.close()
+
+                return
+
+    @staticmethod
+    def _iterBody(resp: httpx.Response):
+        """
+        Iterate over the body of <resp>.
+
+        If the body is not compressed, the chunks are taken straight from the connection
+        (`iter_raw()`) without re-chunking them, which would copy every byte once more.
+        Files are opened with a <self.chunk_size> buffer instead, so the chunks are
+        gathered in one reused buffer and written to the disk in large blocks.
+
+        :param resp: The httpx response object.
+
+        :returns: An iterator of bytes.
+        """
+
+        if resp.headers.get("content-encoding", "identity") == "identity":
+            return resp.iter_raw()
+
+        return resp.iter_bytes()
+
+    def _writeBody(
+        self,
+        resp: httpx.Response,
+        file,
+        downloaded_size: int,
+        total: int,
+        desc: str,
+        position: Optional[int],
+        hasher=None
+    ) -> int:
+        """
+        Write the body of <resp> to <file> while showing a progress bar.
+
+        :param resp:            The httpx response object.
+        :param file:            The file object to write to.
+        :param downloaded_size: How many bytes of the file are already downloaded.
+        :param total:           The expected size of the whole file.
+        :param desc:            The description of the progress bar.
+        :param position:        The line of the tqdm progress bar when several downloads run at the same time.
+        :param hasher:          If set, this hash object is updated with the body as it is written.
+
+        :returns: The size of the file after writing the body. It is less than <total> if the connection
+                  dropped, or if the mirror slowed down so the rest should come from another one. (See `MirrorSet.watch()`)
+        """
+
+        # A rate limit would look like a slow mirror, so the speed is only measured without one.
+        measure = self.bandwidth_limiter.rate == 0
+        watch = self.mirrors.watch(str(resp.url)) if measure else None
+        initial = downloaded_size
+        start = time.monotonic()
+        bar = _ProgressBar(desc, total, downloaded_size, position)
+        try:
+            for data in self._iterBody(resp):
+                self.bandwidth_limiter.acquire(len(data))
+                if hasher is not None:
+                    hasher.update(data)
+
+                size = file.write(data)
+                bar.update(size)
+                downloaded_size += size
+                if watch is not None and watch(size):
+                    break
+
+        except httpx.TransportError:  # The connection dropped; keep what we have so it can be resumed.
+            pass
+
+        finally:
+            bar.close()
+            if measure:
+                self.mirrors.report(str(resp.url), downloaded_size - initial, time.monotonic() - start)
+
+        return downloaded_size
+
+    @staticmethod
+    def _pwrite(fd: int, data: bytes, offset: int, lock: threading.Lock) -> int:
+        """
+        Write <data> at <offset> of <fd>. Uses `os.pwrite()` if it is available. (It is not on Windows)
+        """
+
+        if hasattr(os, "pwrite"):
+            return os.pwrite(fd, data, offset)
+
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.write(fd, data)
+
+    def _fetchSegment(
+        self,
+        url: str,
+        fd: int,
+        segment: list[int],
+        validator: Optional[str],
+        bar: _ProgressBar,
+        fd_lock: threading.Lock,
+        retries: int
+    ) -> int:
+        """
+        Download one byte range of a segmented download.
+
+        :param url:       The URL of the file.
+        :param fd:        The file descriptor of the preallocated `.part` file.
+        :param segment:   `[start, end, written]` of the segment. (`end` is inclusive) <written> is updated in place.
+        :param validator: The value of the `If-Range` header.
+        :param bar:       The progress bar shared by all segments.
+        :param fd_lock:   Lock used if `os.pwrite()` is not available.
+        :param retries:   How many times to retry the segment before giving up.
+
+        :returns: `0` if the segment is complete, `1` if it is not, `-1` if the file has changed on the server,
+                  or the status code of the response.
+        """
+
+        attempt = 0
+        while True:
+            start, end, written = segment
+            if start + written > end:
+                return 0
+
+            headers = {"Range": f"bytes={start + written}-{end}"}
+            if validator is not None:
+                headers["If-Range"] = validator
+
+            source: Optional[str] = None
+            try:
+                with self._stream("GET", url, headers=headers) as resp:
+                    source = str(resp.url)
+                    if resp.status_code == 200:  # The server sent the whole file; it has changed.
+                        return -1
+
+                    if resp.status_code != 206:
+                        return resp.status_code
+
+                    for data in self._iterBody(resp):
+                        self.bandwidth_limiter.acquire(len(data))
+                        remaining = end + 1 - (start + segment[2])
+                        if len(data) > remaining:  # Never write past the end of the segment.
+                            data = data[:remaining]
+
+                        size = self._pwrite(fd, data, start + segment[2], fd_lock)
+                        segment[2] += size
+                        bar.update(size)
+
+            except CircuitOpenError:  # The CDN is down; retrying the segment would not help.
+                raise
+
+            except httpx.TransportError:
+                if source is not None:  # The connection dropped; retry the segment on another mirror.
+                    self.mirrors.fail(source, "dropped the connection")
+
+            if start + segment[2] > end:
+                return 0
+
+            if attempt == retries:
+                return 1
+
+            attempt += 1  # Only this segment is retried, from where it stopped.
+            self.telemetry.emit("retry", kind="segment", url=url, attempt=attempt, status=None)
+
+    def _downloadSegmented(
+        self,
+        url: str,
+        fname: str,
+        state: dict[str, Any],
+        desc: str,
+        position: Optional[int],
+        segment_retries: int,
+        checksum: bool = False,
+        stats: Optional[dict[str, Any]] = None
+    ) -> int:
+        """
+        Download the missing segments of <state> in parallel into a preallocated `<fname>.part`.
+
+        :param url:             The URL of the file.
+        :param fname:           The filename of the output.
+        :param state:           The state of the download. (See `_download()`)
+        :param desc:            The description of the progress bar.
+        :param position:        The line of the tqdm progress bar when several downloads run at the same time.
+        :param segment_retries: How many times to retry a failed segment.
+        :param checksum:        Write the checksum of the file next to it. (See `_download()`)
+        :param stats:           `bytes` is set to the number of bytes downloaded. (See `_transfer()`)
+
+        :returns: Same as `_download()`.
+        """
+
+        part_path = f"{fname}.part"
+        state_path = f"{fname}.part.json"
+        total: int = state["total"]
+        segments: list[list[int]] = state["segments"]
+        etag: Optional[str] = state.get("etag")
+        validator = etag if (etag is not None and not etag.startswith("W/")) else state.get("last_modified")
+
+        fd = os.open(part_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        try:
+            try:  # Preallocate the file so segments can be written at their offsets.
+                self._preallocate(fd, total)
+
+            except OSError as err:
+                if err.errno != errno.ENOSPC:
+                    raise
+
+                return 3  # The progress is kept, so the download can be resumed once there is room.
+
+            pending = [segment for segment in segments if segment[0] + segment[2] <= segment[1]]
+            initial = sum(segment[2] for segment in segments)
+            bar = _ProgressBar(desc, total, initial, position)
+            fd_lock = threading.Lock()
+            try:
+                with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+                    results = list(executor.map(
+                        lambda segment: self._fetchSegment(url, fd, segment, validator, bar, fd_lock, segment_retries),
+                        pending
+                    ))
+
+            finally:
+                bar.close()
+                self._savePartState(state_path, state)  # Remember the progress of every segment.
+                if stats is not None:
+                    stats["bytes"] = sum(segment[2] for segment in segments) - initial
+
+        finally:
+            os.close(fd)
+
+        if -1 in results:  # The file changed while we were downloading it; start over next time.
+            self._removePartFiles(part_path, state_path)
+            return 1
+
+        for result in results:
+            if result not in (0, 1):
+                return result
+
+        if all(segment[0] + segment[2] > segment[1] for segment in segments):
+            os.replace(part_path, fname)
+            self._removePartFiles(state_path)
+            if checksum:  # The segments arrive out of order, so the file is hashed once it is complete.
+                self._writeChecksum(fname, _hashFile(fname).hexdigest())
+
+            return 0
+
+        return 1
+
+    def _download(
+        self,
+        url: str,
+        fname: str,
+        s: Optional[int] = None,
+        e: Optional[int] = None,
+        position: Optional[int] = None,
+        segments: int = 1,
+        min_segment_size: int = 8 * 1024 ** 2,
+        segment_retries: int = 3,
+        checksum: bool = False,
+        desc: Optional[str] = None,
+        archive: Optional["SeasonArchive"] = None
+    ) -> int:
+        """
+        Download <url> with tqdm progress bar.
+
+        The data is written to `<fname>.part` first, and the validators of the response are
+        saved to `<fname>.part.json`. If the download is interrupted, the next call resumes it
+        using a `Range` request. The file is only renamed to <fname> once it is complete.
+
+        If <segments> is more than 1 and the server supports ranges, the file is split into
+        byte ranges that are downloaded in parallel over separate connections.
+
+        If <checksum> is True, the file is hashed while it is being written, and the checksum
+        is saved to `<fname>.<CHECKSUM_ALGORITHM>` so `verify` can check it later.
+
+        If <archive> is set, the file is streamed into it as the member <fname> instead. (See `_transferToArchive()`)
+
+        :param url:              The URL of the file to be downloaded.
+        :param fname:            The filename of the output; Where to write the data to.
+        :param s:                Season number.
+        :param e:                Episode number.
+        :param position:         The line of the tqdm progress bar when several downloads run at the same time.
+        :param segments:         The maximum number of parallel connections used for the file.
+        :param min_segment_size: The minimum size of a segment in bytes.
+        :param segment_retries:  How many times to retry a failed segment before giving up.
+        :param checksum:         Write the checksum of the file next to it.
+        :param desc:             The description of the progress bar. [Default: `Downloading S<s>E<e>...`]
+        :param archive:          Stream the file into this archive instead of writing it to <fname>.
+
+        :returns: `0` if download is successful.
+                  `1` if the download is not completed.
+                  `2` if the downloaded file is larger than the expected size.
+                  `3` if there is not enough free disk space. (Checked using the `content-length` before downloading)
+                  If there is an unknown httpx error, it will return the httpx object's status code.
+        """
+
+        start = time.monotonic()
+        stats: dict[str, Any] = {"start": start, "ttfb": None, "bytes": 0}
+        if desc is None:
+            desc = f"Downloading to {fname}..." if (s is None or e is None) else f"Downloading S{s}E{e}..."
+
+        tried: list[str] = []
+        downloaded = 0
+        while True:
+            stats["bytes"], stats["source"] = 0, None
+            if archive is None:
+                status = self._transfer(url, fname, desc, position, segments, min_segment_size, segment_retries, checksum, stats)
+
+            else:
+                status = self._transferToArchive(url, archive, fname, desc, position, checksum, stats)
+
+            downloaded += stats["bytes"]
+            # If the connection dropped or the mirror slowed down, resume from where it stopped on the next mirror.
+            if status != 1 or stats["source"] is None or not self.mirrors.failover(stats["source"], tried):
+                break
+
+        stats["bytes"] = downloaded
+        duration = time.monotonic() - start
+        self.telemetry.emit(
+            "download",
+            url = url,
+            path = fname,
+            season = s,
+            episode = e,
+            status = status,
+            bytes = stats["bytes"],
+            duration = duration,
+            ttfb = stats["ttfb"],
+            throughput = stats["bytes"] / duration if duration > 0 else 0
+        )
+        return status
+
+    def _transfer(
+        self,
+        url: str,
+        fname: str,
+        desc: str,
+        position: Optional[int],
+        segments: int,
+        min_segment_size: int,
+        segment_retries: int,
+        checksum: bool,
+        stats: dict[str, Any]
+    ) -> int:
+        """
+        Download <url> to <fname>. (See `_download()`)
+
+        :param stats: Updated with `ttfb` (time to first byte), `bytes` (the number of bytes downloaded),
+                      and `source` (the URL on the mirror, if the file was not split into segments).
+
+        :returns: Same as `_download()`.
+        """
+
+        part_path = f"{fname}.part"
+        state_path = f"{fname}.part.json"
+
+        state = self._loadPartState(state_path, url)
+        if state is not None and "segments" in state and os.path.isfile(part_path):  # Resume a segmented download.
+            return self._downloadSegmented(url, fname, state, desc, position, segment_retries, checksum, stats)
+
+        offset, headers = self._resumeHeaders(state, part_path)
+        with self._stream("GET", url, headers=headers) as resp:
+            stats["ttfb"] = time.monotonic() - stats["start"]
+            stats["source"] = str(resp.url)
+            status, offset, total, state = self._startPart(url, fname, resp, state, offset, segments, min_segment_size)
+            if status is not None:
+                if status == 0 and checksum:
+                    self._writeChecksum(fname, _hashFile(fname).hexdigest())
+
+                return status
+
+            if "segments" not in state:  # type: ignore
+                # When resuming, the part we already have is hashed first so the checksum covers the whole file.
+                hasher = None if not checksum else (_hashFile(part_path) if offset > 0 else _newHasher())
+                try:
+                    with open(part_path, 'ab' if offset > 0 else 'wb', buffering=self.chunk_size) as file:
+                        downloaded_size = self._writeBody(resp, file, offset, total, desc, position, hasher)
+                        stats["bytes"] = downloaded_size - offset
+
+                except OSError as err:  # Another program filled the disk; keep the `.part` file so it can be resumed.
+                    if err.errno != errno.ENOSPC:
+                        raise
+
+                    return 3
+
+        # The segments are requested separately, once this response is closed so its slot of the host is free.
+        if "segments" in state:  # type: ignore
+            return self._downloadSegmented(url, fname, state, desc, position, segment_retries, checksum, stats)  # type: ignore
+
+        if downloaded_size == total:
+            os.replace(part_path, fname)
+            self._removePartFiles(state_path)
+            if hasher is not None:
+                self._writeChecksum(fname, hasher.hexdigest())
+
+            return 0
+
+        if downloaded_size > total:
+            self._removePartFiles(part_path, state_path)
+            return 2
+
+        return 1
+
+    def _transferToArchive(
+        self,
+        url: str,
+        archive: "SeasonArchive",
+        name: str,
+        desc: str,
+        position: Optional[int],
+        checksum: bool,
+        stats: dict[str, Any]
+    ) -> int:
+        """
+        Stream <url> into <archive> as the member <name>, without writing it to the disk first.
+
+        The members of an archive are written one at a time, so this waits for the other downloads
+        into the same archive. If the download is cut short, the next call resumes it using a `Range`
+        request, as long as no other member was added in between. The file is not split into segments,
+        because the data of a member must be written in order.
+
+        :param stats: Updated with `ttfb` (time to first byte), `bytes` (the number of bytes downloaded),
+                      and `source` (the URL on the mirror).
+
+        :returns: Same as `_download()`.
+        """
+
+        with archive.lock:
+            pending = archive.pending(name, url)
+            offset, headers = self._rangeHeaders(pending, 0 if pending is None else pending["written"])
+            if pending is not None and offset == pending["size"]:  # The previous attempt got everything, but was not recorded.
+                hasher = archive.hashCurrent() if checksum else None
+                downloaded_size = total = offset
+
+            else:
+                with self._stream("GET", url, headers=headers) as resp:
+                    stats["ttfb"] = time.monotonic() - stats["start"]
+                    stats["source"] = str(resp.url)
+                    if resp.status_code == 206 and offset > 0:  # The server accepted the range.
+                        total = offset + int(resp.headers.get('content-length', 0))
+                        if not resp.headers.get("content-range", '').startswith(f"bytes {offset}-") or total != pending["size"]:  # type: ignore
+                            archive.discard()  # Unexpected range; start over next time.
+                            return 1
+
+                        archive.resume()
+
+                    elif resp.status_code == 200:  # A new download, or the server ignored the range.
+                        offset = 0
+                        total = int(resp.headers.get('content-length', -1))
+                        if total < 0:  # The size is written in the header of the member, before the data.
+                            return 1
+
+                    else:  # Check if response is "OK".
+                        return resp.status_code
+
+                    if total - offset > _freeSpace(archive.path):  # Do not fill the disk halfway through.
+                        return 3
+
+                    if offset == 0:
+                        archive.begin(
+                            name,
+                            total,
+                            url = url,
+                            etag = resp.headers.get("etag", None),
+                            last_modified = resp.headers.get("last-modified", None)
+                        )
+
+                    # When resuming, the part we already have is hashed first so the checksum covers the whole file.
+                    hasher = None if not checksum else (archive.hashCurrent() if offset > 0 else _newHasher())
+                    try:
+                        downloaded_size = self._writeBody(resp, archive, offset, total, desc, position, hasher)
+                        stats["bytes"] = downloaded_size - offset
+
+                    except OSError as err:  # Another program filled the disk; keep the partial member so it can be resumed.
+                        if err.errno != errno.ENOSPC:
+                            raise
+
+                        return 3
+
+            if downloaded_size == total:
+                archive.commit()
+                if hasher is not None:
+                    archive.addBytes(self._checksumPath(name), f"{hasher.hexdigest()}  {os.path.basename(name)}\n".encode("utf-8"))
+
+                return 0
+
+            if downloaded_size > total:
+                archive.discard()
+                return 2
+
+            return 1
+
+    def getMetadata(self, s: Optional[int | str] = None, e: Optional[int | str] = None, dl_all: bool = False) -> dict[str, Any]:
+        """
+        Get episode <e> of season <s> metadata from <self.endpoint>.
+
+        :param s:      Season number (Not needed if `dl_all` is True)
+        :param e:      Episode number (Not needed if `dl_all` is True)
+        :param dl_all: Download all season and episode metadata
+
+        :returns: The episode metadata, or the whole `pageProps` if `dl_all` is True.
+        """
+
+        # The homepage is only downloaded once; see the `Catalog` class.
+        return self.catalog.pageProps if dl_all else self.catalog.getEpisode(s, e)  # type: ignore
+
+    def getThumbnail(self, s: int, e: int) -> tuple[str, bytes]:
+        """
+        Get thumbnail of season <s> episode <e>.
+
+        :param s: Season number.
+        :param e: Episode number.
+
+        :returns: A tuple containing the thumbnail extension and data.
+        """
+
+        extensions: list[str] = self._extensions["thumbnail"]  # type: ignore
+        with ThreadPoolExecutor(max_workers=len(extensions)) as executor:  # Try every format at the same time.
+            results = list(executor.map(lambda ext: self._get(self._thumbnailUrl(s, e, ext)), extensions))
+
+        for thumbnail_ext, result in zip(extensions, results):  # Prefer the formats in the order they are listed.
+            if result.status_code == 200:
+                return (thumbnail_ext, result.content)
+
+            continue
+
+        raise ValueError("Unable to download thumbnail.")
+
+    def probeRenditions(self, s: int, e: int, qualities: Optional[Iterable[int]] = None, refresh: bool = False) -> dict[int, Optional[int]]:
+        """
+        Find out which qualities of season <s> episode <e> are on the CDN, and how big they are.
+        Every quality is probed with a HEAD request at the same time. The results are cached.
+
+        :param s:         Season number.
+        :param e:         Episode number.
+        :param qualities: The qualities to probe. [Default: all of them]
+        :param refresh:   Probe again instead of using the cached results.
+
+        :returns: A dictionary of quality -> size in bytes (`-1` if the server does not tell), or `None` if it is not available.
+        """
+
+        renditions, missing = self._cachedRenditions(s, e, self._video_qualities if qualities is None else qualities, refresh)
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                responses = list(executor.map(lambda q: self._head(self._videoUrl(s, e, q)), missing))
+
+            for quality, resp in zip(missing, responses):
+                renditions[quality] = self._recordRendition(s, e, quality, resp)
+
+        return renditions
+
+    def bestQuality(self, s: int, e: int, max_quality: Optional[int] = None, max_size: Optional[int] = None) -> Optional[int]:
+        """
+        Get the highest quality of season <s> episode <e> that is available on the CDN.
+
+        :param s:           Season number.
+        :param e:           Episode number.
+        :param max_quality: Do not pick a higher quality than this.
+        :param max_size:    Do not pick a video bigger than this many bytes.
+
+        :returns: The quality, or `None` if no quality is available within the limits.
+        """
+
+        qualities = [q for q in self._video_qualities if max_quality is None or q <= max_quality]
+        return self._pickQuality(self.probeRenditions(s, e, qualities), max_quality, max_size)
+
+    def estimateSize(
+        self,
+        episodes: Iterable[tuple[int, int]],
+        quality: int | str | Iterable[int] = 1080,
+        max_quality: Optional[int] = None,
+        max_size: Optional[int] = None,
+        jobs: int = 16
+    ) -> tuple[int, list[tuple[int, int]]]:
+        """
+        Estimate the size of the videos of <episodes> before downloading them.
+        The episodes are probed <jobs> at a time, and the results are cached so they are not probed again.
+
+        :param episodes:    (season, episode) pairs.
+        :param quality:     The quality (or list of qualities) that will be downloaded, or `best`.
+        :param max_quality: Same as `bestQuality()`. (Only used with `best`)
+        :param max_size:    Same as `bestQuality()`. (Only used with `best`)
+        :param jobs:        How many episodes to probe at the same time.
+
+        :returns: The total size in bytes, and the episodes that are not available (or whose size is unknown).
+        """
+
+        qualities = [] if quality == "best" else [quality] if isinstance(quality, int) else list(quality)  # type: ignore
+
+        def probe(key: tuple[int, int]) -> Optional[int]:
+            if quality == "best":
+                best = self.bestQuality(*key, max_quality, max_size)
+                return None if best is None else self.probeRenditions(*key, [best])[best]
+
+            sizes = list(self.probeRenditions(*key, qualities).values())
+            return None if any(size is None or size < 0 for size in sizes) else sum(sizes)  # type: ignore
+
+        episodes = list(episodes)
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(episodes)))) as executor:
+            sizes = list(executor.map(probe, episodes))
+
+        total = sum(size for size in sizes if size is not None and size >= 0)
+        return (total, [key for key, size in zip(episodes, sizes) if size is None or size < 0])
+
+    def getVideoData(
+        self,
+        season: int,
+        episode: int,
+        filepath: str,
+        quality: int | Iterable[int] = 1080,
+        position: Optional[int] = None,
+        segments: int = 1,
+        min_segment_size: int = 8 * 1024 ** 2,
+        checksum: bool = True,
+        archive: Optional["SeasonArchive"] = None
+    ) -> int | dict[int, int]:
+        """
+        Get the actual video data from the CDN.
+
+        :param season:           Season number
+        :param episode:          Episode number
+        :param filepath:         Where to store the downloaded video. (Must contain `{quality}` if several qualities are given)
+        :param quality:          `1080` for 1080p, (Other options: `2160`, `1440`, `720`, `480`, `360`, `240`)
+                                 or a list of qualities to download at the same time.
+        :param position:         The line of the tqdm progress bar when several downloads run at the same time.
+                                 (The other qualities use the lines after it)
+        :param segments:         Download the video over up to <segments> connections in parallel.
+        :param min_segment_size: The minimum size of a segment in bytes.
+        :param checksum:         Save the checksum of the video next to it. (Checked by `verify`)
+        :param archive:          Stream the video into this archive as <filepath>, instead of writing it to the disk.
+
+        :returns: The error code, or a dictionary of quality -> error code if a list of qualities is given.
+        """
+
+        if not isinstance(quality, int):
+            qualities = list(quality)
+            if not set(qualities).issubset(self._video_qualities) or "{quality}" not in filepath:
+                raise ValueError("Invalid quality parameter!")
+
+            with ThreadPoolExecutor(max_workers=max(1, len(qualities))) as executor:
+                exit_codes = executor.map(
+                    lambda i: self.getVideoData(
+                        season,
+                        episode,
+                        filepath.format(quality=qualities[i]),
+                        qualities[i],
+                        None if position is None else position + i,
+                        segments,
+                        min_segment_size,
+                        checksum,
+                        archive
+                    ),
+                    range(len(qualities))
+                )
+                return dict(zip(qualities, exit_codes))  # type: ignore
+
+        if quality not in self._video_qualities:
+            raise ValueError("Invalid quality parameter!")
+
+        return self._download(
+            self._videoUrl(season, episode, quality),
+            filepath,
+            season,
+            episode,
+            position,
+            segments,
+            min_segment_size,
+            checksum = checksum,
+            desc = f"Downloading S{season}E{episode} ({quality}p)...",
+            archive = archive
+        )
+
+    def getSubtitle(self, s: int, e: int, language: str | None = None, dl_all: bool = False) -> dict[str, bytes]:
+        """
+        Get subtitles of season <s> episode <e>.
+
+        :param s:        Season number.
+        :param e:        Episode number.
+        :param language: The language to download. (Country code like `en` for English)
+        :param dl_all:   Download all available subtitles.
+
+        :returns: A dictionary containing the subtitles in <bytes>. Returns an empty dictionary if no subtitles are found.
+        """
+
+        if dl_all:
+            episode_metadata = self.getMetadata(s, e)
+            languages = [tracks["srclang"] for tracks in episode_metadata["tracks"]]
+            if not languages:
+                return {}
+
+            with ThreadPoolExecutor(max_workers=len(languages)) as executor:  # Download every track at the same time.
+                responses = executor.map(lambda lang: self._get(self._subtitleUrl(s, e, lang)), languages)
+                return {lang: r.content for lang, r in zip(languages, responses)}
+
+        else:
+            if language is None:
+                raise ValueError("You need to set `language` if dl_all is False.")
+
+            r = self._get(self._subtitleUrl(s, e, language))
+            if r.status_code == 200:
+                return {language: r.content}
+
+            else:
+                return {}
+
+    def genNFO(self, s: int, e: int) -> str:
+        """
+        Generate NFO using self.getMetadata().
+
+        :param s: Season number.
+        :param e: Episode number.
+
+        :returns: NFO output.
+        """
+
+        return self._renderNFO(self.getMetadata(s, e), s, e)
+
+    def genSeasonNFOs(self, s: int) -> dict[int, str]:
+        """
+        Generate the NFO of every episode of season <s> from the cached catalog. (No extra requests)
+
+        :param s: Season number.
+
+        :returns: A dictionary of episode number -> NFO output.
+        """
+
+        return {e: self._renderNFO(self.catalog._lookup(s, e), s, e) for _, e in self.catalog.episodes(s)}
+
+    def writeSeasonNFOs(self, s: int, root: str = '.') -> list[str]:
+        """
+        Write the NFO of every episode of season <s> to its episode folder in one pass.
+
+        :param s:    Season number.
+        :param root: The library folder.
+
+        :returns: The paths of the written NFOs.
+        """
+
+        paths: list[str] = []
+        for e, nfo in self.genSeasonNFOs(s).items():
+            path = os.path.join(root, self._nfoPath(s, e))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(nfo.encode("utf-8"))
+
+            paths.append(path)
+
+        return paths
+
+
+class AsyncAPI(_BaseAPI):
+    """
+    Same as `API`, but built on `httpx.AsyncClient` so many requests can run concurrently on one event loop.
+    """
+
+    def __init__(
+        self,
+        timeout: int = 60,
+        catalog_path: Optional[str] = CATALOG_CACHE_PATH,
+        catalog_ttl: int = CATALOG_CACHE_TTL,
+        client: Optional[httpx.AsyncClient] = None,
+        http2: bool = False,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30,
+        chunk_size: int = 1024 ** 2,
+        bandwidth_limiter: Optional[TokenBucket] = None,
+        request_limiter: Optional[TokenBucket] = None,
+        telemetry: Optional[Telemetry] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        cdn: str | Iterable[str] = CDN_URL,
+        endpoint: str = ENDPOINT_URL
+    ):
+        """
+        :param timeout:                   The timeout of the httpx module in seconds.
+        :param catalog_path:              Where to cache the site catalog. (`None` to keep it in memory only)
+        :param catalog_ttl:               How long (in seconds) the cached catalog is considered fresh.
+        :param client:                    Use an existing httpx async client instead of creating one.
+        :param http2:                     Enable HTTP/2. (Requires the `h2` module)
+        :param max_connections:           Maximum number of open connections in the pool.
+        :param max_keepalive_connections: Maximum number of idle connections kept alive in the pool.
+        :param keepalive_expiry:          How long (in seconds) an idle connection is kept alive.
+        :param chunk_size:                The size of the write buffer (in bytes) used when downloading files.
+        :param bandwidth_limiter:         Limits the download speed. [Default: `BANDWIDTH_LIMITER`, shared by the whole process]
+        :param request_limiter:           Limits the number of requests per second. [Default: `REQUEST_LIMITER`]
+        :param telemetry:                 Where the request and download events are sent. [Default: `TELEMETRY`]
+        :param retry_policy:              How failed requests are retried. [Default: `RETRY_POLICY`]
+        :param cdn:                       The root URL of the videos, subtitles, and thumbnails, or a list of mirrors of it. (e.g., a LAN cache or a local test server)
+                                          They are probed before the first download, and every request goes to the fastest healthy one. (See `MirrorSet`)
+        :param endpoint:                  The root URL of the site.
+        """
+
+        super().__init__(timeout, http2, chunk_size, bandwidth_limiter, request_limiter, telemetry, retry_policy, cdn, endpoint)
+
+        self._owns_client: bool = client is None
+        self.client: httpx.AsyncClient = httpx.AsyncClient(
+            timeout = timeout,
+            http2 = self.http2,
+            limits = httpx.Limits(
+                max_connections = max_connections,
+                max_keepalive_connections = max_keepalive_connections,
+                keepalive_expiry = keepalive_expiry
+            )
+        ) if client is None else client
+
+        self.catalog = Catalog(self._endpoint, timeout, catalog_path, catalog_ttl, retry_policy=self.retry_policy)
+        self._probe_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncAPI":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Close the httpx async client. (Only if it is created by this object)
+        """
+
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def probeMirrors(self, size: int = 1024 ** 2) -> dict[str, Optional[tuple[float, Optional[float]]]]:
+        """
+        Same as `API.probeMirrors()`, but the mirrors are probed concurrently on the event loop.
+        """
+
+        path = self._videoUrl(1, 1, 360)[len(self._cdn):]
+
+        async def probe(base: str) -> Optional[tuple[float, Optional[float]]]:
+            start = time.monotonic()
+            try:
+                async with self.client.stream("GET", base + path, headers={"Range": f"bytes=0-{size - 1}"}) as resp:
+                    latency = time.monotonic() - start
+                    if self.retry_policy.isRetryable(resp.status_code):
+                        self.mirrors.fail(base, f"answered with {resp.status_code}")
+                        return None
+
+                    if resp.status_code not in (200, 206):
+                        self.mirrors.record(base, latency)
+                        return (latency, None)
+
+                    received = 0
+                    async for data in resp.aiter_raw():
+                        received += len(data)
+                        if received >= size:  # The server may have ignored the range.
+                            break
+
+                    elapsed = time.monotonic() - start - latency
+
+            except httpx.TransportError:
+                self.mirrors.fail(base, "is not responding")
+                return None
+
+            throughput = received / elapsed if elapsed > 0 else None
+            self.mirrors.record(base, latency, throughput)
+            return (latency, throughput)
+
+        results = dict(zip(self.mirrors.bases, await asyncio.gather(*(probe(base) for base in self.mirrors.bases))))
+        self.mirrors.probed = True
+        return results
+
+    async def _route(self, url: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Same as `API._route()`.
+        """
+
+        if len(self.mirrors) > 1 and not self.mirrors.probed:
+            async with self._probe_lock:
+                if not self.mirrors.probed:
+                    await self.probeMirrors()
+
+        return self.mirrors.route(url, exclude)
+
+    async def _send(self, url: str, send: Callable[[str], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Same as `API._send()`, but <send> is a coroutine function.
+        """
+
+        tried: list[str] = []
+        while True:
+            routed: str = await self._route(url, tried)  # type: ignore  # `failover()` makes sure a mirror is left.
+            try:
+                resp = await self.retry_policy.callAsync(routed, lambda: send(routed), self._retryReporter(routed))  # noqa: B023
+
+            except httpx.TransportError:
+                if self.mirrors.failover(routed, tried):
+                    continue
+
+                raise
+
+            if not self.mirrors.failover(routed, tried, resp.status_code):
+                return resp
+
+            await resp.aclose()
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a GET request using the shared async client.
+
+        :param url: The URL to request.
+
+        :returns: The httpx response object.
+        """
+
+        async def send(routed: str) -> httpx.Response:
+            await self.request_limiter.acquireAsync()
+            start = time.monotonic()
+            resp = await self.client.get(routed, **kwargs)
+            self.telemetry.emit("request", method="GET", url=routed, status=resp.status_code, latency=time.monotonic() - start, bytes=len(resp.content))
+            return resp
+
+        resp = await self._send(url, send)
+        await self.bandwidth_limiter.acquireAsync(len(resp.content))
+        return resp
+
+    async def _head(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a HEAD request using the shared async client.
+
+        :param url: The URL to request.
+
+        :returns: The httpx response object.
+        """
+
+        async def send(routed: str) -> httpx.Response:
+            await self.request_limiter.acquireAsync()
+            start = time.monotonic()
+            resp = await self.client.head(routed, **kwargs)
+            self.telemetry.emit("request", method="HEAD", url=routed, status=resp.status_code, latency=time.monotonic() - start, bytes=0)
+            return resp
+
+        return await self._send(url, send)
+
+    async def _download(
+        self,
+        url: str,
+        fname: str,
+        s: Optional[int] = None,
+        e: Optional[int] = None,
+        position: Optional[int] = None,
+        checksum: bool = False
+    ) -> int:
+        """
+        Download <url> with tqdm progress bar. Works the same way as `API._download()`.
+
+        If the task is cancelled or times out, the partial file is kept so it can be resumed.
+
+        :param url:      The URL of the file to be downloaded.
+        :param fname:    The filename of the output; Where to write the data to.
+        :param s:        Season number.
+        :param e:        Episode number.
+        :param position: The line of the tqdm progress bar when several downloads run at the same time.
+        :param checksum: Write the checksum of the file next to it.
+
+        :returns: Same as `API._download()`.
+        """
+
+        start = time.monotonic()
+        stats: dict[str, Any] = {"start": start, "ttfb": None, "bytes": 0}
+        desc = f"Downloading to {fname}..." if (s is None or e is None) else f"Downloading S{s}E{e}..."
+
+        tried: list[str] = []
+        downloaded = 0
+        while True:
+            stats["bytes"], stats["source"] = 0, None
+            status = await self._transfer(url, fname, desc, position, checksum, stats)
+            downloaded += stats["bytes"]
+            # If the connection dropped or the mirror slowed down, resume from where it stopped on the next mirror.
+            if status != 1 or stats["source"] is None or not self.mirrors.failover(stats["source"], tried):
+                break
+
+        stats["bytes"] = downloaded
+
+        duration = time.monotonic() - start
+        self.telemetry.emit(
+            "download",
+            url = url,
+            path = fname,
+            season = s,
+            episode = e,
+            status = status,
+            bytes = stats["bytes"],
+            duration = duration,
+            ttfb = stats["ttfb"],
+            throughput = stats["bytes"] / duration if duration > 0 else 0
+        )
+        return status
+
+    async def _transfer(self, url: str, fname: str, desc: str, position: Optional[int], checksum: bool, stats: dict[str, Any]) -> int:
+        """
+        Download <url> to <fname>. (See `_download()`)
+
+        :param stats: Updated with `ttfb` (time to first byte), `bytes` (the number of bytes downloaded),
+                      and `source` (the URL on the mirror).
+
+        :returns: Same as `API._download()`.
+        """
+
+        part_path = f"{fname}.part"
+        state_path = f"{fname}.part.json"
+
+        state = self._loadPartState(state_path, url)
+        if state is not None and "segments" in state:  # Segmented downloads are only supported by `API`.
+            self._removePartFiles(f"{fname}.part", state_path)
+            state = None
+
+        offset, headers = self._resumeHeaders(state, part_path)
+
+        async def send(routed: str) -> httpx.Response:
+            await self.request_limiter.acquireAsync()
+            start = time.monotonic()
+            resp = await self.client.send(self.client.build_request("GET", routed, headers=headers), stream=True)
+            self.telemetry.emit("request", method="GET", url=routed, status=resp.status_code, latency=time.monotonic() - start, bytes=None)
+            return resp
+
+        resp = await self._send(url, send)
+        try:
+            stats["ttfb"] = time.monotonic() - stats["start"]
+            stats["source"] = str(resp.url)
+            status, offset, total, state = self._startPart(url, fname, resp, state, offset)
+            if status is not None:
+                if status == 0 and checksum:  # Hashed in a thread so the other downloads keep going.
+                    self._writeChecksum(fname, (await asyncio.to_thread(_hashFile, fname)).hexdigest())
+
+                return status
+
+            downloaded_size = offset
+            hasher = None if not checksum else ((await asyncio.to_thread(_hashFile, part_path)) if offset > 0 else _newHasher())
+            measure = self.bandwidth_limiter.rate == 0  # See `API._writeBody()`.
+            watch = self.mirrors.watch(stats["source"]) if measure else None
+            body_start = time.monotonic()
+            bar = _ProgressBar(desc, total, offset, position)
+            try:
+                with open(part_path, 'ab' if offset > 0 else 'wb', buffering=self.chunk_size) as file:
+                    if resp.headers.get("content-encoding", "identity") == "identity":
+                        body = resp.aiter_raw()
+
+                    else:
+                        body = resp.aiter_bytes()
+
+                    async for data in body:
+                        await self.bandwidth_limiter.acquireAsync(len(data))
+                        if hasher is not None:
+                            hasher.update(data)
+
+                        size = file.write(data)
+                        bar.update(size)
+                        downloaded_size += size
+                        if watch is not None and watch(size):
+                            break
+
+            except httpx.TransportError:  # The connection dropped; keep what we have so it can be resumed.
+                pass
+
+            except OSError as err:  # Another program filled the disk; keep the `.part` file so it can be resumed.
+                if err.errno != errno.ENOSPC:
+                    raise
+
+                return 3
+
+            finally:  # Also runs on cancellation, so the file is closed and the bar is cleared.
+                bar.close()
+                stats["bytes"] = downloaded_size - offset
+                if measure:
+                    self.mirrors.report(stats["source"], stats["bytes"], time.monotonic() - body_start)
+
+        finally:
+            await resp.aclose()
+
+        if downloaded_size == total:
+            os.replace(part_path, fname)
+            self._removePartFiles(state_path)
+            if hasher is not None:
+                self._writeChecksum(fname, hasher.hexdigest())
+
+            return 0
+
+        if downloaded_size > total:
+            self._removePartFiles(part_path, state_path)
+            return 2
+
+        return 1
+
+    async def getMetadata(self, s: Optional[int | str] = None, e: Optional[int | str] = None, dl_all: bool = False) -> dict[str, Any]:
+        """
+        Get episode <e> of season <s> metadata from <self.endpoint>.
+
+        :param s:      Season number (Not needed if `dl_all` is True)
+        :param e:      Episode number (Not needed if `dl_all` is True)
+        :param dl_all: Download all season and episode metadata
+
+        :returns: The episode metadata, or the whole `pageProps` if `dl_all` is True.
+        """
+
+        await self.catalog.refreshAsync(self.client)
+        return self.catalog._buildPageProps() if dl_all else self.catalog._lookup(s, e)
+
+    async def getThumbnail(self, s: int, e: int) -> tuple[str, bytes]:
+        """
+        Get thumbnail of season <s> episode <e>.
+
+        :param s: Season number.
+        :param e: Episode number.
+
+        :returns: A tuple containing the thumbnail extension and data.
+        """
+
+        for thumbnail_ext in self._extensions["thumbnail"]:
+            result = await self._get(self._thumbnailUrl(s, e, thumbnail_ext))  # type: ignore
+            if result.status_code == 200:
+                return (thumbnail_ext, result.content)  # type: ignore
+
+        raise ValueError("Unable to download thumbnail.")
+
+    async def probeRenditions(self, s: int, e: int, qualities: Optional[Iterable[int]] = None, refresh: bool = False) -> dict[int, Optional[int]]:
+        """
+        Find out which qualities of season <s> episode <e> are on the CDN, and how big they are.
+        Every quality is probed with a HEAD request at the same time. The results are cached.
+
+        :param s:         Season number.
+        :param e:         Episode number.
+        :param qualities: The qualities to probe. [Default: all of them]
+        :param refresh:   Probe again instead of using the cached results.
+
+        :returns: A dictionary of quality -> size in bytes (`-1` if the server does not tell), or `None` if it is not available.
+        """
+
+        renditions, missing = self._cachedRenditions(s, e, self._video_qualities if qualities is None else qualities, refresh)
+        responses = await asyncio.gather(*(self._head(self._videoUrl(s, e, q)) for q in missing))
+        for quality, resp in zip(missing, responses):
+            renditions[quality] = self._recordRendition(s, e, quality, resp)
+
+        return renditions
+
+    async def bestQuality(self, s: int, e: int, max_quality: Optional[int] = None, max_size: Optional[int] = None) -> Optional[int]:
+        """
+        Get the highest quality of season <s> episode <e> that is available on the CDN.
+
+        :param s:           Season number.
+        :param e:           Episode number.
+        :param max_quality: Do not pick a higher quality than this.
+        :param max_size:    Do not pick a video bigger than this many bytes.
+
+        :returns: The quality, or `None` if no quality is available within the limits.
+        """
+
+        qualities = [q for q in self._video_qualities if max_quality is None or q <= max_quality]
+        return self._pickQuality(await self.probeRenditions(s, e, qualities), max_quality, max_size)
+
+    async def getVideoData(
+        self,
+        season: int,
+        episode: int,
+        filepath: str,
+        quality: int | Iterable[int] = 1080,
+        position: Optional[int] = None,
+        checksum: bool = True
+    ) -> int | dict[int, int]:
+        """
+        Get the actual video data from the CDN.
+
+        :param season:   Season number
+        :param episode:  Episode number
+        :param filepath: Where to store the downloaded video. (Must contain `{quality}` if several qualities are given)
+        :param quality:  `1080` for 1080p, (Other options: `2160`, `1440`, `720`, `480`, `360`, `240`)
+                         or a list of qualities to download at the same time.
+        :param position: The line of the tqdm progress bar when several downloads run at the same time.
+        :param checksum: Save the checksum of the video next to it. (Checked by `verify`)
+
+        :returns: The error code, or a dictionary of quality -> error code if a list of qualities is given.
+        """
+
+        if not isinstance(quality, int):
+            qualities = list(quality)
+            if not set(qualities).issubset(self._video_qualities) or "{quality}" not in filepath:
+                raise ValueError("Invalid quality parameter!")
+
+            exit_codes = await asyncio.gather(*(
+                self.getVideoData(
+                    season,
+                    episode,
+                    filepath.format(quality=q),
+                    q,
+                    None if position is None else position + i,
+                    checksum
+                )
+                for i, q in enumerate(qualities)
+            ))
+            return dict(zip(qualities, exit_codes))  # type: ignore
+
+        if quality not in self._video_qualities:
+            raise ValueError("Invalid quality parameter!")
+
+        return await self._download(self._videoUrl(season, episode, quality), filepath, season, episode, position, checksum)
+
+    async def getSubtitle(self, s: int, e: int, language: str | None = None, dl_all: bool = False) -> dict[str, bytes]:
+        """
+        Get subtitles of season <s> episode <e>. All tracks are requested at the same time.
+
+        :param s:        Season number.
+        :param e:        Episode number.
+        :param language: The language to download. (Country code like `en` for English)
+        :param dl_all:   Download all available subtitles.
+
+        :returns: A dictionary containing the subtitles in <bytes>. Returns an empty dictionary if no subtitles are found.
+        """
+
+        if dl_all:
+            languages = [tracks["srclang"] for tracks in (await self.getMetadata(s, e))["tracks"]]
+            responses = await asyncio.gather(*(self._get(self._subtitleUrl(s, e, lang)) for lang in languages))
+            return {lang: r.content for lang, r in zip(languages, responses)}
+
+        if language is None:
+            raise ValueError("You need to set `language` if dl_all is False.")
+
+        r = await self._get(self._subtitleUrl(s, e, language))
+        return {language: r.content} if r.status_code == 200 else {}
+
+    async def genNFO(self, s: int, e: int) -> str:
+        """
+        Generate NFO using self.getMetadata().
+
+        :param s: Season number.
+        :param e: Episode number.
+
+        :returns: NFO output.
+        """
+
+        return self._renderNFO(await self.getMetadata(s, e), s, e)
+
+
+MANIFEST_PATH: Final[str] = "tuaa-manifest.sqlite3"  # Relative to the library folder.
+
+
+class Manifest:
+    """
+    A local SQLite database of the downloaded files, used to only fetch what has changed.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        """
+        :param path: The path of the database file.
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)  # Access is serialized by <self._lock>.
+        with self._lock, self._db:
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS artifacts (
+                    path TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    checksum TEXT,
+                    updated REAL NOT NULL
+                )"""
+            )
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def get(self, path: str) -> Optional[dict[str, Any]]:
+        """
+        Get the manifest entry of <path>.
+
+        :param path: The path of the file, relative to the library folder.
+
+        :returns: The entry, or `None` if the file is not in the manifest.
+        """
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, size, etag, last_modified, checksum, updated FROM artifacts WHERE path = ?",
+                (path,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return dict(zip(("url", "size", "etag", "last_modified", "checksum", "updated"), row))
+
+    def record(
+        self,
+        path: str,
+        url: str,
+        size: int,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        checksum: Optional[str] = None
+    ) -> None:
+        """
+        Add or update the manifest entry of <path>.
+
+        :param path:          The path of the file, relative to the library folder.
+        :param url:           Where the file was downloaded from.
+        :param size:          The size of the file in bytes.
+        :param etag:          The `ETag` header of the response.
+        :param last_modified: The `Last-Modified` header of the response.
+        :param checksum:      The SHA-256 checksum of the file.
+        """
+
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, url, size, etag, last_modified, checksum, time.time())
+            )
+
+    def isCurrent(self, path: str) -> Optional[dict[str, Any]]:
+        """
+        Get the manifest entry of <path> if the local file still matches it.
+
+        :param path: The path of the file, relative to the library folder.
+
+        :returns: The entry, or `None` if the file is missing, modified, or not in the manifest.
+        """
+
+        entry = self.get(path)
+        if entry is None or not os.path.isfile(path) or os.path.getsize(path) != entry["size"]:
+            return None
+
+        return entry
+
+
+QUEUE_PATH: Final[str] = "tuaa-queue.sqlite3"  # Relative to the library folder.
+ASSETS: Final[tuple[str, ...]] = ("video", "subtitles", "thumbnail", "nfo")  # The files saved for an episode.
+
+
+class JobQueue:
+    """
+    A persistent queue of episodes to download, stored in a local SQLite journal.
+
+    Every change of a job is committed at once, so a worker that is killed can be started
+    again and continue where it stopped. (The `.part` files of its downloads are resumed)
+
+    Job states: `queued`, `running`, `paused`, `done`, and `failed`.
+    """
+
+    STALE_AFTER: Final[float] = 120  # Running jobs without a heartbeat for this long belong to a dead worker.
+
+    def __init__(self, path: str = QUEUE_PATH):
+        """
+        :param path: The path of the database file.
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)  # Access is serialized by <self._lock>.
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    season INTEGER NOT NULL,
+                    episode INTEGER NOT NULL,
+                    quality TEXT NOT NULL,
+                    assets TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    exit_code INTEGER,
+                    worker TEXT,
+                    added REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    max_quality INTEGER,
+                    max_size INTEGER,
+                    UNIQUE (season, episode, quality)
+                )"""
+            )
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for column in ("max_quality", "max_size"):  # Added after the first version of the journal.
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} INTEGER")
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def add(
+        self,
+        season: int,
+        episode: int,
+        quality: int | str | Iterable[int] = 1080,
+        assets: Iterable[str] = ASSETS,
+        max_quality: Optional[int] = None,
+        max_size: Optional[int] = None
+    ) -> bool:
+        """
+        Add a job to the queue. Finished and failed jobs of the same episode and quality are queued again.
+
+        :param season:      Season number.
+        :param episode:     Episode number.
+        :param quality:     The quality of the video, a list of qualities, or `best`. (Same as `Main`; saved as text, e.g. `2160,720`)
+        :param assets:      Which files to save. (See `ASSETS`)
+        :param max_quality: With `best`, do not download a higher quality than this.
+        :param max_size:    With `best`, do not download a video bigger than this many bytes.
+
+        :returns: `True` if the job is queued, `False` if it is already waiting or running.
+        """
+
+        if not isinstance(quality, (int, str)):
+            quality = ','.join(map(str, dict.fromkeys(quality)))
+
+        quality = str(quality)  # Older journals have an `INTEGER` column, which still stores the lists as text.
+        assets = ','.join(asset for asset in ASSETS if asset in set(assets))
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                """INSERT INTO jobs (season, episode, quality, assets, state, added, updated, max_quality, max_size)
+                VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)
+                ON CONFLICT (season, episode, quality) DO UPDATE SET
+                    assets = excluded.assets, state = 'queued', attempts = 0, exit_code = NULL, updated = excluded.updated,
+                    max_quality = excluded.max_quality, max_size = excluded.max_size
+                WHERE state IN ('done', 'failed')""",
+                (season, episode, quality, assets, now, now, max_quality, max_size)
+            )
+
+        return cursor.rowcount > 0
+
+    def _setState(self, new_state: str, old_states: tuple[str, ...], season: Optional[int], episodes: Optional[Iterable[int]]) -> int:
+        query = f"UPDATE jobs SET state = ?, updated = ? WHERE state IN ({', '.join('?' * len(old_states))})"
+        params: list[Any] = [new_state, time.time(), *old_states]
+        if season is not None:
+            query += " AND season = ?"
+            params.append(season)
+
+        if episodes is not None:
+            episodes = list(episodes)
+            query += f" AND episode IN ({', '.join('?' * len(episodes))})"
+            params += episodes
+
+        with self._lock, self._db:
+            return self._db.execute(query, params).rowcount
+
+    def pause(self, season: Optional[int] = None, episodes: Optional[Iterable[int]] = None) -> int:
+        """
+        Stop workers from starting the queued jobs. Running jobs are paused if they fail.
+
+        :param season:   Only pause the jobs of this season.
+        :param episodes: Only pause the jobs of these episodes.
+
+        :returns: How many jobs are paused.
+        """
+
+        return self._setState("paused", ("queued", "running"), season, episodes)
+
+    def resume(self, season: Optional[int] = None, episodes: Optional[Iterable[int]] = None) -> int:
+        """
+        Queue the paused and failed jobs again.
+
+        :param season:   Only resume the jobs of this season.
+        :param episodes: Only resume the jobs of these episodes.
+
+        :returns: How many jobs are queued.
+        """
+
+        return self._setState("queued", ("paused", "failed"), season, episodes)
+
+    def jobs(self, state: Optional[str] = None) -> list[dict[str, Any]]:
+        """
+        :param state: Only list the jobs in this state.
+
+        :returns: The jobs, in the order they were added.
+        """
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs" + ("" if state is None else " WHERE state = ?") + " ORDER BY id",
+                () if state is None else (state,)
+            ).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def recover(self) -> int:
+        """
+        Queue the running jobs of workers that have stopped sending heartbeats again.
+
+        :returns: How many jobs are queued again.
+        """
+
+        with self._lock, self._db:
+            return self._db.execute(
+                "UPDATE jobs SET state = 'queued', worker = NULL WHERE state = 'running' AND updated < ?",
+                (time.time() - self.STALE_AFTER,)
+            ).rowcount
+
+    def claim(self, worker: str) -> Optional[dict[str, Any]]:
+        """
+        Take the oldest queued job and mark it as running.
+
+        :param worker: The ID of the worker. (Several workers can drain the same queue)
+
+        :returns: The job, or `None` if there are no queued jobs.
+        """
+
+        while True:
+            with self._lock, self._db:
+                row = self._db.execute("SELECT * FROM jobs WHERE state = 'queued' ORDER BY id LIMIT 1").fetchone()
+                if row is None:
+                    return None
+
+                # Only one worker can win the job, even if several processes try at the same time.
+                if self._db.execute(
+                    "UPDATE jobs SET state = 'running', worker = ?, attempts = attempts + 1, updated = ? WHERE id = ? AND state = 'queued'",
+                    (worker, time.time(), row["id"])
+                ).rowcount == 1:
+                    return dict(row)
+
+    def heartbeat(self, worker: str) -> None:
+        """
+        Mark the running jobs of <worker> as still alive. (See `recover()`)
+        """
+
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET updated = ? WHERE state = 'running' AND worker = ?", (time.time(), worker))
+
+    def finish(self, job_id: int, exit_code: int) -> None:
+        """
+        Record the result of a job. Failed jobs that were paused while running stay paused.
+
+        :param job_id:    The ID of the job.
+        :param exit_code: The exit code of `Main.main()`.
+        """
+
+        with self._lock, self._db:
+            self._db.execute(
+                """UPDATE jobs SET
+                    state = CASE WHEN ? = 0 THEN 'done' WHEN state = 'paused' THEN 'paused' ELSE 'failed' END,
+                    exit_code = ?, worker = NULL, updated = ?
+                WHERE id = ?""",
+                (exit_code, exit_code, time.time(), job_id)
+            )
+
+    def release(self, job_id: int) -> None:
+        """
+        Put a running job back in the queue without counting it as failed.
+        """
+
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET state = 'queued', worker = NULL, attempts = attempts - 1, updated = ? WHERE id = ? AND state = 'running'",
+                (time.time(), job_id)
+            )
+
+
+class SeasonArchive:
+    """
+    A tar archive of a season, that the files of its episodes are streamed into without being written to the disk first.
+
+    Every member is recorded in an index next to the archive (`<archive>.index`, one JSON object per line).
+    When the archive is opened again, it is cut back to the end of its last complete member so it can be
+    appended to, and a video that was cut short is kept so it can be resumed. (See `pending()` and `claim()`)
+    The data of a member must be contiguous, so members are written one at a time; hold `lock` while streaming one.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: The path of the archive. It is created if it does not exist, and appended to if it does.
+        """
+
+        self.path = path
+        self.index_path = f"{path}.index"
+        self.lock = threading.RLock()
+        self.members: dict[str, dict[str, Any]] = {}  # name -> offset of the header, offset of the data, size, ...
+        self._current: Optional[dict[str, Any]] = None  # The member that is being (or was being) streamed.
+        self._claimed: Optional[str] = None  # The member that was cut short, while the download that resumes it runs.
+        self._changed = threading.Condition(self.lock)
+        self._end = 0  # Where the next member starts.
+        self._file = open(path, 'r+b' if os.path.isfile(path) else 'w+b')
+        if os.path.isfile(self.index_path):
+            self._loadIndex()
+
+        self._repair()
+        self._index = open(self.index_path, 'a', encoding="utf-8")
+
+    def __enter__(self) -> "SeasonArchive":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return self.memberName(name) in self.members
+
+    @property
+    def incomplete(self) -> Optional[str]:
+        """
+        The name of the member that was cut short, if there is one. (It is dropped when another member is added)
+        """
+
+        return None if self._current is None else self._current["name"]
+
+    @staticmethod
+    def memberName(path: str) -> str:
+        """
+        :returns: The name of the member for <path>, relative to the library folder. (e.g., `Season 01/Unus Annus S1E1/Unus Annus S1E1.mp4`)
+        """
+
+        return os.path.normpath(path).replace(os.sep, '/')
+
+    @staticmethod
+    def _padded(size: int) -> int:
+        return -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+    def _loadIndex(self) -> None:
+        with open(self.index_path, 'r', encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+
+                except ValueError:  # The last line was cut short.
+                    break
+
+                if entry.get("partial"):
+                    self._current = entry
+                    continue
+
+                self.members[entry["name"]] = entry
+                self._end = entry["data"] + self._padded(entry["size"])
+                if self._current is not None and self._current["name"] == entry["name"]:
+                    self._current = None
+
+    def _scan(self, size: int) -> None:
+        """
+        Rebuild the index from the headers of the archive, up to the last complete member.
+        """
+
+        self.members, self._current, self._end = {}, None, 0
+        self._file.seek(0)
+        try:
+            with tarfile.open(fileobj=self._file, mode='r:') as tar:
+                for info in tar:
+                    if info.offset_data + info.size > size:
+                        break
+
+                    self.members[info.name] = {"name": info.name, "offset": info.offset, "data": info.offset_data, "size": info.size}
+                    self._end = info.offset_data + self._padded(info.size)
+
+        except (tarfile.TarError, EOFError):  # The rest of the archive is cut short.
+            pass
+
+        with open(self.index_path, 'w', encoding="utf-8") as f:
+            for entry in sorted(self.members.values(), key=lambda entry: entry["offset"]):
+                f.write(json.dumps(entry) + '\n')
+
+    def _repair(self) -> None:
+        """
+        Cut the archive back to the end of the last complete member, or of the data of the member that was being streamed.
+        The end-of-archive blocks written by `close()` are removed too, so new members can be appended.
+        """
+
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self._end or (size > 0 and not os.path.isfile(self.index_path)):  # The index does not match the archive.
+            self._scan(size)
+
+        current = self._current
+        if current is not None and current["offset"] == self._end and current["data"] < size:
+            current["written"] = min(size, current["data"] + current["size"]) - current["data"]
+            self._file.truncate(current["data"] + current["written"])
+
+        else:
+            self._current = None
+            self._file.truncate(self._end)
+
+    def _record(self, entry: dict[str, Any]) -> None:
+        self._index.write(json.dumps(entry) + '\n')
+        self._index.flush()
+
+    def claim(self, name: str) -> bool:
+        """
+        Keep the member that was cut short for the download that resumes it. Until `release()`,
+        other members wait for it instead of dropping it. (e.g., the next episodes of a range)
+
+        :param name: The path of the file, relative to the library folder.
+
+        :returns: `True` if <name> was cut short and is now claimed.
+        """
+
+        with self.lock:
+            if self.incomplete is None or self.incomplete != self.memberName(name):
+                return False
+
+            self._claimed = self.incomplete
+            return True
+
+    def release(self) -> None:
+        """
+        Let the other members drop the claimed member if it is still incomplete. (See `claim()`)
+        """
+
+        with self.lock:
+            self._claimed = None
+            self._changed.notify_all()
+
+    def discard(self) -> None:
+        """
+        Drop the member that is being streamed, or that was cut short.
+        """
+
+        with self.lock:
+            self._current = None
+            self._file.truncate(self._end)
+            self._changed.notify_all()
+
+    def _writeHeader(self, name: str, size: int, mtime: Optional[float] = None) -> dict[str, Any]:
+        """
+        Write the header of a new member at the end of the archive. Any incomplete member is dropped first,
+        unless it is claimed. (Then this waits until it is complete or released)
+
+        :returns: The index entry of the member.
+        """
+
+        while self._claimed is not None and self._current is not None and name != self._claimed:
+            self._changed.wait()
+
+        self.discard()
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mode = 0o644
+        info.mtime = int(time.time() if mtime is None else mtime)
+        header = info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")  # PAX headers allow names longer than 100 characters.
+        self._file.seek(self._end)
+        self._file.write(header)
+        return {"name": name, "offset": self._end, "data": self._end + len(header), "size": size}
+
+    def addBytes(self, name: str, data: bytes, mtime: Optional[float] = None) -> None:
+        """
+        Add a small file to the archive.
+
+        :param name:  The path of the file, relative to the library folder.
+        :param data:  The content of the file.
+        :param mtime: The modification time of the file. [Default: now]
+        """
+
+        with self.lock:
+            entry = self._writeHeader(self.memberName(name), len(data), mtime)
+            self._file.write(data + bytes(self._padded(len(data)) - len(data)))
+            self._file.flush()
+            self.members[entry["name"]] = entry
+            self._end = entry["data"] + self._padded(entry["size"])
+            self._record(entry)
+
+    def pending(self, name: str, url: str) -> Optional[dict[str, Any]]:
+        """
+        :param name: The path of the file, relative to the library folder.
+        :param url:  The URL the file is downloaded from.
+
+        :returns: The index entry of <name> if it was cut short while it was downloaded from <url>. (`written` is how much of it is saved)
+        """
+
+        current = self._current
+        if current is None or current["name"] != self.memberName(name) or current.get("url") != url:
+            return None
+
+        return current
+
+    def begin(self, name: str, size: int, **state) -> None:
+        """
+        Start streaming a new member. Write its data with `write()`, then call `commit()`.
+
+        :param name:  The path of the file, relative to the library folder.
+        :param size:  The size of the file. (It is written in the header, before the data)
+        :param state: Saved in the index so the download can be resumed. (e.g., `url`, `etag`, and `last_modified`)
+        """
+
+        with self.lock:
+            entry = self._writeHeader(self.memberName(name), size)
+            self._current = {**entry, **state, "written": 0, "partial": True}
+            self._file.flush()
+            self._record({key: value for key, value in self._current.items() if key != "written"})
+
+    def resume(self) -> int:
+        """
+        Continue streaming the member that was cut short. (See `pending()`)
+
+        :returns: How many bytes of it are already saved.
+        """
+
+        self._file.seek(self._current["data"] + self._current["written"])  # type: ignore
+        return self._current["written"]  # type: ignore
+
+    def write(self, data: bytes) -> int:
+        """
+        Append <data> to the member that is being streamed. Anything past its size is dropped. (But still counted)
+
+        :returns: The length of <data>.
+        """
+
+        current = self._current
+        self._file.write(data[:current["size"] - current["written"]])  # type: ignore
+        current["written"] = min(current["size"], current["written"] + len(data))  # type: ignore
+        return len(data)
+
+    def hashCurrent(self, hasher=None, block_size: int = 16 * 1024 ** 2):
+        """
+        Hash the part of the streamed member that is already saved. (Used to resume its checksum)
+
+        :param hasher:     The hash object to update. [Default: a new `CHECKSUM_ALGORITHM` hash object]
+        :param block_size: How many bytes are hashed at a time.
+
+        :returns: The hash object.
+        """
+
+        hasher = _newHasher() if hasher is None else hasher
+        end = self._current["data"] + self._current["written"]  # type: ignore
+        self._file.flush()
+        self._file.seek(self._current["data"])  # type: ignore
+        while self._file.tell() < end:  # Leaves the file where the data continues.
+            hasher.update(self._file.read(min(block_size, end - self._file.tell())))
+
+        return hasher
+
+    def commit(self) -> None:
+        """
+        Finish the member that is being streamed. Its data must be complete.
+        """
+
+        with self.lock:
+            current = self._current
+            self._file.write(bytes(self._padded(current["size"]) - current["size"]))  # type: ignore
+            self._file.flush()
+            os.fsync(self._file.fileno())  # The data is on the disk before the index says it is complete.
+            entry = {key: value for key, value in current.items() if key not in ("written", "partial")}  # type: ignore
+            self.members[entry["name"]] = entry
+            self._end = entry["data"] + self._padded(entry["size"])
+            self._current = None
+            self._record(entry)
+            self._changed.notify_all()
+
+    def close(self) -> None:
+        """
+        Write the end-of-archive blocks, unless a member was cut short. (It is resumed the next time)
+        """
+
+        with self.lock:
+            if self._current is None:
+                self._file.seek(self._end)
+                self._file.write(bytes(2 * tarfile.BLOCKSIZE))
+                self._file.truncate()
+
+            self._file.close()
+            self._index.close()
+
+
+class SeasonArchives:
+    """
+    The archives of the seasons in a folder. (`Season XX.tar`) Each one is opened the first time it is needed.
+    """
+
+    def __init__(self, root: str = '.'):
+        """
+        :param root: The folder of the archives.
+        """
+
+        self.root = root
+        self._archives: dict[int, SeasonArchive] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SeasonArchives":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def get(self, season: int) -> SeasonArchive:
+        """
+        :returns: The archive of <season>.
+        """
+
+        with self._lock:
+            if season not in self._archives:
+                self._archives[season] = SeasonArchive(os.path.join(self.root, f"Season {_BaseAPI._checkValueFormat(season, 's')}.tar"))
+
+            return self._archives[season]
+
+    def close(self) -> None:
+        with self._lock:
+            for archive in self._archives.values():
+                archive.close()
+
+            self._archives = {}
+
+
+def _print(message: str) -> None:
+    """
+    Print <message> without breaking the tqdm progress bars.
+
+    :param message: The message to print.
+    """
+
+    if TQDM_INSTALLED:
+        tqdm.write(message)
+
+    else:
+        print(message)
+
+
+class Main:
+    def __init__(
+        self,
+        season: int,
+        episode: int,
+        quality: int | str | Iterable[int] = 1080,
+        metadata_only: bool = False,
+        api: Optional[API] = None,
+        position: Optional[int] = None,
+        verbose: bool = True,
+        segments: int = 1,
+        min_segment_size: int = 8 * 1024 ** 2,
+        manifest: Optional[Manifest] = None,
+        assets: Optional[Iterable[str]] = None,
+        max_quality: Optional[int] = None,
+        max_size: Optional[int] = None,
+        disk_budget: Optional[DiskBudget] = None,
+        postprocessor: Optional["PostProcessor"] = None,
+        archives: Optional[SeasonArchives] = None,
+        replace: Iterable[int] = (),
+        tag_quality: Optional[bool] = None
+    ):
+        """
+        :param season:           Season number.
+        :param episode:          Episode number.
+        :param quality:          The quality of the video to download, or a list of qualities to download at the same time.
+                                 (Saved as `<name> - <quality>p.mp4`; the subtitles, thumbnail, and NFO are shared)
+                                 `best` downloads the highest quality that is available on the CDN. (See `API.bestQuality()`)
+        :param metadata_only:    Do not download the video.
+        :param api:              The API object to use. (Share one between episodes to reuse its catalog)
+        :param position:         The line of the video progress bar when several episodes are downloaded at the same time.
+                                 (The other qualities use the lines after it)
+        :param verbose:          Print every step. If False, only failures are printed.
+        :param segments:         Download the video over up to <segments> connections in parallel.
+        :param min_segment_size: The minimum size of a segment in bytes.
+        :param manifest:         Only download the files that are new or changed according to this manifest. (Sync mode)
+        :param assets:           Which files to save. (See `ASSETS`) [Default: all of them]
+        :param max_quality:      With `best`, do not download a higher quality than this.
+        :param max_size:         With `best`, do not download a video bigger than this many bytes.
+        :param disk_budget:      Reserve the size of the videos here before downloading them. (Share one between episodes)
+                                 [Default: only check the free space]
+        :param postprocessor:    Convert the subtitles and resize the thumbnail in the background once they are saved.
+                                 (Share one between episodes, and close it when they are done)
+        :param archives:         Stream the files into the archive of the season instead of the episode folder.
+                                 (Share one between episodes, and close it when they are done)
+        :param replace:          Download the videos in these qualities again even if they exist. (e.g., corrupted copies)
+                                 The old video is only replaced once the new one is complete.
+        :param tag_quality:      Add the quality to the filename of the video. [Default: only if several qualities are downloaded]
+        """
+
+        self.s = season
+        self.e = episode
+        self.best = quality == "best"  # The quality is picked by `_main()`.
+        self.max_quality = max_quality
+        self.max_size = max_size
+        self.qualities: list[int] = [] if self.best else [quality] if isinstance(quality, int) else list(dict.fromkeys(quality))  # type: ignore
+        self.quality: Optional[int] = self.qualities[0] if self.qualities else None
+        self.metadata_only = metadata_only
+        self.position = position
+        self.verbose = verbose
+        self.segments = segments
+        self.min_segment_size = min_segment_size
+        self.manifest = manifest
+
+        self.assets: set[str] = set(ASSETS if assets is None else assets)
+        if not self.assets.issubset(ASSETS):
+            raise ValueError(f"Unknown assets: {', '.join(sorted(self.assets.difference(ASSETS)))}")
+
+        if metadata_only:
+            self.assets.discard("video")
+
+        self._api = API() if api is None else api
+        self.disk_budget = DiskBudget() if disk_budget is None else disk_budget
+        self.postprocessor = postprocessor
+        if archives is not None and manifest is not None:
+            raise ValueError("The manifest of `sync` cannot be used with archives.")
+
+        self.replace: set[int] = set(replace)
+        self.tag_quality = tag_quality
+        if archives is not None and self.replace:
+            raise ValueError("The videos in an archive cannot be replaced.")
+
+        self.archive = None if archives is None else archives.get(season)
+        self._deferred: list[tuple[str, bytes]] = []  # The small files, added to the archive after the video. (See `_store()`)
+        self._deferred_lock = threading.Lock()
+        self._claimed = False  # If a video of this episode was cut short in the archive, and this episode resumes it.
+        self.retries = self._api.retry_policy.retries  # Maximum retries of an incomplete video download
+        self._retries = 0  # Retries used by the video download. (Reported to the telemetry)
+
+    def _log(self, message: str, important: bool = False) -> None:
+        """
+        Print <message> without breaking the progress bars.
+
+        :param message:   The message to print.
+        :param important: Print the message even if <self.verbose> is False.
+        """
+
+        if self.verbose:
+            _print(message)
+
+        elif important:
+            _print(f"[S{self.s}E{self.e}] {message}")
+
+    def _hasFile(self, path: str) -> bool:
+        """
+        :returns: `True` if <path> is already saved, in the episode folder or in the archive.
+        """
+
+        return os.path.isfile(path) if self.archive is None else path in self.archive
+
+    def _hasVideo(self, ef: str, filename: str, quality: int) -> bool:
+        """
+        :returns: `True` if the video in <quality> is already saved, and is not going to be replaced. (See <self.replace>)
+        """
+
+        return quality not in self.replace and self._hasFile(self._videoPath(ef, filename, quality))
+
+    def _store(self, path: str, data: bytes) -> None:
+        """
+        Write <data> to <path>, or keep it for the archive.
+
+        A video that is cut short can only be resumed if it is still the last member of the archive,
+        so the small files are added after the video instead of while it is downloading. (See `_flushArchive()`)
+        """
+
+        if self.archive is not None:
+            with self._deferred_lock:
+                self._deferred.append((path, data))
+
+            return
+
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        self._postprocess(path)
+
+    def _flushArchive(self) -> None:
+        """
+        Add the small files kept by `_store()` to the archive. Files that are already in it are skipped.
+        """
+
+        with self._deferred_lock:
+            deferred, self._deferred = self._deferred, []
+
+        with self.archive.lock:  # type: ignore
+            for path, data in deferred:
+                if path not in self.archive:  # type: ignore
+                    self.archive.addBytes(path, data)  # type: ignore
+
+    def _postprocess(self, path: str) -> None:
+        """
+        Hand <path> to the post-processor, if there is one. (Without waiting for it)
+        """
+
+        if self.postprocessor is not None:
+            self.postprocessor.submit(path)
+
+    @staticmethod
+    def _writeFile(path: str, data: bytes) -> None:
+        """
+        Write <data> to <path> without leaving a half-written file behind.
+        """
+
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(data)
+
+        os.replace(f"{path}.tmp", path)
+
+    def _syncFile(self, path: str, url: str) -> Optional[bool]:
+        """
+        Download <url> to <path> unless the manifest shows that it has not changed.
+
+        :param path: Where to write the file.
+        :param url:  The URL of the file.
+
+        :returns: `True` if the file is written, `False` if it is unchanged,
+                  or `None` if the file is not available on the server.
+        """
+
+        entry = self.manifest.isCurrent(path)  # type: ignore
+        resp = self._api._conditionalGet(url, entry)
+        if resp.status_code == 304:
+            return False
+
+        if resp.status_code != 200:
+            return None
+
+        checksum = hashlib.sha256(resp.content).hexdigest()
+        if entry is None or entry["checksum"] != checksum:  # Some servers do not send validators.
+            self._writeFile(path, resp.content)
+
+        self.manifest.record(  # type: ignore
+            path,
+            url,
+            len(resp.content),
+            resp.headers.get("etag", None),
+            resp.headers.get("last-modified", None),
+            checksum
+        )
+        return entry is None or entry["checksum"] != checksum
+
+    def _syncSubtitles(self, ef: str, filename: str) -> None:
+        languages = [tracks["srclang"] for tracks in self._api.getMetadata(self.s, self.e)["tracks"]]
+        if not languages:
+            return
+
+        paths = [os.path.join(ef, f"{filename}.{lang}.{self._api._extensions['subtitles']}") for lang in languages]
+        with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+            results = executor.map(
+                lambda i: self._syncFile(paths[i], self._api._subtitleUrl(self.s, self.e, languages[i])),
+                range(len(languages))
+            )
+            for lang, path, result in zip(languages, paths, results):
+                if result:
+                    self._log(f"Updated `{lang}` subtitles.")
+
+                if result is not None:
+                    self._postprocess(path)
+
+    def _syncThumbnail(self, ef: str, filename: str) -> None:
+        for thumbnail_ext in self._api._extensions["thumbnail"]:
+            path = os.path.join(ef, f"{filename}-thumb.{thumbnail_ext}")
+            result = self._syncFile(path, self._api._thumbnailUrl(self.s, self.e, thumbnail_ext))  # type: ignore
+            if result is not None:
+                if result:
+                    self._log("Updated thumbnail.")
+
+                self._postprocess(path)
+                return
+
+        raise ValueError("Unable to download thumbnail.")
+
+    def _syncNFO(self, ef: str, filename: str) -> None:
+        path = os.path.join(ef, f"{filename}.{self._api._extensions['nfo']}")
+        nfo = self._api.genNFO(self.s, self.e).encode("utf-8")
+        checksum = hashlib.sha256(nfo).hexdigest()
+        entry = self.manifest.isCurrent(path)  # type: ignore
+        if entry is not None and entry["checksum"] == checksum:
+            return
+
+        self._log("Updated NFO.")
+        self._writeFile(path, nfo)
+        self.manifest.record(path, self._api._endpoint, len(nfo), checksum=checksum)  # type: ignore
+
+    def _videoPath(self, ef: str, filename: str, quality: int) -> str:
+        """
+        :returns: The path of the video in <quality>. The quality is only added to the filename if several qualities are downloaded.
+                  (Unless <self.tag_quality> says otherwise)
+        """
+
+        tagged = len(self.qualities) > 1 if self.tag_quality is None else self.tag_quality
+        tag = f" - {quality}p" if tagged else ""
+        return os.path.join(ef, f"{filename}{tag}.{self._api._extensions['video']}")
+
+    def _videoBytes(self, ef: str, filename: str) -> int:
+        """
+        :returns: How many bytes the videos still need on the disk, using the sizes probed by the API object.
+                  (Videos of unknown size are checked by `API._download()` when they start instead)
+        """
+
+        paths = {quality: self._videoPath(ef, filename, quality) for quality in self.qualities}
+        missing = [quality for quality in self.qualities if not self._hasVideo(ef, filename, quality)]
+        if not missing:
+            return 0
+
+        renditions = self._api.probeRenditions(self.s, self.e, missing)
+        need = 0
+        for quality in missing:
+            size = renditions[quality]
+            if size is not None and size > 0:  # The part that is already downloaded is not needed again.
+                part_path = f"{paths[quality]}.part"
+                need += max(0, size - (os.path.getsize(part_path) if os.path.isfile(part_path) else 0))
+
+        return need
+
+    def _syncVideo(self, ef: str, filename: str, quality: Optional[int] = None, position: Optional[int] = None) -> int:
+        quality = self.quality if quality is None else quality
+        path = self._videoPath(ef, filename, quality)
+        url = self._api._videoUrl(self.s, self.e, quality)
+        changed = False
+        if os.path.isfile(path):
+            resp = self._api._head(url)
+            if resp.status_code != 200:
+                return resp.status_code
+
+            size = int(resp.headers.get("content-length", -1))
+            etag = resp.headers.get("etag", None)
+            entry = self.manifest.isCurrent(path)  # type: ignore
+            if entry is None and size == os.path.getsize(path):  # Downloaded before the manifest existed.
+                self.manifest.record(path, url, size, etag, resp.headers.get("last-modified", None))  # type: ignore
+                return 0
+
+            if entry is not None and entry["url"] == url and size == entry["size"] and (etag is None or etag == entry["etag"]):
+                return 0
+
+            self._log("The video has changed on the server, downloading it again...")
+            changed = True  # The old video is kept until the new one is complete.
+
+        exit_code = self._saveVideo(ef, filename, quality, position, replace=changed)
+        if exit_code == 0:
+            resp = self._api._head(url)
+            self.manifest.record(  # type: ignore
+                path,
+                url,
+                os.path.getsize(path),
+                resp.headers.get("etag", None),
+                resp.headers.get("last-modified", None)
+            )
+
+        return exit_code
+
+    def _saveSubtitles(self, ef: str, filename: str) -> None:
+        if self.manifest is not None:
+            return self._syncSubtitles(ef, filename)
+
+        self._log("Downloading subtitles...")
+        subs = self._api.getSubtitle(
+            s=self.s,
+            e=self.e,
+            language=None,
+            dl_all=True
+        )
+        for lang in subs:
+            self._log(f"Writing `{lang}` subtitles to file...")
+            self._store(os.path.join(ef, f"{filename}.{lang}.{self._api._extensions['subtitles']}"), subs[lang])
+
+    def _saveThumbnail(self, ef: str, filename: str) -> None:
+        if self.manifest is not None:
+            return self._syncThumbnail(ef, filename)
+
+        self._log("Downloading thumbnail...")
+        poster = self._api.getThumbnail(
+            s=self.s,
+            e=self.e
+        )
+
+        self._log("Writing thumbnail to file...")
+        self._store(os.path.join(ef, f"{filename}-thumb.{poster[0]}"), poster[1])
+
+    def _saveNFO(self, ef: str, filename: str) -> None:
+        if self.manifest is not None:
+            return self._syncNFO(ef, filename)
+
+        self._log("Generating NFO...")
+        self._store(os.path.join(ef, f"{filename}.{self._api._extensions['nfo']}"), self._api.genNFO(self.s, self.e).encode("utf-8"))
+
+    def _saveVideo(self, ef: str, filename: str, quality: Optional[int] = None, position: Optional[int] = None, replace: bool = False) -> int:
+        """
+        Download the video, retrying up to <self.retries> times.
+
+        :param quality:  The quality of the video. [Default: <self.quality>]
+        :param position: The line of the progress bar. [Default: <self.position>]
+        :param replace:  Download the video even if it exists. (The old one is only replaced once the new one is complete)
+
+        :returns: The error code of the last attempt.
+        """
+
+        quality = self.quality if quality is None else quality
+        position = self.position if position is None else position
+        s = self._api._checkValueFormat(self.s, 's')
+        e = self._api._checkValueFormat(self.e, 'e')
+        video = "video" if len(self.qualities) == 1 else f"{quality}p video"
+        if not replace and self._hasVideo(ef, filename, quality):
+            self._log(f"Skipping {video} because it already exists.")
+            return 0
+
+        self._log(f"Downloading {video}... (Might take a long time)")
+        video_dl_retries = 0
+        while True:
+            dlerrcode = self._api.getVideoData(  # Try downloading the file.
+                season=self.s,
+                episode=self.e,
+                filepath=self._videoPath(ef, filename, quality),
+                quality=quality,
+                position=position,
+                segments=self.segments,
+                min_segment_size=self.min_segment_size,
+                archive=self.archive
+            )
+            # HTTP errors are already retried by the retry policy of the API object, so only
+            # incomplete (`1`) or oversized (`2`) downloads are worth another attempt here.
+            if dlerrcode == 3:  # Retrying would not free any space.
+                self._log(f"Failed to download {video} because there is not enough free disk space.", important=True)
+                return dlerrcode
+
+            if dlerrcode not in (0, 1, 2):
+                self._log(f"Failed to download {video}. [Error {dlerrcode}]", important=True)
+                return dlerrcode
+
+            if (dlerrcode != 0) and (video_dl_retries == self.retries):  # If the maximum retries is reached, break.
+                self._log(f"Failed to download {video} and maximum retries reached.", important=True)
+                return dlerrcode
+
+            if dlerrcode != 0:  # If the download failed
+                delay = self._api.retry_policy.delay(video_dl_retries)
+                video_dl_retries += 1
+                self._retries += 1
+                self._api.telemetry.emit("retry", kind="video", season=self.s, episode=self.e, attempt=video_dl_retries, status=dlerrcode)
+                # The incomplete file is kept as `.part` so the next attempt resumes it.
+                self._log(f"Video download of S{s}E{e} ({quality}p) failed. [Error {dlerrcode}] Retrying in {delay:.1f}s... ({video_dl_retries}/{self.retries})")
+                time.sleep(delay)
+                continue
+
+            else:  # If the download is successful
+                if video_dl_retries == 1:
+                    retry_grammar = "retry"
+
+                else:
+                    retry_grammar = "retries"
+
+                self._log(f"Download successful with {video_dl_retries} {retry_grammar}.")
+                return 0
+
+    def main(self) -> int:
+        """
+        Download the episode and report how it went to the telemetry of the API object.
+
+        :returns: The exit code.
+        """
+
+        start = time.monotonic()
+        exit_code = 1
+        try:
+            exit_code = self._main()
+            return exit_code
+
+        finally:
+            if self._claimed:
+                self.archive.release()  # type: ignore
+
+            self._api.telemetry.emit(
+                "episode",
+                season = self.s,
+                episode = self.e,
+                quality = self.quality if len(self.qualities) == 1 else self.qualities,
+                exit_code = exit_code,
+                duration = time.monotonic() - start,
+                retries = self._retries
+            )
+
+    def _main(self) -> int:
+        s = self._api._checkValueFormat(self.s, 's')
+        e = self._api._checkValueFormat(self.e, 'e')
+        filename = f"Unus Annus S{self.s}E{self.e}"
+        sf = f"Season {s}"  # Season folder
+        ef = os.path.join(f"{sf}", f"Unus Annus S{self.s}E{self.e}")  # Episode folder
+
+        if "error" in self._api.getMetadata(s, e):
+            self._log("Episode not found!", important=True)
+            return 1
+
+        if self.best and "video" in self.assets:
+            self.quality = self._api.bestQuality(self.s, self.e, self.max_quality, self.max_size)
+            if self.quality is None:
+                self._log("No quality of the video is available within the limits!", important=True)
+                return 1
+
+            self.qualities = [self.quality]
+            self._log(f"Picked {self.quality}p, the best available quality.")
+
+        if self.archive is None:
+            self._log("Creating folder...")
+            os.makedirs(ef, exist_ok=True)
+
+        elif "video" in self.assets:  # The other episodes wait instead of dropping a video of this one that was cut short.
+            for quality in self.qualities:
+                self._claimed = self.archive.claim(self._videoPath(ef, filename, quality)) or self._claimed
+
+        # The subtitles, thumbnail, and NFO are small, so they are fetched
+        # at the same time as each other while the video is downloading.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            savers = {"subtitles": self._saveSubtitles, "thumbnail": self._saveThumbnail, "NFO": self._saveNFO}
+            sidecars = {
+                sidecar: executor.submit(savers[sidecar], ef, filename)
+                for sidecar in savers
+                if sidecar.lower() in self.assets
+            }
+            save = self._saveVideo if self.manifest is None else self._syncVideo
+            need = self._videoBytes(ef, filename) if "video" in self.assets else 0
+            # Held while other downloads use the space. The `.part` files tell how much of it is written. (See `API._transfer()`)
+            parts = [] if self.archive is not None else [f"{self._videoPath(ef, filename, quality)}.part" for quality in self.qualities]
+            reservation = self.disk_budget.acquire(need, parts) if "video" in self.assets else None
+            if "video" not in self.assets:
+                exit_code = 0
+
+            elif reservation is None:
+                self._log(f"Not enough free disk space for the video! ({_formatSize(need)} needed)", important=True)
+                exit_code = 3
+
+            elif len(self.qualities) == 1:
+                try:
+                    exit_code = save(ef, filename)
+
+                finally:
+                    self.disk_budget.release(reservation)
+
+            else:  # Each quality has its own progress bar and `.part` file, so they are downloaded and resumed separately.
+                try:
+                    with ThreadPoolExecutor(max_workers=len(self.qualities)) as variants:
+                        exit_codes = list(variants.map(
+                            lambda i: save(ef, filename, self.qualities[i], None if self.position is None else self.position + i),
+                            range(len(self.qualities))
+                        ))
+
+                finally:
+                    self.disk_budget.release(reservation)
+
+                exit_code = next((code for code in exit_codes if code != 0), 0)
+
+            for sidecar in sidecars:
+                try:
+                    sidecars[sidecar].result()
+
+                except CircuitOpenError:  # The CDN is down; let the scheduler stop the other episodes, like for the video.
+                    raise
+
+                except (httpx.HTTPError, ValueError, OSError) as err:
+                    self._log(f"Failed to save the {sidecar}: {err}", important=True)
+                    exit_code = exit_code or 1
+
+        if self.archive is not None and self.archive.incomplete is None:
+            self._log("Adding the files to the archive...")
+            self._flushArchive()
+
+        elif self.archive is not None:  # They are downloaded again with the video instead, so it can be resumed.
+            self._log("The other files are not added to the archive until the video is complete.")
+
+        self._log("Done!")
+        return exit_code
+
+
+class Scheduler:
+    """
+    Downloads several episodes at the same time using a shared API object.
+    """
+
+    def __init__(self, api: API, jobs: int = 1, **options):
+        """
+        :param api:     The API object shared by all episodes.
+        :param jobs:    How many episodes to download at the same time.
+        :param options: Other arguments passed to `Main`. (e.g., `quality`, `metadata_only`, `segments`)
+                        Pass a `disk_budget` to limit the space used by the running downloads together.
+        """
+
+        self.api = api
+        self.jobs = max(1, jobs)
+        self.options = options
+        # Shared by every episode, so an episode is held until the running ones leave enough space for it.
+        self.options.setdefault("disk_budget", DiskBudget())
+
+        # Free progress bar lines. Every episode gets one line per quality, after the aggregated bar on line 0.
+        quality = options.get("quality", 1080)
+        lines = 1 if isinstance(quality, (int, str)) else max(1, len(list(quality)))
+        self._positions: list[int] = [1 + slot * lines for slot in range(self.jobs - 1, -1, -1)]
+        self._positions_lock = threading.Lock()
+        self._halted: Optional[CircuitOpenError] = None  # Set when the CDN is down; the remaining episodes are skipped.
+
+    def _run(self, season: int, episode: int, **options) -> int:
+        """
+        Download one episode using a free progress bar line.
+
+        :param season:  Season number.
+        :param episode: Episode number.
+        :param options: Override the options of the scheduler for this episode. (e.g., `quality`)
+
+        :returns: The exit code of `Main.main()`.
+        """
+
+        if self._halted is not None:
+            return 1
+
+        if self.jobs == 1:  # Keep the old, verbose output.
+            _print(f"\nDownloading S{season}E{episode}...")
+            position = None
+
+        else:
+            with self._positions_lock:
+                position = self._positions.pop()
+
+        try:
+            return Main(
+                season = season,
+                episode = episode,
+                api = self.api,
+                position = position,
+                **{"verbose": self.jobs == 1, **self.options, **options}  # A `verbose` option overrides the default.
+            ).main()
+
+        except CircuitOpenError as err:  # Failing the remaining episodes one by one would not help.
+            if self._halted is None:
+                self._halted = err
+                _print(f"[E] [S{season}E{episode}] {err} Stopping; run the same command again later to continue.")
+
+            return 1
+
+        except Exception as err:  # Do not let one episode stop the whole range.
+            _print(f"[E] [S{season}E{episode}] {type(err).__name__}: {err}")
+            return 1
+
+        finally:
+            if position is not None:
+                with self._positions_lock:
+                    self._positions.append(position)
+
+    def run(self, episodes: Iterable[tuple[int, int]]) -> dict[tuple[int, int], int]:
+        """
+        Download <episodes>.
+
+        :param episodes: (season, episode) pairs to download.
+
+        :returns: A dictionary of (season, episode) -> exit code.
+        """
+
+        episodes = list(episodes)
+        results: dict[tuple[int, int], int] = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {executor.submit(self._run, season, episode): (season, episode) for season, episode in episodes}
+            if TQDM_INSTALLED and self.jobs > 1:  # Aggregated progress of the whole range.
+                with tqdm(total=len(futures), desc="Episodes", unit="ep", position=0) as bar:
+                    for future in futures:
+                        results[futures[future]] = future.result()
+                        bar.update(1)
+
+            else:
+                for future in futures:
+                    results[futures[future]] = future.result()
+
+        return {episode: results[episode] for episode in episodes}
+
+    def drain(self, queue: JobQueue, daemon: bool = False, poll_interval: float = 10) -> dict[tuple[int, int], int]:
+        """
+        Download the jobs of <queue>, <self.jobs> at a time, until it is empty.
+
+        If the CDN goes down, the running job is put back in the queue. Jobs left running by a
+        worker that was killed are queued again once their heartbeat is stale. (See `JobQueue.recover()`)
+
+        :param queue:         The queue to drain.
+        :param daemon:        Keep waiting for new jobs when the queue is empty, and wait for the CDN to come back if it goes down.
+        :param poll_interval: How often (in seconds) to check for new jobs in daemon mode.
+
+        :returns: A dictionary of (season, episode) -> exit code of the jobs that were run.
+        """
+
+        worker = f"{os.getpid()}-{os.urandom(4).hex()}"
+        results: dict[tuple[int, int], int] = {}
+        stop = threading.Event()
+
+        def heartbeat() -> None:
+            while not stop.wait(JobQueue.STALE_AFTER / 4):
+                queue.heartbeat(worker)
+
+        def work() -> None:
+            while not stop.is_set():
+                queue.recover()
+                job = queue.claim(worker)
+                if job is None:
+                    if not daemon:
+                        return
+
+                    stop.wait(poll_interval)
+                    continue
+
+                exit_code = self._run(
+                    job["season"],
+                    job["episode"],
+                    quality = _parseQuality(str(job["quality"])),
+                    assets = job["assets"].split(','),
+                    max_quality = job["max_quality"],
+                    max_size = job["max_size"]
+                )
+                if self._halted is not None:  # The CDN is down; keep the job for later.
+                    queue.release(job["id"])
+                    if not daemon:
+                        return
+
+                    stop.wait(self.api.retry_policy.cooldown)
+                    self._halted = None
+                    continue
+
+                queue.finish(job["id"], exit_code)
+                results[(job["season"], job["episode"])] = exit_code
+
+        threading.Thread(target=heartbeat, name="queue-heartbeat", daemon=True).start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                for future in [executor.submit(work) for _ in range(self.jobs)]:
+                    future.result()
+
+        finally:
+            stop.set()
+
+        return results
+
+    @staticmethod
+    def printSummary(results: dict[tuple[int, int], int]) -> None:
+        """
+        Print the exit code of every episode.
+
+        :param results: The return value of `Scheduler.run()`.
+        """
+
+        failed = [episode for episode in results if results[episode] != 0]
+        print()
+        print("Season | Episode | Exit Code")
+        for season, episode in results:
+            print(f"{str(season).ljust(6)} | {str(episode).ljust(7)} | {results[(season, episode)]}")
+
+        print()
+        print(f"{len(results) - len(failed)} of {len(results)} episodes downloaded successfully.")
+        if failed:
+            print("Failed: " + ", ".join(f"S{season}E{episode}" for season, episode in failed))
+
+
+VIDEO_PATTERN: Final[re.Pattern] = re.compile(r"^Unus Annus S(\d+)E(\d+)(?: - (\d+)p)?\.mp4$")
+
+
+def verifyLibrary(root: str = '.', season: Optional[int] = None, jobs: Optional[int] = None, record: bool = False) -> dict[str, list[tuple[int, int, str]]]:
+    """
+    Hash every video of the library again and compare it with the checksum saved when it was downloaded.
+
+    The videos are hashed in parallel using memory-mapped reads. (See `_hashFile()`)
+
+    :param root:   The library folder.
+    :param season: Only check this season.
+    :param jobs:   How many videos to hash at the same time. [Default: the number of CPUs]
+    :param record: Save the checksum of the videos that do not have one yet.
+
+    :returns: A dictionary of `ok`, `mismatch`, `unverified`, and `recorded` -> list of (season, episode, path).
+    """
+
+    videos: list[tuple[int, int, str]] = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            match = VIDEO_PATTERN.match(filename)
+            if match is not None and (season is None or int(match.group(1)) == season):
+                videos.append((int(match.group(1)), int(match.group(2)), os.path.join(dirpath, filename)))
+
+    videos.sort()
+
+    def check(video: tuple[int, int, str]) -> str:
+        expected = _BaseAPI._readChecksum(video[2])
+        if expected is None:
+            if not record:
+                return "unverified"
+
+            _BaseAPI._writeChecksum(video[2], _hashFile(video[2]).hexdigest())
+            return "recorded"
+
+        if expected[0] == "blake3" and not BLAKE3_INSTALLED:
+            return "unverified"
+
+        return "ok" if _hashFile(video[2], _newHasher(expected[0])).hexdigest() == expected[1] else "mismatch"
+
+    results: dict[str, list[tuple[int, int, str]]] = {"ok": [], "mismatch": [], "unverified": [], "recorded": []}
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        statuses = executor.map(check, videos)
+        if TQDM_INSTALLED:
+            statuses = tqdm(statuses, total=len(videos), desc="Verifying", unit="file")
+
+        for video, status in zip(videos, statuses):
+            results[status].append(video)
+
+    return results
+
+
+FICLONE: Final[int] = 0x40049409  # The `ioctl` that makes a file share the data of another. (Btrfs, XFS, ...)
+EPISODE_PATTERN: Final[re.Pattern] = re.compile(r"(?<![A-Za-z0-9])S(\d{1,2})E(\d{1,3})(?!\d)", re.IGNORECASE)
+QUALITY_PATTERN: Final[re.Pattern] = re.compile(r" - (\d+)p$")
+THUMBNAIL_WIDTH_PATTERN: Final[re.Pattern] = re.compile(r"-thumb(-\d+)$")  # The smaller thumbnails of `PostProcessor`.
+LANGUAGE_PATTERN: Final[re.Pattern] = re.compile(r"\.([a-z]{2,3}(?:-[A-Za-z]+)?)$")
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """
+    Create <dst> sharing the data of <src>, without copying it. (Only works on filesystems like Btrfs and XFS)
+
+    :returns: `True` if the reflink is created, or `False` if it is not supported.
+    """
+
+    if not REFLINK_SUPPORTED:
+        return False
+
+    with open(src, 'rb') as source, open(dst, 'wb') as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+            return True
+
+        except OSError:  # Not supported by the filesystem, or on different filesystems.
+            return False
+
+
+def _placeFile(src: str, dst: str, keep: bool = False) -> str:
+    """
+    Put <src> at <dst>, without copying its data if possible.
+
+    Moves are tried as a rename, and kept files as a hardlink. If that is not possible (e.g., the
+    destination is on another filesystem), a reflink and then a normal copy are tried instead.
+
+    :param src:  The file to place.
+    :param dst:  Where to place it.
+    :param keep: Keep <src>. (Otherwise it is moved)
+
+    :returns: How the file is placed: `rename`, `hardlink`, `reflink`, or `copy`.
+    """
+
+    try:
+        if keep:
+            os.link(src, dst)
+            return "hardlink"
+
+        os.rename(src, dst)
+        return "rename"
+
+    except OSError as err:
+        if not keep and err.errno != errno.EXDEV:
+            raise
+
+    # The copy is written next to <dst> first, so an interrupted copy is never mistaken for the file.
+    method = "reflink" if _reflink(src, f"{dst}.tmp") else "copy"
+    if method == "copy":
+        shutil.copyfile(src, f"{dst}.tmp")
+
+    shutil.copystat(src, f"{dst}.tmp")
+    os.replace(f"{dst}.tmp", dst)
+    if not keep:
+        os.remove(src)
+
+    return method
+
+
+def _organizedName(filename: str) -> Optional[tuple[int, int, str]]:
+    """
+    Find out where a file of another download tree belongs in the library.
+
+    The season and episode are taken from the `SxEy` part of the filename. (e.g., `S01E005 - Title.mp4`)
+
+    :param filename: The name of the file.
+
+    :returns: The season, the episode, and the new filename, or `None` if the file is not part of an episode.
+    """
+
+    match = EPISODE_PATTERN.search(filename)
+    if match is None or filename.endswith((".part", ".part.json", ".tmp")):
+        return None
+
+    season, episode = int(match.group(1)), int(match.group(2))
+    name = f"Unus Annus S{season}E{episode}"
+    stem, _, extension = filename.rpartition('.')
+    extension = extension.lower()
+    if extension in ("sha256", "blake3"):  # Checksums follow their video.
+        video = _organizedName(stem)
+        return None if video is None else (season, episode, f"{video[2]}.{extension}")
+
+    if extension in ("mp4", "mkv", "webm"):
+        quality = QUALITY_PATTERN.search(stem)
+        return (season, episode, f"{name}{'' if quality is None else quality.group(0)}.{extension}")
+
+    if extension in ("vtt", "srt", "ass"):
+        language = LANGUAGE_PATTERN.search(stem)
+        return (season, episode, f"{name}.{'en' if language is None else language.group(1)}.{extension}")
+
+    if extension in ("jpg", "jpeg", "webp", "png"):
+        width = THUMBNAIL_WIDTH_PATTERN.search(stem)
+        return (season, episode, f"{name}-thumb{'' if width is None else width.group(1)}.{extension}")
+
+    if extension == "nfo":
+        return (season, episode, f"{name}.nfo")
+
+    return None  # e.g., the JSON metadata of the old downloader. (Use the `nfo` command instead)
+
+
+def planLibrary(source: str, root: str = '.') -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """
+    Scan <source> once and plan where every file of an episode goes in the library.
+
+    :param source: The download tree to import. (Can be the library itself, to fix the names of its files)
+    :param root:   The library folder.
+
+    :returns: The (source, destination) pairs to place, and the pairs that are skipped
+              because the destination already exists.
+    """
+
+    plan: list[tuple[str, str]] = []
+    skipped: list[tuple[str, str]] = []
+    destinations: set[str] = set()
+    stack = [source]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+
+                placement = _organizedName(entry.name)
+                if placement is None:
+                    continue
+
+                season, episode, filename = placement
+                dst = os.path.join(
+                    root,
+                    f"Season {_BaseAPI._checkValueFormat(season, 's')}",
+                    f"Unus Annus S{season}E{episode}",
+                    filename
+                )
+                if os.path.abspath(dst) == os.path.abspath(entry.path):  # Already in place.
+                    continue
+
+                if dst in destinations or os.path.exists(dst):
+                    skipped.append((entry.path, dst))
+                    continue
+
+                destinations.add(dst)
+                plan.append((entry.path, dst))
+
+    return (plan, skipped)
+
+
+def organizeLibrary(
+    source: str,
+    root: str = '.',
+    keep: bool = False,
+    jobs: Optional[int] = None,
+    plan: Optional[list[tuple[str, str]]] = None
+) -> dict[str, list[tuple[str, str]]]:
+    """
+    Import the files of another download tree into the `Season XX/Unus Annus SxEy` layout used by `Main`.
+
+    The files are placed in parallel, and their data is not copied unless they are on another filesystem.
+    (See `_placeFile()`) Checksums are written again so they name the new file.
+
+    :param source: The download tree to import.
+    :param root:   The library folder.
+    :param keep:   Keep the files in <source>. (They are hardlinked instead of moved)
+    :param jobs:   How many files to place at the same time. [Default: 16]
+    :param plan:   The plan from `planLibrary()`, if it has already been made.
+
+    :returns: A dictionary of `rename`, `hardlink`, `reflink`, `copy`, `skipped`, and `failed` -> list of (source, destination).
+    """
+
+    if plan is None:
+        plan, skipped = planLibrary(source, root)
+
+    else:
+        skipped = []
+
+    for folder in sorted({os.path.dirname(dst) for _, dst in plan}):
+        os.makedirs(folder, exist_ok=True)
+
+    def place(entry: tuple[str, str]) -> str:
+        src, dst = entry
+        try:
+            if dst.endswith((".sha256", ".blake3")):  # The checksum file contains the name of the video, so it is written again.
+                with open(src, 'r', encoding="utf-8") as f:
+                    digest = f.read().partition(' ')[0].strip().lower()
+
+                _BaseAPI._writeChecksum(dst.rpartition('.')[0], digest, dst.rpartition('.')[2])
+                if not keep:
+                    os.remove(src)
+
+                return "copy"
+
+            return _placeFile(src, dst, keep)
+
+        except OSError as err:
+            _print(f"[E] Unable to place `{src}`: {err}")
+            return "failed"
+
+    results: dict[str, list[tuple[str, str]]] = {"rename": [], "hardlink": [], "reflink": [], "copy": [], "skipped": skipped, "failed": []}
+    with ThreadPoolExecutor(max_workers=jobs or 16) as executor:
+        methods = executor.map(place, plan)
+        if TQDM_INSTALLED:
+            methods = tqdm(methods, total=len(plan), desc="Organizing", unit="file")
+
+        for entry, method in zip(plan, methods):
+            results[method].append(entry)
+
+    return results
+
+
+SUBTITLE_FORMATS: Final[tuple[str, ...]] = ("srt", "ass")  # What the `.vtt` subtitles can be converted to.
+THUMBNAIL_WIDTHS: Final[tuple[int, ...]] = (320, 640)  # The widths (in pixels) of the smaller thumbnails.
+SUBTITLE_PATTERN: Final[re.Pattern] = re.compile(r"^Unus Annus S(\d+)E(\d+)\.[\w-]+\.vtt$")
+THUMBNAIL_PATTERN: Final[re.Pattern] = re.compile(r"^Unus Annus S(\d+)E(\d+)-thumb\.(?:jpg|jpeg|png|webp)$")
+_CUE_TIMING_PATTERN: Final[re.Pattern] = re.compile(r"^((?:\d+:)?\d{2}:\d{2}\.\d{3})[ \t]+-->[ \t]+((?:\d+:)?\d{2}:\d{2}\.\d{3})")
+_CUE_TAG_PATTERN: Final[re.Pattern] = re.compile(r"<(/?)([a-z]*)[^>]*>")  # Also matches the timestamps of karaoke cues. (e.g., `<00:00:01.000>`)
+
+# The header of the ASS subtitles. Every cue uses the `Default` style.
+ASS_TEMPLATE: Final[str] = """[Script Info]
+Title: {title}
+ScriptType: v4.00+
+WrapStyle: 0
+PlayResX: 1920
+PlayResY: 1080
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,64,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,3,1,2,60,60,50,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def _vttTime(value: str) -> int:
+    """
+    :returns: A WebVTT timestamp (`hh:mm:ss.ttt` or `mm:ss.ttt`) in milliseconds.
+    """
+
+    parts = value.split(':')
+    seconds, _, milliseconds = parts[-1].partition('.')
+    hours = int(parts[0]) if len(parts) == 3 else 0
+    return ((hours * 60 + int(parts[-2])) * 60 + int(seconds)) * 1000 + int(milliseconds)
+
+
+def _parseVTT(text: str) -> list[tuple[int, int, str]]:
+    """
+    Parse the cues of WebVTT subtitles. The header, `NOTE`, `STYLE`, and `REGION` blocks are skipped.
+
+    :param text: The WebVTT subtitles.
+
+    :returns: A list of (start, end, text) of every cue. The times are in milliseconds, and the text keeps its tags.
+    """
+
+    cues: list[tuple[int, int, str]] = []
+    text = text.lstrip("\ufeff").replace("\r\n", '\n').replace('\r', '\n')
+    for block in re.split(r"\n[ \t]*\n", text):
+        lines = block.strip('\n').split('\n')
+        for i, line in enumerate(lines[:2]):  # The timing line can follow a cue identifier.
+            match = _CUE_TIMING_PATTERN.match(line)
+            if match is not None:
+                cues.append((_vttTime(match.group(1)), _vttTime(match.group(2)), '\n'.join(lines[i + 1:])))
+                break
+
+    return cues
+
+
+def _cueText(cue: str, tags: dict[str, tuple[str, str]]) -> str:
+    """
+    Convert the text of a WebVTT cue to plain text.
+
+    :param cue:  The text of the cue.
+    :param tags: Tag name -> (opening, closing) replacement. Every other tag (classes, voices, timestamps, ...) is dropped.
+
+    :returns: The text, with its HTML entities unescaped.
+    """
+
+    return html.unescape(_CUE_TAG_PATTERN.sub(lambda match: tags.get(match.group(2), ('', ''))[1 if match.group(1) else 0], cue))
+
+
+def vttToSRT(text: str) -> str:
+    """
+    Convert WebVTT subtitles to SubRip. (`.srt`)
+
+    :param text: The WebVTT subtitles.
+
+    :returns: The SubRip subtitles. Bold, italic, and underline are kept.
+    """
+
+    def timestamp(ms: int) -> str:
+        return f"{ms // 3600000:02}:{ms // 60000 % 60:02}:{ms // 1000 % 60:02},{ms % 1000:03}"
+
+    entries: list[str] = []
+    for start, end, cue in _parseVTT(text):
+        cue = _cueText(cue, {tag: (f"<{tag}>", f"</{tag}>") for tag in ('b', 'i', 'u')}).strip()
+        if cue:  # An empty cue would end the entry early.
+            entries.append(f"{len(entries) + 1}\n{timestamp(start)} --> {timestamp(end)}\n{cue}\n")
+
+    return '\n'.join(entries)
+
+
+def vttToASS(text: str, title: str = '') -> str:
+    """
+    Convert WebVTT subtitles to Advanced SubStation Alpha. (`.ass`)
+
+    :param text:  The WebVTT subtitles.
+    :param title: The title in the header of the subtitles.
+
+    :returns: The ASS subtitles. Bold, italic, and underline are kept.
+    """
+
+    def timestamp(ms: int) -> str:
+        return f"{ms // 3600000}:{ms // 60000 % 60:02}:{ms // 1000 % 60:02}.{ms % 1000 // 10:02}"
+
+    events: list[str] = []
+    for start, end, cue in _parseVTT(text):
+        cue = _cueText(cue, {tag: (f"{{\\{tag}1}}", f"{{\\{tag}0}}") for tag in ('b', 'i', 'u')}).strip().replace('\n', "\\N")
+        if cue:
+            events.append(f"Dialogue: 0,{timestamp(start)},{timestamp(end)},Default,,0,0,0,,{cue}\n")
+
+    return ASS_TEMPLATE.format(title=title) + ''.join(events)
+
+
+def _thumbnailVariantPath(path: str, width: int) -> str:
+    """
+    :returns: The path of the thumbnail <path> resized to <width>. (e.g., `Unus Annus S1E1-thumb-320.jpg`)
+    """
+
+    stem, _, extension = path.rpartition('.')
+    return f"{stem}-{width}.{extension}"
+
+
+def _resizeThumbnail(path: str, widths: Iterable[int]) -> list[str]:
+    """
+    Write smaller copies of a thumbnail. (Requires the `Pillow` module)
+
+    Widths that are not smaller than the thumbnail get an unchanged copy, so every variant exists.
+
+    :param path:   The path of the thumbnail.
+    :param widths: The widths of the copies in pixels.
+
+    :returns: The paths of the written files.
+    """
+
+    written: list[str] = []
+    with Image.open(path) as image:
+        image_format = image.format
+        width, height = image.size
+        smaller = [w for w in widths if w < width]
+        if smaller:  # JPEGs are decoded at the smallest scale that is still big enough, which is much faster.
+            image.draft("RGB", (max(smaller), max(smaller) * height // width))
+            image.load()
+
+        for w in widths:
+            dst = _thumbnailVariantPath(path, w)
+            if w >= width:
+                shutil.copyfile(path, f"{dst}.tmp")
+
+            else:
+                variant = image.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                if image_format == "JPEG" and variant.mode not in ("RGB", 'L'):
+                    variant = variant.convert("RGB")
+
+                variant.save(f"{dst}.tmp", format=image_format, quality=85)
+
+            os.replace(f"{dst}.tmp", dst)
+            written.append(dst)
+
+    return written
+
+
+def _postprocessOutputs(path: str, formats: Iterable[str], widths: Iterable[int]) -> list[str]:
+    """
+    :returns: The paths of the files that are made from the subtitles or thumbnail <path>.
+    """
+
+    if path.endswith(".vtt"):
+        return [f"{path[:-4]}.{subtitle_format}" for subtitle_format in formats]
+
+    return [_thumbnailVariantPath(path, width) for width in widths]
+
+
+def _postprocessFile(path: str, formats: tuple[str, ...], widths: tuple[int, ...]) -> list[str]:
+    """
+    Convert a subtitle file, or resize a thumbnail. (Runs in a worker process of `PostProcessor`)
+
+    :param path:    The path of the `.vtt` subtitles or the thumbnail.
+    :param formats: What to convert the subtitles to. (See `SUBTITLE_FORMATS`)
+    :param widths:  The widths of the smaller thumbnails.
+
+    :returns: The paths of the written files.
+    """
+
+    if not path.endswith(".vtt"):
+        return _resizeThumbnail(path, widths)
+
+    with open(path, 'r', encoding="utf-8-sig", errors="replace") as f:
+        text = f.read()
+
+    written: list[str] = []
+    for subtitle_format, dst in zip(formats, _postprocessOutputs(path, formats, widths)):
+        converted = vttToSRT(text) if subtitle_format == "srt" else vttToASS(text, os.path.basename(path).partition('.')[0])
+        Main._writeFile(dst, converted.encode("utf-8"))
+        written.append(dst)
+
+    return written
+
+
+class PostProcessor:
+    """
+    Converts the subtitles to SRT/ASS and writes smaller copies of the thumbnails, on a pool of processes.
+
+    Files are only handed to the pool, so the downloads go on while they are processed, and the
+    CPU work never holds up the network. Files whose outputs are newer than them are skipped.
+    The pool is started when the first file is submitted, and stopped by `close()`.
+    """
+
+    def __init__(
+        self,
+        formats: Iterable[str] = SUBTITLE_FORMATS,
+        widths: Iterable[int] = THUMBNAIL_WIDTHS,
+        jobs: Optional[int] = None,
+        overwrite: bool = False
+    ):
+        """
+        :param formats:   What to convert the subtitles to. (See `SUBTITLE_FORMATS`)
+        :param widths:    The widths (in pixels) of the smaller thumbnails. (Requires the `Pillow` module)
+        :param jobs:      How many processes to use. [Default: the number of CPUs]
+        :param overwrite: Process the files even if their outputs are up to date.
+        """
+
+        self.formats = tuple(dict.fromkeys(formats))
+        if not set(self.formats).issubset(SUBTITLE_FORMATS):
+            raise ValueError(f"Unknown subtitle formats: {', '.join(sorted(set(self.formats).difference(SUBTITLE_FORMATS)))}")
+
+        self.widths = tuple(sorted(set(widths)))
+        if self.widths and not PILLOW_INSTALLED:
+            print("[i] Pillow module is not installed, so the thumbnails will not be resized.")
+            self.widths = ()
+
+        self.jobs = jobs or os.cpu_count() or 1
+        self.overwrite = overwrite
+        self.written: list[str] = []
+        self.failed: list[tuple[str, str]] = []  # (path, error)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: set[Future] = set()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "PostProcessor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _isStale(self, path: str) -> bool:
+        """
+        :returns: `True` if an output of <path> is missing or older than it.
+        """
+
+        try:
+            mtime = os.path.getmtime(path)
+            return any(os.path.getmtime(output) < mtime for output in _postprocessOutputs(path, self.formats, self.widths))
+
+        except OSError:  # The output does not exist.
+            return True
+
+    def submit(self, path: str) -> Optional[Future]:
+        """
+        Process <path> in the background if it is a subtitle or thumbnail file. (See `SUBTITLE_PATTERN` and `THUMBNAIL_PATTERN`)
+
+        :param path: The path of the file.
+
+        :returns: The future of the job, or `None` if there is nothing to do.
+        """
+
+        name = os.path.basename(path)
+        if not (self.formats and SUBTITLE_PATTERN.match(name)) and not (self.widths and THUMBNAIL_PATTERN.match(name)):
+            return None
+
+        if not self.overwrite and not self._isStale(path):
+            return None
+
+        with self._lock:
+            if self._executor is None:  # `spawn`, because forking a process with running download threads is not safe.
+                self._executor = ProcessPoolExecutor(max_workers=self.jobs, mp_context=multiprocessing.get_context("spawn"))
+
+            future = self._executor.submit(_postprocessFile, path, self.formats, self.widths)
+            self._futures.add(future)
+
+        future.add_done_callback(lambda future: self._done(path, future))
+        return future
+
+    def _done(self, path: str, future: Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+            try:
+                self.written.extend(future.result())
+
+            except Exception as err:  # e.g., a broken image. The other files are still processed.
+                self.failed.append((path, f"{type(err).__name__}: {err}"))
+                _print(f"[W] Unable to post-process `{path}`: {err}")
+
+    def close(self) -> None:
+        """
+        Wait for the submitted files, then stop the pool.
+        """
+
+        with self._lock:
+            futures = list(self._futures)
+
+        if futures:
+            _print(f"[i] Waiting for {len(futures)} files to be post-processed...")
+            for _ in as_completed(futures):
+                pass
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def postprocessLibrary(root: str = '.', season: Optional[int] = None, postprocessor: Optional[PostProcessor] = None) -> dict[str, list]:
+    """
+    Convert the subtitles and resize the thumbnails that are already in the library.
+
+    :param root:          The library folder.
+    :param season:        Only process this season.
+    :param postprocessor: What to make, and how many processes to use. (It is closed at the end) [Default: `PostProcessor()`]
+
+    :returns: A dictionary of `written` -> list of paths, and `failed` -> list of (path, error).
+    """
+
+    with postprocessor or PostProcessor() as processor:
+        futures: list[Future] = []
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                match = SUBTITLE_PATTERN.match(filename) or THUMBNAIL_PATTERN.match(filename)
+                if match is not None and (season is None or int(match.group(1)) == season):
+                    future = processor.submit(os.path.join(dirpath, filename))
+                    if future is not None:
+                        futures.append(future)
+
+        done = as_completed(futures)
+        if TQDM_INSTALLED:
+            done = tqdm(done, total=len(futures), desc="Post-processing", unit="file")
+
+        for _ in done:
+            pass
+
+    return {"written": processor.written, "failed": processor.failed}
+
+
+_VALUE_OPTIONS: Final[tuple[str, ...]] = ("--quality", "--jobs", "--max-per-host", "--segments", "--min-segment-size", "--manifest", "--from-report", "--limit-rate", "--limit-rate-file", "--request-rate", "--telemetry", "--metrics-port", "--retries", "--assets", "--queue", "--max-quality", "--max-size", "--disk-budget", "--subtitle-formats", "--thumbnail-widths", "--mirrors")
+
+
+def _getArguments() -> list[str]:
+    """
+    Get the positional command-line arguments. (Everything that is not an option or the value of an option)
+
+    :returns: The positional arguments.
+    """
+
+    args: list[str] = []
+    skip = False
+    for arg in sys.argv[1:]:
+        if skip:
+            skip = False
+
+        elif arg in _VALUE_OPTIONS:
+            skip = True  # The next argument is the value of this option.
+
+        elif not arg.startswith("--"):
+            args.append(arg)
+
+    return args
+
+
+def _getOption(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Get the value of a command-line option. (e.g., `--jobs 4` or `--jobs=4`)
+
+    :param name:    The name of the option, including the dashes.
+    :param default: The value to return if the option is not set.
+
+    :returns: The value of the option.
+    """
+
+    for i, arg in enumerate(sys.argv):
+        if arg == name and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+
+        if arg.startswith(f"{name}="):
+            return arg.partition('=')[2]
+
+    return default
+
+
+def _printUsage() -> None:
+    print(f"USAGE: {sys.argv[0]} <season number> <episode number> <optional quality>")
+    print(f"USAGE: {sys.argv[0]} <season number> <episode number range> <optional quality>")
+    print(f"USAGE: {sys.argv[0]} sync <optional season number> <optional episode number or range> <optional quality>")
+    print(f"USAGE: {sys.argv[0]} --from-report <report.json>")
+    print(f"USAGE: {sys.argv[0]} nfo <optional season number>")
+    print(f"USAGE: {sys.argv[0]} verify <optional season number>")
+    print(f"USAGE: {sys.argv[0]} organize <download folder> <optional library folder>")
+    print(f"USAGE: {sys.argv[0]} postprocess <optional season number>")
+    print(f"USAGE: {sys.argv[0]} queue add <season number> <optional episode number or range> <optional quality>")
+    print(f"USAGE: {sys.argv[0]} queue pause|resume <optional season number> <optional episode number or range>")
+    print(f"USAGE: {sys.argv[0]} queue list")
+    print(f"USAGE: {sys.argv[0]} queue work")
+    print()
+    print("EXAMPLES:")
+    print(f"    {sys.argv[0]} 1 3        # Downloads Season 1 Episode 3")
+    print(f"    {sys.argv[0]} 0 6 720    # Downloads Season 0 Episode 6 in 720p")
+    print(f"    {sys.argv[0]} 1 2-5      # Downloads Season 1 Episodes 2, 3, 4, and 5.")
+    print(f"    {sys.argv[0]} 1 7 2160,720  # Downloads Season 1 Episode 7 in both 2160p and 720p.")
+    print(f"    {sys.argv[0]} 1 1-50 --max-quality 1440 --max-size 2G  # The best quality up to 1440p that is smaller than 2 GiB.")
+    print(f"    {sys.argv[0]} sync       # Downloads everything that is new or changed since the last sync.")
+    print(f"    {sys.argv[0]} sync 0     # Same as above, but only for Season 0.")
+    print(f"    {sys.argv[0]} nfo        # (Re)writes the NFO of every episode using the cached catalog.")
+    print(f"    {sys.argv[0]} verify     # Checks the videos against their checksums and downloads the corrupted ones again.")
+    print(f"    {sys.argv[0]} organize ~/Downloads/TUAA --dry-run  # Shows where the files of another download tree would go.")
+    print(f"    {sys.argv[0]} 1 1-368 --archive  # Downloads Season 1 straight into `Season 01.tar`.")
+    print(f"    {sys.argv[0]} 1 1-368 --mirrors http://cache.lan:8080  # Downloads from the LAN cache, or the CDN if it is slower or down.")
+    print(f"    {sys.argv[0]} 1 1-50 --postprocess  # Also converts the subtitles to SRT/ASS and writes smaller thumbnails.")
+    print(f"    {sys.argv[0]} postprocess  # Does the same for the episodes that are already in the library.")
+    print(f"    {sys.argv[0]} queue add 1 1-100  # Adds Season 1 Episodes 1 to 100 to the download queue.")
+    print(f"    {sys.argv[0]} queue work --jobs 4 --daemon  # Downloads the queued episodes, and waits for new ones.")
+    print()
+    print("OPTIONS:")
+    print("    --quality <q>      Same as the <quality> argument. (Useful with `sync`)")
+    print("                       Use a comma-separated list to download several qualities. (e.g., `2160,720`)")
+    print("                       Use `best` to download the highest quality that is available.")
+    print("    --max-quality <q>  Download the best available quality up to <q>. (Implies `--quality best`)")
+    print("    --max-size <size>  Download the best available quality that is smaller than <size>. (e.g., `2G`)")
+    print("    --metadata-only    Do not download the videos.")
+    print("    --refresh-catalog  Download the site catalog again instead of using the cached copy.")
+    print("    --http2            Use HTTP/2. (Requires `pip install httpx[http2]`)")
+    print("    --mirrors <list>   Comma-separated mirrors of the CDN. (e.g., a LAN cache) Every file is downloaded from the fastest one,")
+    print("                       and moved to another one if it fails or slows down.")
+    print("    --jobs <n>         Download <n> episodes at the same time. [Default: 1]")
+    print("    --max-per-host <n> Maximum number of connections to a single host.")
+    print("    --segments <n>     Download each video over up to <n> connections in parallel. [Default: 1]")
+    print("    --min-segment-size <size>  Minimum size of a segment. (e.g., `16M`) [Default: 8M]")
+    print(f"    --manifest <path>  The manifest used by `sync`. [Default: {MANIFEST_PATH}]")
+    print("    --limit-rate <size>   Limit the total download speed per second. (e.g., `20M`)")
+    print("    --limit-rate-file <path>  Read the speed limit from a file; edit it to change the limit while running.")
+    print("    --request-rate <n>    Limit the number of requests per second.")
+    print("    --retries <n>      How many times a failed request or an incomplete download is retried. [Default: 3]")
+    print("    --disk-budget <size>  Maximum disk space used by the videos that are downloading at the same time. (e.g., `20G`)")
+    print("    --from-report <path>  Download the episodes listed in a report of `missing_episodes_checker.py --json`.")
+    print("    --record           With `verify`, save the checksum of the videos that do not have one.")
+    print("    --dry-run          With `organize`, only show where every file would go.")
+    print("    --keep             With `organize`, keep the original files. (They are hardlinked when possible)")
+    print("    --archive          Stream the files into `Season XX.tar` instead of the episode folders. (Not with `sync`)")
+    print("    --postprocess      Convert the subtitles and resize the thumbnails in the background while downloading.")
+    print(f"    --subtitle-formats <list>  What to convert the subtitles to, or `none`. [Default: {','.join(SUBTITLE_FORMATS)}]")
+    print(f"    --thumbnail-widths <list>  The widths of the smaller thumbnails, or `none`. (Requires Pillow) [Default: {','.join(map(str, THUMBNAIL_WIDTHS))}]")
+    print("    --overwrite        With `postprocess`, write the converted files again even if they are up to date.")
+    print("    --assets <list>    Only save these files. (Comma-separated: `video`, `subtitles`, `thumbnail`, `nfo`)")
+    print(f"    --queue <path>     The journal used by `queue`. [Default: {QUEUE_PATH}]")
+    print("    --daemon           With `queue work`, keep waiting for new jobs when the queue is empty.")
+    print("    --telemetry <path>    Append the request, download, and episode events to a JSON-lines file.")
+    print("    --metrics-port <port> Serve Prometheus metrics on http://127.0.0.1:<port>/metrics while running.")
+    print()
+    print("AVAILABLE QUALITIES:")
+    print('p, '.join(map(str, API()._video_qualities)) + 'p')
+
+
+def _parseEpisodes(value: str) -> list[int]:
+    """
+    Parse an episode number or a range of episode numbers. (e.g., `26`, `50-60`, or `60-50`)
+
+    :param value: The episode number or range.
+
+    :returns: The list of episode numbers.
+    """
+
+    if '-' not in value:
+        return [int(value)]
+
+    first, last = int(value.partition('-')[0]), int(value.partition('-')[2])
+    step = -1 if first > last else 1  # Generate a range object with step of -1 if it is decrementing.
+    return list(range(first, last + step, step))
+
+
+def _parseQuality(quality: str, max_quality: Optional[str] = None, max_size: Optional[str] = None) -> int | str | list[int]:
+    """
+    Parse the quality given on the command line. (e.g., `1080`, `2160,720`, or `best`)
+
+    :param quality:     The quality, or a comma-separated list of qualities.
+    :param max_quality: The value of `--max-quality`, which implies `best`.
+    :param max_size:    The value of `--max-size`, which implies `best`.
+
+    :returns: The quality argument of `Main`.
+
+    :raises ValueError: If <quality> is not a quality.
+    """
+
+    if quality == "best" or max_quality is not None or max_size is not None:
+        return "best"  # Picked from the renditions that are available on the CDN.
+
+    qualities = [int(value) for value in quality.split(',')]  # Several qualities can be given at once.
+    return qualities[0] if len(qualities) == 1 else qualities
+
+
+def _cliAPI(jobs: int, segments: int, max_per_host: Optional[int]) -> API:
+    """
+    Create the API object used by the command-line interface.
+
+    :param jobs:         How many episodes are downloaded at the same time.
+    :param segments:     How many connections are used per video.
+    :param max_per_host: Maximum number of connections to a single host.
+
+    :returns: The API object.
+    """
+
+    mirrors = [mirror for mirror in (_getOption("--mirrors") or '').split(',') if mirror]
+    api = API(
+        http2 = "--http2" in sys.argv,
+        max_connections = max(10, jobs * (segments + 1)),
+        max_keepalive_connections = max(10, jobs * (segments + 1)),
+        max_connections_per_host = max_per_host,
+        cdn = [CDN_URL] + [mirror for mirror in mirrors if mirror.rstrip('/') != CDN_URL]  # The URLs are still built on the CDN.
+    )
+    if "--refresh-catalog" in sys.argv:
+        api.catalog.refresh(force=True)
+
+    if len(api.mirrors) > 1:
+        results = api.probeMirrors()
+        for mirror in api.mirrors.ranked():
+            result = results[mirror]
+            if result is None:  # `MirrorSet.fail()` has warned about it already.
+                continue
+
+            if result[1] is None:
+                print(f"[i] {mirror}: {round(result[0] * 1000)} ms (the test video is missing)")
+
+            else:
+                print(f"[i] {mirror}: {round(result[0] * 1000)} ms, {_formatSize(result[1])}/s")
+
+    return api
+
+
+def _cliEstimate(api: API, targets: list[tuple[int, int]], options: dict[str, Any]) -> None:
+    """
+    Print the size of the videos of a range before downloading it.
+    The episodes are probed with HEAD requests, and the results are cached by the API object.
+
+    :param api:     The API object used for the download.
+    :param targets: (season, episode) pairs to download.
+    :param options: The options passed to `Scheduler`.
+    """
+
+    if len(targets) < 2 or options.get("metadata_only") or "video" not in options.get("assets", ASSETS):
+        return
+
+    try:
+        total, unavailable = api.estimateSize(targets, options["quality"], options.get("max_quality"), options.get("max_size"))
+
+    except httpx.HTTPError as err:
+        print(f"[W] Unable to estimate the download size: {err}")
+        return
+
+    print(f"Estimated size of the videos: {_formatSize(total)} ({len(targets) - len(unavailable)} videos)")
+    free = _freeSpace(os.path.join('.', '.'))
+    if total > free:
+        print(f"[W] Only {_formatSize(free)} of disk space is free, so some videos will not fit unless they are already downloaded.")
+    if unavailable:
+        print(f"[W] {len(unavailable)} videos are not available in the requested quality: " + ", ".join(f"S{s}E{e}" for s, e in unavailable))
+
+
+def _cliPostProcessor(jobs: Optional[int] = None) -> PostProcessor:
+    """
+    Create the post-processor from the `--subtitle-formats` and `--thumbnail-widths` options.
+
+    :param jobs: How many processes to use. [Default: the number of CPUs]
+
+    :returns: The post-processor.
+
+    :raises ValueError: If an option is not valid.
+    """
+
+    formats = _getOption("--subtitle-formats", ','.join(SUBTITLE_FORMATS))
+    widths = _getOption("--thumbnail-widths", ','.join(map(str, THUMBNAIL_WIDTHS)))
+    return PostProcessor(
+        formats = [] if formats == "none" else formats.split(','),  # type: ignore
+        widths = [] if widths == "none" else [int(width) for width in widths.split(',')],  # type: ignore
+        jobs = jobs,
+        overwrite = "--overwrite" in sys.argv
+    )
+
+
+def _cliNFO(args: list[str]) -> int:
+    """
+    The `nfo` command: write the NFOs of one or every season.
+
+    :param args: The arguments after `nfo`.
+
+    :returns: The exit code.
+    """
+
+    try:
+        seasons = [int(args[0])] if args else None
+
+    except ValueError:
+        _printUsage()
+        return 1
+
+    with API() as api:
+        if "--refresh-catalog" in sys.argv:
+            api.catalog.refresh(force=True)
+
+        for season in (seasons or sorted({key[0] for key in api.catalog.episodes()})):
+            print(f"Writing {len(api.writeSeasonNFOs(season))} NFOs of Season {season}...")
+
+    return 0
+
+
+def _cliVerify(args: list[str]) -> int:
+    """
+    The `verify` command: check the videos against their checksums and download the broken ones again.
+
+    :param args: The arguments after `verify`.
+
+    :returns: The exit code.
+    """
+
+    try:
+        season = int(args[0]) if args else None
+        hash_jobs = None if _getOption("--jobs") is None else int(_getOption("--jobs"))  # type: ignore
+        jobs = hash_jobs or 1
+        q = None if _getOption("--quality") is None else int(_getOption("--quality"))  # type: ignore
+
+    except ValueError:
+        _printUsage()
+        return 1
+
+    results = verifyLibrary(season=season, jobs=hash_jobs, record="--record" in sys.argv)
+    print()
+    print(f"{len(results['ok'])} videos are intact.")
+    if results["recorded"]:
+        print(f"Saved the checksum of {len(results['recorded'])} videos that did not have one.")
+
+    if results["unverified"]:
+        print(f"{len(results['unverified'])} videos have no checksum. (Use `--record` to save one now)")
+
+    if not results["mismatch"]:
+        return 0
+
+    print(f"{len(results['mismatch'])} videos are corrupted: " + ", ".join(f"S{s}E{e}" for s, e, _ in results["mismatch"]))
+    manifest_path: str = _getOption("--manifest", MANIFEST_PATH)  # type: ignore
+    manifest = Manifest(manifest_path) if os.path.isfile(manifest_path) else None
+    targets: dict[tuple[int, bool], list[tuple[int, int]]] = {}  # (quality, tagged filename) -> episodes
+    skipped = 0
+    for s, e, path in results["mismatch"]:
+        tag = VIDEO_PATTERN.match(os.path.basename(path)).group(3)  # type: ignore
+        if tag is not None:  # The quality stays in the filename, so the tagged video is the one replaced.
+            targets.setdefault((int(tag), True), []).append((s, e))
+            continue
+
+        # The filename has no quality, so take it from where the video was downloaded. (Recorded by `sync`)
+        entry = None if manifest is None else manifest.get(os.path.relpath(path))
+        match = None if entry is None else re.search(r"/(\d+)\.\w+$", entry["url"])
+        quality = int(match.group(1)) if match is not None else q
+        if quality is None:
+            print(f"[W] Unable to tell the quality of `{path}`; download it again with `--quality <q>`.")
+            skipped += 1
+            continue
+
+        targets.setdefault((quality, False), []).append((s, e))
+
+    if manifest is not None:
+        manifest.close()
+
+    # The corrupted videos are kept until their replacement is complete, so a failed download does not lose them.
+    with _cliAPI(jobs, 1, None) as api:
+        results = {}
+        for (quality, tagged), episodes in targets.items():
+            codes = Scheduler(
+                api,
+                jobs,
+                quality = quality,
+                assets = ["video"],
+                replace = [quality],
+                tag_quality = tagged
+            ).run(episodes)
+            for episode, code in codes.items():  # Several qualities of an episode can be corrupted.
+                results[episode] = results.get(episode, 0) or code
+
+    Scheduler.printSummary(results)
+    return 0 if not skipped and all(code == 0 for code in results.values()) else 1
+
+
+def _cliOrganize(args: list[str]) -> int:
+    """
+    The `organize` command: import another download tree into the library.
+
+    :param args: The arguments after `organize`.
+
+    :returns: The exit code.
+    """
+
+    try:
+        source = args[0]
+        root = args[1] if len(args) > 1 else '.'
+        jobs = int(_getOption("--jobs", "16"))  # type: ignore
+        if not os.path.isdir(source):
+            raise ValueError
+
+    except (IndexError, ValueError):
+        _printUsage()
+        return 1
+
+    plan, skipped = planLibrary(source, root)
+    for src, dst in skipped:
+        print(f"[W] Skipping `{src}` because `{dst}` already exists.")
+
+    if "--dry-run" in sys.argv:
+        for src, dst in plan:
+            print(f"{src} -> {dst}")
+
+        print()
+        print(f"{len(plan)} files would be {'linked' if '--keep' in sys.argv else 'moved'}, and {len(skipped)} files would be skipped.")
+        return 0
+
+    results = organizeLibrary(source, root, keep="--keep" in sys.argv, jobs=jobs, plan=plan)
+    print()
+    print(", ".join(f"{len(results[method])} {method}" for method in ("rename", "hardlink", "reflink", "copy", "failed")) + f", {len(skipped)} skipped")
+    if plan:
+        print("Run the `nfo` command to write the NFOs of the imported episodes.")
+
+    return 1 if results["failed"] else 0
+
+
+def _cliPostprocess(args: list[str]) -> int:
+    """
+    The `postprocess` command: convert the subtitles and resize the thumbnails that are already in the library.
+
+    :param args: The arguments after `postprocess`.
+
+    :returns: The exit code.
+    """
+
+    try:
+        season = int(args[0]) if args else None
+        jobs = _getOption("--jobs")
+        postprocessor = _cliPostProcessor(None if jobs is None else int(jobs))
+
+    except ValueError:
+        _printUsage()
+        return 1
+
+    results = postprocessLibrary(season=season, postprocessor=postprocessor)
+    print()
+    print(f"Wrote {len(results['written'])} files.")
+    if results["failed"]:
+        print(f"{len(results['failed'])} files could not be post-processed: " + ", ".join(os.path.basename(path) for path, _ in results["failed"]))
+
+    return 1 if results["failed"] else 0
+
+
+def _cliQueue(args: list[str]) -> int:
+    """
+    The `queue add`, `queue pause`, `queue resume`, and `queue list` commands. (`queue work` is handled by `_cliMain()`)
+
+    :param args: The arguments after `queue`.
+
+    :returns: The exit code.
+    """
+
+    try:
+        command = args[0]
+        season = int(args[1]) if len(args) > 1 else None
+        episodes = _parseEpisodes(args[2]) if len(args) > 2 else None
+        max_quality = _getOption("--max-quality")
+        max_size = _getOption("--max-size")
+        quality = _parseQuality(_getOption("--quality", args[3] if len(args) > 3 else "1080"), max_quality, max_size)  # type: ignore
+        limits = {
+            "max_quality": None if max_quality is None else int(max_quality),
+            "max_size": None if max_size is None else _parseSize(max_size)
+        }
+        assets = _getOption("--assets", ','.join(ASSETS)).split(',')  # type: ignore
+        if "--metadata-only" in sys.argv:
+            assets = [asset for asset in assets if asset != "video"]
+
+        if command not in ("add", "pause", "resume", "list") or (command == "add" and season is None) or not set(assets).issubset(ASSETS):
+            raise ValueError
+
+    except (IndexError, ValueError):
+        _printUsage()
+        return 1
+
+    with JobQueue(_getOption("--queue", QUEUE_PATH)) as queue:  # type: ignore
+        if command == "add":
+            if episodes is None:
+                with API() as api:
+                    targets = api.catalog.episodes(season)
+
+            else:
+                targets = [(season, episode) for episode in episodes]  # type: ignore
+
+            added = sum(queue.add(s, e, quality, assets, **limits) for s, e in targets)
+            print(f"Queued {added} of {len(targets)} episodes. (The others are already queued)")
+
+        elif command == "pause":
+            print(f"Paused {queue.pause(season, episodes)} jobs.")
+
+        elif command == "resume":
+            print(f"Resumed {queue.resume(season, episodes)} jobs.")
+
+        else:
+            jobs = queue.jobs()
+            print("ID     | Season | Episode | Quality   | State   | Attempts | Exit Code | Assets | Limits")
+            for job in jobs:
+                print(
+                    f"{str(job['id']).ljust(6)} | {str(job['season']).ljust(6)} | {str(job['episode']).ljust(7)} | "
+                    f"{str(job['quality']).ljust(9)} | {job['state'].ljust(7)} | {str(job['attempts']).ljust(8)} | "
+                    f"{str(job['exit_code'] if job['exit_code'] is not None else '').ljust(9)} | {job['assets']}"
+                    + (f" | max {job['max_quality']}p" if job["max_quality"] is not None else '')
+                    + (f" | max {_formatSize(job['max_size'])}" if job["max_size"] is not None else '')
+                )
+
+            print()
+            print(", ".join(f"{len([job for job in jobs if job['state'] == state])} {state}" for state in ("queued", "running", "paused", "done", "failed")))
+
+    return 0
+
+
+def _cliMain() -> int:
+    """
+    The command-line interface.
+
+    :returns: The exit code.
+    """
+
+    args = _getArguments()
+    if _getOption("--telemetry") is not None:
+        TELEMETRY.open(_getOption("--telemetry"))  # type: ignore
+
+    if _getOption("--metrics-port") is not None:
+        try:
+            TELEMETRY.serve(int(_getOption("--metrics-port")))  # type: ignore
+
+        except (OSError, ValueError) as err:
+            print(f"[W] Unable to serve the metrics: {err}")
+
+    if len(args) > 0 and args[0] == "nfo":
+        return _cliNFO(args[1:])
+
+    if len(args) > 0 and args[0] == "verify":
+        return _cliVerify(args[1:])
+
+    if len(args) > 0 and args[0] == "organize":
+        return _cliOrganize(args[1:])
+
+    if len(args) > 0 and args[0] == "postprocess":
+        return _cliPostprocess(args[1:])
+
+    if len(args) > 0 and args[0] == "queue" and args[1:2] != ["work"]:
+        return _cliQueue(args[1:])
+
+    work = args[:2] == ["queue", "work"]
+    if work:
+        args = args[2:]
+
+    sync = len(args) > 0 and args[0] == "sync"
+    if sync:
+        args = args[1:]
+
+    report: Optional[dict[str, Any]] = None
+    if _getOption("--from-report") is not None:
+        with open(_getOption("--from-report"), 'r', encoding="utf-8") as f:  # type: ignore
+            report = json.load(f)
+
+        args = args or ['0', '0', str(report.get("quality", 1080))]  # type: ignore
+
+    try:
+        if not (sync or work) and len(args) < 2:
+            raise IndexError
+
+        s: Optional[int] = int(args[0]) if len(args) > 0 else None
+        episodes: Optional[list[int]] = _parseEpisodes(args[1]) if len(args) > 1 else None
+        quality = _getOption("--quality", args[2] if len(args) > 2 else "1080")
+        max_quality = _getOption("--max-quality")
+        max_size = _getOption("--max-size")
+        q = _parseQuality(quality, max_quality, max_size)  # type: ignore
+
+        jobs = int(_getOption("--jobs", '1'))  # type: ignore
+        segments = int(_getOption("--segments", '1'))  # type: ignore
+        min_segment_size = _parseSize(_getOption("--min-segment-size", "8M"))  # type: ignore
+        max_per_host = _getOption("--max-per-host", None)
+        max_per_host = None if max_per_host is None else int(max_per_host)
+        BANDWIDTH_LIMITER.setRate(_parseSize(_getOption("--limit-rate", '0')))  # type: ignore
+        REQUEST_LIMITER.setRate(float(_getOption("--request-rate", '0')))  # type: ignore
+        RETRY_POLICY.retries = int(_getOption("--retries", str(RETRY_POLICY.retries)))  # type: ignore
+        assets = _getOption("--assets")
+        if assets is not None and not set(assets.split(',')).issubset(ASSETS):
+            raise ValueError
+
+        disk_budget = _getOption("--disk-budget")
+        disk_budget = None if disk_budget is None else _parseSize(disk_budget)
+        postprocessor = _cliPostProcessor() if "--postprocess" in sys.argv else None
+
+    except (IndexError, ValueError):
+        _printUsage()
+        return 1
+
+    if sync and "--archive" in sys.argv:
+        print("[E] `--archive` cannot be used with `sync`, because the files in an archive are not updated.")
+        return 1
+
+    if postprocessor is not None and "--archive" in sys.argv:
+        print("[E] `--archive` cannot be used with `--postprocess`, because the files are not written to the disk.")
+        return 1
+
+    if _getOption("--limit-rate-file") is not None:
+        _watchRateFile(_getOption("--limit-rate-file"), BANDWIDTH_LIMITER)  # type: ignore
+
+    # Shared by all episodes so the site catalog is only fetched once and connections are reused.
+    api = _cliAPI(jobs, segments, max_per_host)
+    options: dict[str, Any] = {
+        "quality": q,
+        "metadata_only": "--metadata-only" in sys.argv,
+        "segments": segments,
+        "min_segment_size": min_segment_size,
+        "max_quality": None if max_quality is None else int(max_quality),
+        "max_size": None if max_size is None else _parseSize(max_size),
+        "disk_budget": DiskBudget(disk_budget),
+        "postprocessor": postprocessor,
+        "archives": SeasonArchives() if "--archive" in sys.argv else None
+    }
+    if assets is not None:
+        options["assets"] = assets.split(',')
+
+    # The post-processing keeps running in the background until every download is done.
+    with postprocessor or contextlib.nullcontext(), options["archives"] or contextlib.nullcontext():
+        if work:
+            with JobQueue(_getOption("--queue", QUEUE_PATH)) as queue:  # type: ignore
+                print(f"Working on {len(queue.jobs('queued'))} queued jobs...")
+                results = Scheduler(api, jobs, **options).drain(queue, daemon="--daemon" in sys.argv)
+
+            Scheduler.printSummary(results)
+            return 0 if all(code == 0 for code in results.values()) else 1
+
+        if report is not None:
+            # Older reports may have paths relative to where the checker was run, so resolve them before moving into the library.
+            broken = [os.path.abspath(path) for episode in report["episodes"] for path in episode["zero_byte"] + episode["size_mismatch"]]
+            os.chdir(report["library"])  # Download into the library that was checked.
+            for path in broken:  # Broken files are downloaded again.
+                print(f"Removing broken file `{path}`...")
+                try:
+                    os.remove(path)
+
+                except FileNotFoundError:  # Already removed since the report was written.
+                    pass
+
+                except OSError as err:
+                    print(f"[W] Unable to remove `{path}`, it will not be downloaded again: {err}")
+
+            targets = [(episode["season"], episode["episode"]) for episode in report["episodes"]]
+            print(f"Downloading {len(targets)} episodes from the report...")
+            _cliEstimate(api, targets, options)
+            results = Scheduler(api, jobs, **options).run(targets)
+            Scheduler.printSummary(results)
+            return 0 if all(code == 0 for code in results.values()) else 1
+
+        if sync:
+            if episodes is None:
+                targets = api.catalog.episodes(s)
+
+            else:
+                targets = [(s, episode) for episode in episodes]  # type: ignore
+
+            print(f"Syncing {len(targets)} episodes...")
+            _cliEstimate(api, targets, options)
+            with Manifest(_getOption("--manifest", MANIFEST_PATH)) as manifest:  # type: ignore
+                results = Scheduler(api, jobs, manifest=manifest, **options).run(targets)
+
+            Scheduler.printSummary(results)
+            return 0 if all(code == 0 for code in results.values()) else 1
+
+        if len(episodes) == 1:  # type: ignore
+            print(f"Downloading S{s}E{episodes[0]}...")  # type: ignore
+            try:
+                return Main(s, episodes[0], api=api, **options).main()  # type: ignore
+
+            except CircuitOpenError as err:
+                print(f"[E] {err}")
+                return 1
+
+        print(f"Downloading S{s}E{episodes[0]}-{episodes[-1]}... ({len(episodes)} episodes)")  # type: ignore
+        targets = [(s, current_episode) for current_episode in episodes]  # type: ignore
+        _cliEstimate(api, targets, options)
+        results = Scheduler(api, jobs, **options).run(targets)
+        Scheduler.printSummary(results)
+        return 0 if all(code == 0 for code in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(_cliMain())
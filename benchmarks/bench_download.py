@@ -0,0 +1,115 @@
+"""
+bench_download.py
+
+Micro-benchmark of `API._download()` against a local HTTP server.
+
+**USAGE**:
+
+1. Run the script. (Optionally pass the size of the test file in MiB, e.g. `python bench_download.py 512`)
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from TUAA import API  # noqa: E402
+from TUAA import TQDM_INSTALLED  # noqa: E402
+
+if TQDM_INSTALLED:
+    from tqdm import tqdm
+
+size_mib = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+payload = os.urandom(1024 ** 2) * size_mib  # Served from memory so only the client is measured.
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", "\"bench\"")
+        self.end_headers()
+        view = memoryview(payload)
+        for offset in range(0, len(payload), 1024 ** 2):
+            self.wfile.write(view[offset:offset + 1024 ** 2])
+
+
+def bench(url: str, chunk_size: int) -> float:
+    """
+    Download <url> once using <chunk_size>.
+
+    :param url:        The URL of the test file.
+    :param chunk_size: The chunk size of the API object.
+
+    :returns: The throughput in MB/s.
+    """
+
+    with API(catalog_path=None, chunk_size=chunk_size) as api, tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "bench.mp4")
+        started = time.perf_counter()
+        if api._download(url, fname, position=0) != 0:
+            raise RuntimeError("The download did not complete.")
+
+        elapsed = time.perf_counter() - started
+
+    return len(payload) / elapsed / 1000 ** 2
+
+
+def benchLegacy(url: str) -> float:
+    """
+    Download <url> once using the old loop (1 KiB chunks, a `file.write()` and a bar update per chunk).
+
+    :param url: The URL of the test file.
+
+    :returns: The throughput in MB/s.
+    """
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        started = time.perf_counter()
+        with httpx.stream("GET", url) as resp, open(os.path.join(tmpdir, "bench.mp4"), 'wb') as file:
+            bar = tqdm(total=len(payload), unit='iB', unit_scale=True, leave=False) if TQDM_INSTALLED else None
+            for data in resp.iter_bytes(chunk_size=1024):
+                size = file.write(data)
+                if bar is not None:
+                    bar.update(size)
+
+            if bar is not None:
+                bar.close()
+
+        elapsed = time.perf_counter() - started
+
+    return len(payload) / elapsed / 1000 ** 2
+
+
+def main() -> int:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/bench.mp4"
+
+    print(f"Downloading {size_mib} MiB from {url}")
+    print()
+    print("Buffer Size | MB/s")
+    print(f"1024 (old)  | {round(benchLegacy(url), 2)}")
+    for chunk_size in (1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2):
+        print(f"{str(chunk_size).ljust(11)} | {round(bench(url, chunk_size), 2)}")
+
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+bench_e2e.py
+
+End-to-end benchmark of `Main` and `Scheduler` against the local mock CDN. (See `mock_cdn.py`)
+
+Every scenario downloads the videos, subtitles, thumbnails, and NFOs into a temporary folder,
+and reports the episodes per minute, the throughput (MB/s), the requests sent by kind, and the
+peak memory usage (RSS) of the downloader. Each scenario runs in its own process so its peak
+memory usage is not mixed up with the others or with the server.
+
+**USAGE**:
+
+1. Run the script. (Optionally pass the names of the scenarios to run, e.g. `python bench_e2e.py single range`)
+
+A scenario that does not finish within `TIMEOUT` seconds (e.g., a deadlock) is stopped and reported as failed.
+"""
+
+import os
+import sys
+import time
+import queue
+import tempfile
+import multiprocessing
+
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_cdn import MockCDN  # noqa: E402
+
+try:
+    import resource
+
+except ImportError:  # resource module is not available on Windows.
+    resource = None  # type: ignore
+
+TIMEOUT = 600  # In seconds.
+SCENARIOS: dict[str, dict[str, Any]] = {
+    # name -> the episodes, how many to download at the same time, the segments per video, the options of the mock CDN,
+    # and optionally the maximum number of connections per host.
+    "single": {"episodes": [(1, 1)], "jobs": 1, "segments": 4, "cdn": {"video_size": 256 * 1024 ** 2}},
+    "range": {"episodes": [(1, e) for e in range(1, 51)], "jobs": 4, "segments": 1, "cdn": {"video_size": 16 * 1024 ** 2}},
+    "flaky": {
+        "episodes": [(1, e) for e in range(1, 31)],
+        "jobs": 4,
+        "segments": 1,
+        "cdn": {"video_size": 8 * 1024 ** 2, "latency": 0.02, "bandwidth": 32 * 1024 ** 2, "short_read_rate": 0.1, "error_rate": 0.02, "seed": 1}
+    },
+    "archive": {"episodes": [(0, e) for e in range(1, 15)] + [(1, e) for e in range(1, 369)], "jobs": 8, "segments": 1, "cdn": {"video_size": 1024 ** 2}},
+    # The segments of a video share the connections to the host with each other and with the other episodes.
+    "per-host": {"episodes": [(1, e) for e in range(1, 5)], "jobs": 2, "segments": 4, "max_per_host": 1, "cdn": {"video_size": 32 * 1024 ** 2}}
+}
+
+
+def _peakRSS() -> int:
+    """
+    :returns: The peak memory usage of this process in bytes, or `0` if it cannot be measured.
+    """
+
+    try:  # `ru_maxrss` is inherited from the parent process on Linux, but `VmHWM` starts over with the new program.
+        with open("/proc/self/status", 'r', encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+
+    except OSError:
+        pass
+
+    if resource is None:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports it in KiB.
+
+
+def _client(scenario: dict[str, Any], url: str, results: Any) -> None:
+    """
+    Run <scenario> against the mock CDN at <url>. (In a child process)
+    """
+
+    from TUAA import API, Main, RetryPolicy, Scheduler
+
+    sys.stdout = sys.stderr = open(os.devnull, 'w')  # Hide the progress bars.
+    episodes = scenario["episodes"]
+    jobs = scenario["jobs"]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        policy = RetryPolicy(base_delay=0.05, max_delay=0.5)  # Do not spend the benchmark sleeping.
+        with API(
+            catalog_path = None,
+            cdn = url,
+            endpoint = url,
+            max_connections = max(10, jobs * (scenario["segments"] + 1)),
+            max_connections_per_host = scenario.get("max_per_host"),
+            retry_policy = policy
+        ) as api:
+            started = time.perf_counter()
+            if len(episodes) == 1:
+                exit_codes = {episodes[0]: Main(*episodes[0], api=api, verbose=False, segments=scenario["segments"]).main()}
+
+            else:
+                exit_codes = Scheduler(api, jobs, segments=scenario["segments"]).run(episodes)
+
+            elapsed = time.perf_counter() - started
+
+        downloaded = sum(
+            os.path.getsize(os.path.join(dirpath, filename))
+            for dirpath, _, filenames in os.walk(tmpdir)
+            for filename in filenames
+            if filename.endswith(".mp4")
+        )
+        os.chdir(os.path.dirname(tmpdir))
+
+    results.put({
+        "elapsed": elapsed,
+        "ok": sum(code == 0 for code in exit_codes.values()),
+        "bytes": downloaded,
+        "peak_rss": _peakRSS()
+    })
+
+
+def bench(name: str) -> dict[str, Any]:
+    """
+    Run the scenario called <name> against a new mock CDN.
+
+    :param name: The name of the scenario. (See `SCENARIOS`)
+
+    :returns: The results of the scenario.
+    """
+
+    scenario = SCENARIOS[name]
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with MockCDN(**scenario["cdn"]) as cdn:
+        process = context.Process(target=_client, args=(scenario, cdn.endpoint, results))
+        process.start()
+        try:
+            result = results.get(timeout=TIMEOUT)
+
+        except queue.Empty:  # Stuck; report it instead of waiting forever.
+            process.kill()
+            result = {"elapsed": TIMEOUT, "ok": 0, "bytes": 0, "peak_rss": 0}
+
+        process.join()
+        result["requests"] = dict(cdn.counts)
+
+    result["episodes"] = len(scenario["episodes"])
+    return result
+
+
+def main() -> int:
+    names = [arg for arg in sys.argv[1:] if arg in SCENARIOS] or list(SCENARIOS)
+    print("Scenario | Episodes | OK  | Episodes/min | MB/s    | Peak RSS (MiB) | Requests")
+    for name in names:
+        result = bench(name)
+        requests = ", ".join(f"{count} {kind}" for kind, count in sorted(result["requests"].items()))
+        print(
+            f"{name.ljust(8)} | {str(result['episodes']).ljust(8)} | {str(result['ok']).ljust(3)} | "
+            f"{str(round(result['episodes'] / result['elapsed'] * 60, 1)).ljust(12)} | "
+            f"{str(round(result['bytes'] / result['elapsed'] / 1000 ** 2, 2)).ljust(7)} | "
+            f"{str(round(result['peak_rss'] / 1024 ** 2, 1)).ljust(14)} | {requests}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
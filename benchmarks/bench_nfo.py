@@ -0,0 +1,103 @@
+"""
+bench_nfo.py
+
+Benchmark of the NFO generation for the whole archive. (382 episodes)
+
+**USAGE**:
+
+1. Run the script. (Optionally pass the number of rounds, e.g. `python bench_nfo.py 20`)
+"""
+
+import os
+import sys
+import time
+import tempfile
+import datetime
+
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from TUAA import API  # noqa: E402
+
+rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+episodes = {0: 14, 1: 368}
+
+description = ' '.join(
+    f"Paragraph {i} of the description with <a href=\"https://example.com/{i}\">a link</a> &amp; some <b>bold</b> text.<br>"
+    for i in range(40)
+)
+page_props = {
+    "seasons": [
+        [
+            {"title": f"Episode {e} & <Friends>", "description": description, "date": 1573516800000 + e * 86400000, "tracks": []}
+            for e in range(1, episodes[s] + 1)
+        ]
+        for s in episodes
+    ]
+}
+
+
+class _OldHTMLFilter(HTMLParser):
+    text: str = ''
+
+    def handle_data(self, data: str):
+        self.text += data
+
+
+def oldNFO(meta: dict, s: int, e: int) -> str:
+    """
+    The NFO generation before the batch generator. (Without the request per episode)
+    """
+
+    plot_parser = _OldHTMLFilter()
+    plot_parser.feed(meta["description"].replace("<br>", '\n'))
+    date = str(meta["date"])
+    date = "\n  <aired>{0}</aired>".format(datetime.datetime.fromtimestamp(int(date[:-3])).strftime("%Y-%m-%d"))
+    return f"""<?xml version="1.0" encoding="utf-8" standalone="yes"?>
+<episodedetails>
+  <plot>{plot_parser.text}</plot>
+  <title>{meta["title"]}</title>
+  <episode>{e}</episode>
+  <season>{s}</season>{date}
+</episodedetails>"""
+
+
+def main() -> int:
+    with API(catalog_path=None) as api:
+        api.catalog._setPageProps(page_props)
+        api.catalog._fetched = time.time()  # Pretend the catalog was just downloaded.
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for s in episodes:
+                for e in range(1, episodes[s] + 1):
+                    oldNFO(api.catalog._lookup(s, e), s, e)
+
+        old = (time.perf_counter() - started) / rounds
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for s in episodes:
+                api.genSeasonNFOs(s)
+
+        new = (time.perf_counter() - started) / rounds
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            started = time.perf_counter()
+            written = sum(len(api.writeSeasonNFOs(s, tmpdir)) for s in episodes)
+            write = time.perf_counter() - started
+
+    print(f"Generating {sum(episodes.values())} NFOs, average of {rounds} rounds:")
+    print()
+    print("Method                 | Time (ms)")
+    print(f"Per-episode (old)      | {round(old * 1000, 2)}")
+    print(f"genSeasonNFOs()        | {round(new * 1000, 2)}")
+    print(f"writeSeasonNFOs()      | {round(write * 1000, 2)} ({written} files)")
+    print()
+    print("NOTE: The old method also downloaded the homepage once per episode, which is not included here.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+mock_cdn.py
+
+A local stand-in for the Unus Annus Archive, used by the benchmarks instead of the live site.
+
+It serves the homepage with the catalog in its `__NEXT_DATA__` script tag, and the videos,
+subtitles, and thumbnails in the same URL layout as the CDN:
+
+- `/{ss}/{eee}/{quality}.mp4` (With `Range`/`If-Range` support)
+- `/subs/{ss}/{eee}.{language}.vtt`
+- `/thumbnails/{ss}/{eee}.jpg`
+
+Latency, bandwidth limits, short reads (the connection is closed before the whole body is
+sent), and `503` errors can be simulated. Every request is counted by kind.
+
+**USAGE**:
+
+1. Import `MockCDN` and pass its `cdn` and `endpoint` URLs to `API(cdn=..., endpoint=...)`.
+2. Or run the script to serve it on its own. (e.g., `python mock_cdn.py --port 8765 --latency 0.05`)
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import threading
+
+from typing import Any
+from typing import Optional
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+EPISODES = {0: 14, 1: 368}  # The number of episodes of every season of the archive.
+QUALITIES = (2160, 1440, 1080, 720, 480, 360, 240)
+ETAG = "\"mock\""
+
+VIDEO_PATH = re.compile(r"^/(\d{2})/(\d{3})/(\d+)\.mp4$")
+SUBTITLE_PATH = re.compile(r"^/subs/(\d{2})/(\d{3})\.([\w-]+)\.vtt$")
+THUMBNAIL_PATH = re.compile(r"^/thumbnails/(\d{2})/(\d{3})\.(\w+)$")
+
+SUBTITLES = b"WEBVTT\n\n00:00:01.000 --> 00:00:02.500\nHello, <b>everyone</b>!\n\n00:00:03.000 --> 00:00:04.000\nGoodbye.\n"
+THUMBNAIL = b"\xff\xd8\xff\xe0" + bytes(16 * 1024)
+
+
+def _homepage(episodes: dict[int, int]) -> bytes:
+    """
+    Build a homepage like the one of the site, with the catalog of <episodes> in `__NEXT_DATA__`.
+    """
+
+    seasons = [
+        [
+            {
+                "title": f"Episode {e} & <Friends>",
+                "description": f"The description of S{s}E{e}.<br>With <a href=\"https://example.com\">a link</a>.",
+                "date": 1573516800000 + e * 86400000,
+                "tracks": [{"srclang": "en", "label": "English"}]
+            }
+            for e in range(1, episodes[s] + 1)
+        ]
+        for s in sorted(episodes)
+    ]
+    data = json.dumps({"props": {"pageProps": {"seasons": seasons}}, "page": "/"})
+    return (
+        "<!DOCTYPE html><html><head><title>Unus Annus Archive</title></head><body>"
+        + "<div id=\"__next\">" + "<div class=\"episode\"></div>" * 500 + "</div>"
+        + f"<script id=\"__NEXT_DATA__\" type=\"application/json\">{data}</script>"
+        + "</body></html>"
+    ).encode("utf-8")
+
+
+class MockCDN:
+    """
+    A threaded HTTP server that behaves like the site and its CDN.
+    """
+
+    def __init__(
+        self,
+        video_size: int = 8 * 1024 ** 2,
+        latency: float = 0,
+        bandwidth: float = 0,
+        short_read_rate: float = 0,
+        error_rate: float = 0,
+        missing_qualities: tuple[int, ...] = (2160,),
+        episodes: Optional[dict[int, int]] = None,
+        port: int = 0,
+        seed: Optional[int] = None
+    ):
+        """
+        :param video_size:        The size of every video in bytes. (They all share the same data)
+        :param latency:           How long (in seconds) to wait before answering every request.
+        :param bandwidth:         The maximum speed of every connection in bytes per second. (`0` for no limit)
+        :param short_read_rate:   The chance (0 to 1) of closing the connection halfway through a video.
+        :param error_rate:        The chance (0 to 1) of answering a request with `503 Service Unavailable`.
+        :param missing_qualities: The qualities that are answered with `404`, like a rendition missing on the CDN.
+        :param episodes:          Season -> number of episodes. [Default: the whole archive]
+        :param port:              The port to listen on. (`0` for any free port)
+        :param seed:              The seed of the simulated faults, so runs can be repeated.
+        """
+
+        self.video_size = video_size
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.short_read_rate = short_read_rate
+        self.error_rate = error_rate
+        self.missing_qualities = missing_qualities
+        self.episodes = EPISODES if episodes is None else episodes
+
+        self.video = bytes(range(256)) * (video_size // 256) + bytes(video_size % 256)
+        self.homepage = _homepage(self.episodes)
+        self.counts: dict[str, int] = {}
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def cdn(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "MockCDN":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-cdn", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self) -> None:
+        """
+        Reset the request counters.
+        """
+
+        with self._lock:
+            self.counts = {}
+            self.bytes_sent = 0
+
+    def _count(self, kind: str, sent: int = 0) -> None:
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.bytes_sent += sent
+
+    def _chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+
+        with self._lock:
+            return self._random.random() < rate
+
+    def _handler(self) -> type:
+        cdn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._handle(head=True)
+
+            def do_GET(self):
+                self._handle(head=False)
+
+            def _empty(self, status: int, kind: str, headers: Optional[dict[str, str]] = None) -> None:
+                cdn._count(kind)
+                self.send_response(status)
+                self.send_header("Content-Length", '0')
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+
+                self.end_headers()
+
+            def _send(self, body: bytes | memoryview, content_type: str, head: bool, kind: str, status: int = 200, headers: Optional[dict[str, Any]] = None) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", ETAG)
+                self.send_header("Last-Modified", "Wed, 11 Nov 2020 00:00:00 GMT")
+                self.send_header("Accept-Ranges", "bytes")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, str(value))
+
+                self.end_headers()
+                if head:
+                    cdn._count(kind)
+                    return
+
+                # Stop halfway through some videos, like a dropped connection.
+                end = len(body) // 2 if kind == "video" and cdn._chance(cdn.short_read_rate) else len(body)
+                chunk = 64 * 1024
+                sent = 0
+                started = time.monotonic()
+                try:
+                    for offset in range(0, end, chunk):
+                        sent += self.wfile.write(body[offset:min(offset + chunk, end)])
+                        if cdn.bandwidth > 0:  # Sleep until the connection is back under the limit.
+                            time.sleep(max(0.0, sent / cdn.bandwidth - (time.monotonic() - started)))
+
+                except (BrokenPipeError, ConnectionResetError):  # The client stopped the download.
+                    pass
+
+                cdn._count(kind, sent)
+                if end < len(body):
+                    self.close_connection = True
+
+            def _handle(self, head: bool) -> None:
+                if cdn.latency > 0:
+                    time.sleep(cdn.latency)
+
+                path = self.path.partition('?')[0]
+                if cdn._chance(cdn.error_rate) and path != '/':
+                    return self._empty(503, "error", {"Retry-After": '0'})
+
+                if path == '/':
+                    if self.headers.get("If-None-Match") == ETAG:
+                        return self._empty(304, "homepage")
+
+                    return self._send(cdn.homepage, "text/html; charset=utf-8", head, "homepage")
+
+                match = VIDEO_PATH.match(path)
+                if match is not None:
+                    if not self._exists(match.group(1), match.group(2)) or int(match.group(3)) not in QUALITIES or int(match.group(3)) in cdn.missing_qualities:
+                        return self._empty(404, "not_found")
+
+                    return self._video(head)
+
+                match = SUBTITLE_PATH.match(path)
+                if match is not None and self._exists(match.group(1), match.group(2)) and match.group(3) == "en":
+                    return self._send(SUBTITLES, "text/vtt", head, "subtitles")
+
+                match = THUMBNAIL_PATH.match(path)
+                if match is not None and self._exists(match.group(1), match.group(2)) and match.group(3) == "jpg":
+                    return self._send(THUMBNAIL, "image/jpeg", head, "thumbnail")
+
+                return self._empty(404, "not_found")
+
+            @staticmethod
+            def _exists(season: str, episode: str) -> bool:
+                return 1 <= int(episode) <= cdn.episodes.get(int(season), 0)
+
+            def _video(self, head: bool) -> None:
+                video = memoryview(cdn.video)
+                requested = self.headers.get("Range")
+                if requested is None or self.headers.get("If-Range", ETAG) != ETAG:
+                    return self._send(video, "video/mp4", head, "video")
+
+                start, _, end = requested.removeprefix("bytes=").partition('-')
+                first, last = int(start), (int(end) if end else len(video) - 1)
+                if first >= len(video):
+                    return self._empty(416, "video", {"Content-Range": f"bytes */{len(video)}"})
+
+                last = min(last, len(video) - 1)
+                self._send(video[first:last + 1], "video/mp4", head, "video", 206, {"Content-Range": f"bytes {first}-{last}/{len(video)}"})
+
+        return Handler
+
+
+def _getOption(name: str, default: str) -> str:
+    for i, arg in enumerate(sys.argv):
+        if arg == name and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+
+    return default
+
+
+def main() -> int:
+    cdn = MockCDN(
+        video_size = int(float(_getOption("--video-size", "8")) * 1024 ** 2),
+        latency = float(_getOption("--latency", '0')),
+        bandwidth = float(_getOption("--bandwidth", '0')) * 1024 ** 2,
+        short_read_rate = float(_getOption("--short-reads", '0')),
+        error_rate = float(_getOption("--errors", '0')),
+        port = int(_getOption("--port", "8765"))
+    )
+    print(f"Serving the mock site and CDN on {cdn.endpoint} (Press Ctrl+C to stop)")
+    print("Options: --video-size <MiB> --latency <seconds> --bandwidth <MiB/s> --short-reads <0-1> --errors <0-1> --port <port>")
+    try:
+        cdn._server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,66 @@
 """
 missing_episodes_checker.py
 
-For checking which episodes are not yet downloaded.
+For checking which episodes are not yet downloaded, or are only partially downloaded.
+
+The library is scanned once, and the list of episodes is taken from the cached site catalog
+of `TUAA.py`. Every episode folder is checked for the video, subtitles, thumbnail, and NFO.
+Zero-byte and partial (`.part`) files are reported too.
 
 **USAGE**:
 
-1. Run the script. (Add `-i` or `--invert` as an argument to show only the downloaded videos)
+1. Run the script in your library folder.
+    - Add `-i` or `--invert` as an argument to show only the complete episodes.
+    - Add `--json <path>` to write a machine-readable report. (Use `-` to print it instead)
+      Pass the report to `TUAA.py --from-report <path>` to download only what is missing.
+    - Add `--verify-size` to compare the size of the videos with the server. (Add `--quality <q>` if they are not in 1080p)
+    - Add `--library <path>` if the library is not in the current working directory.
 """
 
 import os
+import re
 import sys
+import json
+
+from typing import Any
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from TUAA import API
+from TUAA import Manifest
+from TUAA import MANIFEST_PATH
+
 
-rootdir = os.getcwd()  # Assume that the files are in the current working directory.
+def _getOption(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Get the value of a command-line option. (e.g., `--json report.json`)
+
+    :param name:    The name of the option, including the dashes.
+    :param default: The value to return if the option is not set.
+
+    :returns: The value of the option.
+    """
 
-try:  # Check if `--invert` exists in `sys.argv`.
-    invert = True if sys.argv[1] in ("-i", "--invert") else False
+    for i, arg in enumerate(sys.argv):
+        if arg == name and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
 
-except IndexError:
-    invert = False
+    return default
+
+
+rootdir = os.path.abspath(_getOption("--library", os.getcwd()))  # type: ignore  # Absolute, so the paths in the report work from anywhere.
+invert = "-i" in sys.argv or "--invert" in sys.argv
+report_path = _getOption("--json")
+verify_size = "--verify-size" in sys.argv
+quality = int(_getOption("--quality", "1080"))  # type: ignore
 
 ep_folder_name = "Unus Annus S{s}E{e}"
+file_pattern = re.compile(r"^Unus Annus S(\d+)E(\d+)(.*)$")
+video_pattern = re.compile(r"^(?: - (\d+)p)?\.mp4$")
 
-episodes = {
+episodes = {  # Used if the site catalog is not available.
     0: 14,  # Season 0 (Specials) have 14 episodes.
     1: 368  # Season 1 have 368 episodes.
 }
@@ -53,42 +92,204 @@ def _buildFilepath(season: int, episode: int) -> str:
     """
 
     return os.path.join(  # Build filepath
-        rootdir,
-        f"Season 0{season}",  # NOTE: Season number length is hardcoded. (There's only two seasons anyway.)
+        rootdir,  # type: ignore
+        f"Season {API._checkValueFormat(season, 's')}",
         str(ep_folder_name.format(s=season, e=episode))
     )
 
 
+def _classify(suffix: str) -> tuple[str, Optional[str]]:
+    """
+    Find out what kind of file it is using the part of the filename after `Unus Annus SxEy`.
+
+    :param suffix: The rest of the filename. (e.g., `.en.vtt` or `-thumb.jpg`)
+
+    :returns: The kind of the file and, for subtitles, its language.
+    """
+
+    if suffix.endswith((".part", ".part.json", ".tmp")):
+        return ("partial", None)
+
+    if video_pattern.match(suffix):  # `.mp4`, or `- <quality>p.mp4` if several qualities are downloaded.
+        return ("video", None)
+
+    if suffix.endswith(".vtt"):
+        return ("subtitles", suffix[1:].partition('.')[0])
+
+    if suffix.startswith("-thumb."):
+        return ("thumbnail", None)
+
+    if suffix == ".nfo":
+        return ("nfo", None)
+
+    return ("other", None)
+
+
+def scanLibrary() -> dict[tuple[int, int], dict[str, Any]]:
+    """
+    Scan the library once and index the files of every episode.
+
+    :returns: (season, episode) -> {kind: {filename: size}}
+    """
+
+    index: dict[tuple[int, int], dict[str, Any]] = {}
+    stack = [rootdir]
+    while stack:
+        with os.scandir(stack.pop()) as entries:  # type: ignore
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+
+                match = file_pattern.match(entry.name)
+                if match is None:
+                    continue
+
+                key = (int(match.group(1)), int(match.group(2)))
+                kind, language = _classify(match.group(3))
+                files = index.setdefault(key, {"folder": os.path.dirname(entry.path)})
+                files.setdefault(kind, {})[language or entry.name] = (entry.path, entry.stat().st_size)
+
+    return index
+
+
+def expectedEpisodes(api: API) -> dict[tuple[int, int], list[str]]:
+    """
+    Get the list of episodes and their subtitle languages from the site catalog.
+
+    :param api: The API object.
+
+    :returns: (season, episode) -> list of subtitle languages.
+    """
+
+    try:
+        return {
+            key: [track["srclang"] for track in api.catalog._lookup(*key).get("tracks", [])]
+            for key in api.catalog.episodes()
+        }
+
+    except Exception as err:  # The catalog is not cached and the site is unreachable.
+        print(f"[W] Unable to load the site catalog, using the hardcoded episode list instead: {err}")
+        return {(season, episode): [] for season in episodes for episode in range(1, episodes[season] + 1)}
+
+
+def checkEpisode(key: tuple[int, int], files: dict[str, Any], languages: list[str]) -> dict[str, Any]:
+    """
+    Check the files of an episode.
+
+    :param key:       (season, episode)
+    :param files:     The files of the episode from `scanLibrary()`.
+    :param languages: The expected subtitle languages.
+
+    :returns: The report of the episode.
+    """
+
+    result: dict[str, Any] = {
+        "season": key[0],
+        "episode": key[1],
+        "folder": files.get("folder", _buildFilepath(*key)),
+        "missing": [],
+        "zero_byte": [],
+        "partial": [path for path, _ in files.get("partial", {}).values()],
+        "size_mismatch": [],
+        "size_unknown": []  # Not a problem by itself; the size could not be checked. (See `verifySizes()`)
+    }
+    for kind in ("video", "thumbnail", "nfo"):
+        if kind not in files:
+            result["missing"].append(kind)
+
+    for language in languages:
+        if language not in files.get("subtitles", {}):
+            result["missing"].append(f"subtitles:{language}")
+
+    for kind in ("video", "subtitles", "thumbnail", "nfo"):
+        for path, size in files.get(kind, {}).values():
+            if size == 0:
+                result["zero_byte"].append(path)
+
+    return result
+
+
+def verifySizes(api: API, results: list[dict[str, Any]], index: dict[tuple[int, int], dict[str, Any]]) -> None:
+    """
+    Compare the size of the videos with the manifest, or with the `content-length` of the server.
+    If the server does not tell the size (e.g., an error, or a missing rendition), the video is only listed
+    in `size_unknown`, so a healthy video is never deleted because of it.
+
+    :param api:     The API object.
+    :param results: The reports from `checkEpisode()`. They are updated in place.
+    :param index:   The index from `scanLibrary()`.
+    """
+
+    manifest_path = os.path.join(rootdir, MANIFEST_PATH)  # type: ignore
+    manifest = Manifest(manifest_path) if os.path.isfile(manifest_path) else None
+
+    def check(result: dict[str, Any]) -> None:
+        for path, size in index.get((result["season"], result["episode"]), {}).get("video", {}).values():
+            entry = None if manifest is None else manifest.get(os.path.relpath(path, rootdir))
+            if entry is not None:
+                expected = entry["size"]
+
+            else:
+                tag = video_pattern.match(file_pattern.match(os.path.basename(path)).group(3)).group(1)  # type: ignore
+                try:
+                    resp = api._head(api._videoUrl(result["season"], result["episode"], quality if tag is None else int(tag)))
+                    expected = int(resp.headers["content-length"]) if resp.status_code == 200 else None
+
+                except (httpx.HTTPError, KeyError, ValueError):
+                    expected = None
+
+            if expected is None:
+                result["size_unknown"].append(path)
+
+            elif expected != size:
+                result["size_mismatch"].append(path)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(check, results))
+
+    if manifest is not None:
+        manifest.close()
+
+
 def main() -> int:
-    files = []
-    if invert:  # Invert result if `--invert` is activated.
-        for season in episodes:
-            for episode in range(1, episodes[season] + 1):
-                episode_folder = _buildFilepath(season, episode)
-                if os.path.isdir(episode_folder):
-                    # Add to `files` if the folder exists.
-                    files.append((season, episode, episode_folder))
-
-    else:  # Do this if `--invert` is not activated.
-        for season in episodes:
-            for episode in range(1, episodes[season] + 1):
-                episode_folder = _buildFilepath(season, episode)
-                if not os.path.isdir(episode_folder):
-                    # Add to `files` if the folder does not exist.
-                    files.append((season, episode, episode_folder))
+    with API() as api:
+        index = scanLibrary()
+        expected = expectedEpisodes(api)
+        results = [checkEpisode(key, index.get(key, {}), expected[key]) for key in sorted(expected)]
+        if verify_size:
+            verifySizes(api, results, index)
+
+    incomplete = [result for result in results if result["missing"] or result["zero_byte"] or result["partial"] or result["size_mismatch"]]
+
+    if report_path is not None:
+        report = json.dumps({"library": rootdir, "quality": quality, "episodes": incomplete}, indent=2)
+        if report_path == '-':
+            print(report)
+            return 0
+
+        with open(report_path, 'w', encoding="utf-8") as f:
+            f.write(report)
 
     if invert:
         print("Available episodes:")
+        files = [result for result in results if result not in incomplete]
 
     else:
         print("Missing episodes:")
+        files = incomplete
 
     print()
-    print("Season | Episode | Filepath")
+    print("Season | Episode | Filepath | Problems")
     for f in files:
-        print(f"0{f[0]}     | {_episodeCheck(f[1])}     | {f[2]}")
+        problems = f["missing"] + [f"{kind}: {os.path.basename(path)}" for kind in ("zero_byte", "partial", "size_mismatch") for path in f[kind]]
+        print(f"{API._checkValueFormat(f['season'], 's')}     | {_episodeCheck(f['episode'])}     | {f['folder']} | {', '.join(problems)}")
 
     print()
+    print(f"{len(results) - len(incomplete)} of {len(results)} episodes are complete.")
+    unknown = sum(len(result["size_unknown"]) for result in results)
+    if unknown:
+        print(f"[W] The size of {unknown} videos could not be checked, because the server did not tell it.")
 
     return 0
 
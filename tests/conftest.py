@@ -0,0 +1,54 @@
+"""
+conftest.py
+
+The fixtures shared by the tests: a local mock CDN (See `benchmarks/mock_cdn.py`), an API object that
+talks to it, and an empty library folder to download into.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from mock_cdn import MockCDN  # noqa: E402
+
+import TUAA  # noqa: E402
+
+VIDEO_SIZE = 256 * 1024
+
+
+@pytest.fixture
+def cdn():
+    with MockCDN(video_size=VIDEO_SIZE, episodes={0: 3, 1: 5}) as cdn:
+        yield cdn
+
+
+def newAPI(cdn: MockCDN, **options) -> TUAA.API:
+    """
+    :returns: An API object that downloads from <cdn>.
+    """
+
+    return TUAA.API(
+        catalog_path = None,
+        cdn = cdn.cdn,
+        endpoint = cdn.endpoint,
+        retry_policy = TUAA.RetryPolicy(retries=1, base_delay=0.01, max_delay=0.05),  # Do not spend the tests sleeping.
+        **options
+    )
+
+
+@pytest.fixture
+def api(cdn):
+    with newAPI(cdn) as api:
+        yield api
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", str(tmp_path))  # Keep the catalog cache out of the real home folder.
+    return tmp_path
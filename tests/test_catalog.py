@@ -0,0 +1,79 @@
+"""
+Tests of `Catalog`, the cached catalog of the site.
+"""
+
+import time
+import asyncio
+
+import httpx
+import pytest
+
+import TUAA
+from mock_cdn import _homepage
+
+HOMEPAGE = _homepage({0: 3, 1: 5})
+
+
+def _catalog(statuses: list, tmp_path) -> tuple[TUAA.Catalog, list]:
+    """
+    :returns: A catalog whose site answers with <statuses> in order, and the list of requests it got.
+    """
+
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        status = statuses.pop(0)
+        return httpx.Response(status, content=HOMEPAGE if status == 200 else b"", headers={"ETag": "\"v1\""})
+
+    catalog = TUAA.Catalog(
+        "https://unusann.us/",
+        cache_path = str(tmp_path / "catalog.json"),
+        ttl = 60,
+        client = httpx.Client(transport=httpx.MockTransport(handler)),
+        retry_policy = TUAA.RetryPolicy(retries=0, base_delay=0, failure_threshold=100)
+    )
+    return catalog, requests
+
+
+def test_catalog_is_cached(tmp_path):
+    catalog, requests = _catalog([200], tmp_path)
+    assert catalog.getEpisode(1, 2)["title"] == "Episode 2 & <Friends>"
+    assert catalog.episodes(0) == [(0, 1), (0, 2), (0, 3)]
+    assert len(requests) == 1
+
+    reloaded, requests = _catalog([], tmp_path)  # From the cache file, without asking the site.
+    assert reloaded.getEpisode(1, 5)["title"] == "Episode 5 & <Friends>"
+    assert requests == []
+
+
+def test_outage_uses_cached_copy_for_ttl(tmp_path, capsys):
+    catalog, requests = _catalog([200, 503], tmp_path)
+    catalog.refresh()
+    catalog._fetched = time.time() - 120  # Stale.
+
+    for _ in range(3):
+        assert catalog.getEpisode(1, 1)["title"] == "Episode 1 & <Friends>"
+
+    assert len(requests) == 2  # The failed re-validation is not repeated on every lookup.
+    assert requests[1].headers["If-None-Match"] == "\"v1\""
+    assert capsys.readouterr().out.count("[W] Unable to re-validate the catalog") == 1
+
+
+def test_outage_uses_cached_copy_async(tmp_path):
+    catalog, _ = _catalog([200], tmp_path)
+    catalog.refresh()
+    catalog._fetched = time.time() - 120
+
+    async def refresh() -> None:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503))) as client:
+            await catalog.refreshAsync(client)
+
+    asyncio.run(refresh())
+    assert catalog.getEpisode(1, 1)["title"] == "Episode 1 & <Friends>"
+
+
+def test_outage_without_cache_raises(tmp_path):
+    catalog, _ = _catalog([503], tmp_path)
+    with pytest.raises(httpx.HTTPStatusError):
+        catalog.refresh()
@@ -0,0 +1,65 @@
+"""
+Tests of the admission of downloads by `DiskBudget`.
+"""
+
+import pytest
+
+import TUAA
+
+MiB = 1024 ** 2
+
+
+@pytest.fixture
+def disk(monkeypatch):
+    """
+    The free space of a fake disk, in bytes. (Set `disk["free"]`)
+    """
+
+    disk = {"free": 100 * MiB}
+    monkeypatch.setattr(TUAA, "_freeSpace", lambda path: disk["free"])
+    return disk
+
+
+def _write(path, size: int) -> None:
+    with open(path, "ab") as f:
+        f.write(bytes(size))
+        f.flush()
+
+
+def test_written_bytes_are_not_counted_twice(disk, tmp_path):
+    budget = TUAA.DiskBudget(path=str(tmp_path))
+    part = tmp_path / "a.part"
+    assert budget.acquire(60 * MiB, [str(part)]) is not None
+
+    _write(part, 40 * MiB)
+    disk["free"] -= 40 * MiB
+    assert budget.written() == pytest.approx(40 * MiB, abs=MiB)
+    assert budget._fits(35 * MiB)  # 60 MiB free, 20 MiB of them still reserved.
+    assert not budget._fits(45 * MiB)
+
+
+def test_space_used_by_other_programs_counts(disk, tmp_path):
+    budget = TUAA.DiskBudget(path=str(tmp_path))
+    assert budget.acquire(50 * MiB, [str(tmp_path / "a.part")]) is not None
+    disk["free"] -= 40 * MiB  # Another program writes to the disk.
+    assert not budget._fits(40 * MiB)
+    assert budget._fits(10 * MiB)
+
+
+def test_resumed_part_is_not_written_by_this_reservation(disk, tmp_path):
+    budget = TUAA.DiskBudget(path=str(tmp_path))
+    part = tmp_path / "a.part"
+    _write(part, 30 * MiB)  # Left over from an earlier run; not part of the reservation.
+    assert budget.acquire(20 * MiB, [str(part)]) is not None
+    assert budget.written() == 0
+
+
+def test_release_and_limits(disk, tmp_path):
+    budget = TUAA.DiskBudget(limit=50 * MiB, path=str(tmp_path), interval=0.01)
+    assert budget.acquire(200 * MiB) is None  # Would never fit, even with nothing else running.
+    first = budget.acquire(30 * MiB)
+    assert first is not None
+    assert not budget._fits(30 * MiB)  # Over the limit.
+    budget.release(first)
+    assert budget.reserved == 0
+    assert budget._fits(50 * MiB)
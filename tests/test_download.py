@@ -0,0 +1,80 @@
+"""
+Tests of `API.getVideoData()`: resuming interrupted downloads, segments, and checksums.
+"""
+
+import os
+import json
+import hashlib
+
+import TUAA
+from conftest import VIDEO_SIZE
+
+
+def _checksumOK(path: str) -> bool:
+    _, digest = TUAA._BaseAPI._readChecksum(path)
+    return TUAA._hashFile(path).hexdigest() == digest
+
+
+def test_download(api, cdn, library):
+    assert api.getVideoData(1, 1, "video.mp4", 720) == 0
+    with open("video.mp4", "rb") as f:
+        assert f.read() == cdn.video
+
+    assert _checksumOK("video.mp4")
+    assert not os.path.exists("video.mp4.part") and not os.path.exists("video.mp4.part.json")
+
+
+def test_resume_interrupted_download(api, cdn, library):
+    cdn.short_read_rate = 1  # The connection is closed halfway through.
+    assert api.getVideoData(1, 1, "video.mp4", 720) == 1
+    assert os.path.getsize("video.mp4.part") == VIDEO_SIZE // 2
+    with open("video.mp4.part.json", "r", encoding="utf-8") as f:
+        assert json.load(f)["total"] == VIDEO_SIZE
+
+    cdn.short_read_rate = 0
+    cdn.reset()
+    assert api.getVideoData(1, 1, "video.mp4", 720) == 0
+    assert cdn.bytes_sent == VIDEO_SIZE - VIDEO_SIZE // 2  # Only the missing half is downloaded again.
+    with open("video.mp4", "rb") as f:
+        assert hashlib.sha256(f.read()).digest() == hashlib.sha256(cdn.video).digest()
+
+    assert _checksumOK("video.mp4")  # The resumed part is hashed too.
+
+
+def test_resume_completed_part(api, cdn, library):
+    cdn.short_read_rate = 1
+    api.getVideoData(1, 1, "video.mp4", 720)
+    with open("video.mp4.part", "wb") as f:  # Everything arrived, but the file was not moved in place.
+        f.write(cdn.video)
+
+    cdn.short_read_rate = 0
+    cdn.reset()
+    assert api.getVideoData(1, 1, "video.mp4", 720) == 0
+    assert cdn.bytes_sent == 0  # Answered with `416`.
+    assert _checksumOK("video.mp4")
+
+
+def test_changed_file_is_downloaded_again(api, cdn, library):
+    cdn.short_read_rate = 1
+    api.getVideoData(1, 1, "video.mp4", 720)
+    with open("video.mp4.part.json", "r+", encoding="utf-8") as f:
+        state = json.load(f)
+        state["etag"] = "\"changed\""  # The validator no longer matches, so the server sends the whole file.
+        f.seek(0)
+        f.truncate()
+        json.dump(state, f)
+
+    cdn.short_read_rate = 0
+    assert api.getVideoData(1, 1, "video.mp4", 720) == 0
+    with open("video.mp4", "rb") as f:
+        assert f.read() == cdn.video
+
+
+def test_segmented_download(api, cdn, library):
+    assert api.getVideoData(1, 1, "video.mp4", 720, segments=4, min_segment_size=16 * 1024) == 0
+
+    assert cdn.counts["video"] >= 4
+    with open("video.mp4", "rb") as f:
+        assert f.read() == cdn.video
+
+    assert _checksumOK("video.mp4")
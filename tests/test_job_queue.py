@@ -0,0 +1,80 @@
+"""
+Tests of `JobQueue` and `Scheduler.drain()`.
+"""
+
+import os
+import sqlite3
+
+import TUAA
+
+
+def _states(queue: TUAA.JobQueue) -> dict[tuple[int, int], str]:
+    return {(job["season"], job["episode"]): job["state"] for job in queue.jobs()}
+
+
+def test_add_is_idempotent(library):
+    with TUAA.JobQueue() as queue:
+        assert queue.add(1, 1)
+        assert not queue.add(1, 1)  # Already waiting.
+        assert queue.add(1, 1, 720)  # Another quality is another job.
+        assert len(queue.jobs()) == 2
+
+
+def test_drain(api, library):
+    with TUAA.JobQueue() as queue:
+        for e in (1, 2, 6):  # S1E6 is not in the catalog.
+            queue.add(1, e, 720, ["video"])
+
+        results = TUAA.Scheduler(api, 2).drain(queue)
+        assert results == {(1, 1): 0, (1, 2): 0, (1, 6): 1}
+        assert _states(queue) == {(1, 1): "done", (1, 2): "done", (1, 6): "failed"}
+
+        assert queue.resume() == 1  # The failed job is queued again.
+        assert queue.add(1, 1, 720, ["video"])  # So is a finished one that is added again.
+        assert _states(queue)[(1, 6)] == "queued"
+
+
+def test_recover_jobs_of_dead_worker(api, library, monkeypatch):
+    with TUAA.JobQueue() as queue:
+        queue.add(1, 1, 720, ["video"])
+        queue.add(1, 2, 720, ["video"])
+        assert queue.claim("dead-worker")["episode"] == 1  # The worker is killed while the job runs.
+
+    with TUAA.JobQueue() as queue:  # A new worker opens the journal again.
+        assert queue.recover() == 0  # The heartbeat is still fresh.
+        monkeypatch.setattr(TUAA.JobQueue, "STALE_AFTER", -1)
+        assert queue.recover() == 1
+        assert TUAA.Scheduler(api, 1).drain(queue) == {(1, 1): 0, (1, 2): 0}
+        assert [job["attempts"] for job in queue.jobs()] == [2, 1]
+
+
+def test_quality_list_and_limits(api, library):
+    with TUAA.JobQueue() as queue:
+        queue.add(1, 1, [720, 1080], ["video"])
+        queue.add(1, 2, "best", ["video"], max_quality=720)
+        assert TUAA.Scheduler(api, 2).drain(queue) == {(1, 1): 0, (1, 2): 0}
+
+    assert sorted(name for name in os.listdir(os.path.join("Season 01", "Unus Annus S1E1")) if name.endswith(".mp4")) == [
+        "Unus Annus S1E1 - 1080p.mp4",
+        "Unus Annus S1E1 - 720p.mp4"
+    ]
+    assert os.path.isfile(os.path.join("Season 01", "Unus Annus S1E2", "Unus Annus S1E2.mp4"))
+
+
+def test_old_journal(library):
+    db = sqlite3.connect(TUAA.QUEUE_PATH)
+    db.execute(
+        """CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, season INTEGER NOT NULL, episode INTEGER NOT NULL,
+            quality INTEGER NOT NULL, assets TEXT NOT NULL, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0,
+            exit_code INTEGER, worker TEXT, added REAL NOT NULL, updated REAL NOT NULL, UNIQUE (season, episode, quality)
+        )"""
+    )
+    db.execute("INSERT INTO jobs (season, episode, quality, assets, state, added, updated) VALUES (1, 1, 1080, 'video', 'queued', 0, 0)")
+    db.commit()
+    db.close()
+
+    with TUAA.JobQueue() as queue:
+        assert queue.add(1, 2, [2160, 720], max_size=1024)
+        jobs = queue.jobs()
+        assert [(job["quality"], job["max_size"]) for job in jobs] == [(1080, None), ("2160,720", 1024)]
@@ -0,0 +1,47 @@
+"""
+Tests of the size check of `missing_episodes_checker.py`.
+"""
+
+import os
+
+import pytest
+
+import TUAA
+import missing_episodes_checker as checker
+
+VIDEO = os.path.join("Season 01", "Unus Annus S1E1", "Unus Annus S1E1.mp4")
+
+
+@pytest.fixture
+def checked(api, library, monkeypatch):
+    """
+    Download S1E1 and check the sizes of the library against the mock CDN.
+    """
+
+    monkeypatch.setattr(checker, "rootdir", str(library))
+    assert TUAA.Main(1, 1, 1080, api=api, verbose=False, assets=["video"]).main() == 0
+
+    def check() -> dict:
+        index = checker.scanLibrary()
+        result = checker.checkEpisode((1, 1), index.get((1, 1), {}), [])
+        checker.verifySizes(api, [result], index)
+        return result
+
+    return check
+
+
+def test_size_matches(checked):
+    result = checked()
+    assert result["size_mismatch"] == [] and result["size_unknown"] == []
+
+
+def test_size_mismatch(checked):
+    os.truncate(VIDEO, 1000)
+    assert [os.path.basename(path) for path in checked()["size_mismatch"]] == ["Unus Annus S1E1.mp4"]
+
+
+def test_unknown_size_is_not_a_mismatch(checked, monkeypatch):
+    monkeypatch.setattr(checker, "quality", 2160)  # Missing on the mock CDN.
+    result = checked()
+    assert result["size_mismatch"] == []
+    assert [os.path.basename(path) for path in result["size_unknown"]] == ["Unus Annus S1E1.mp4"]
@@ -0,0 +1,62 @@
+"""
+Tests of `_NextDataScanner`, which parses the catalog while the homepage is downloaded.
+"""
+
+import json
+
+import pytest
+
+import TUAA
+
+DATA = {
+    "props": {
+        "pageProps": {
+            "seasons": [
+                [{"title": "Episode 1 — Frïends 🎉", "date": 1573516800000, "tracks": [{"srclang": "en"}]}],
+                [{"title": f"Episode {e}", "description": "A \"quoted\" <br> description", "date": 1.5e12} for e in range(1, 4)],
+                []
+            ],
+            "build": 12345,
+            "empty": {}
+        }
+    },
+    "page": "/"
+}
+PAGE = (
+    b"<html><body>" + b"<div></div>" * 100
+    + TUAA._NextDataScanner.START + json.dumps(DATA, ensure_ascii=False, indent=1).encode("utf-8")
+    + b"</script></body></html>"
+)
+
+
+def _scan(page: bytes, size: int) -> TUAA._NextDataScanner:
+    scanner = TUAA._NextDataScanner()
+    for start in range(0, len(page), size):
+        if scanner.feed(page[start:start + size]):
+            break
+
+    return scanner
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1000, len(PAGE)])
+def test_split_buffer(size):
+    # Small chunks split the script tag, the JSON values, and the multi-byte characters between feeds.
+    scanner = _scan(PAGE, size)
+    assert scanner.done
+    assert [[episode.asDict() for episode in season] for season in scanner.seasons] == DATA["props"]["pageProps"]["seasons"]
+    assert scanner.props == {"build": 12345, "empty": {}}
+
+
+def test_stops_after_catalog():
+    scanner = TUAA._NextDataScanner()
+    assert scanner.feed(PAGE[:len(PAGE) - len(b"</body></html>")])
+    assert scanner.feed(b"anything")  # The rest of the page is not parsed.
+
+
+def test_missing_catalog():
+    assert not _scan(b"<html><body>No catalog here.</body></html>", 5).done
+
+
+def test_invalid_catalog():
+    with pytest.raises(ValueError):
+        _scan(TUAA._NextDataScanner.START + b"{\"props\": [1, 2]}", 4)
@@ -0,0 +1,73 @@
+"""
+Tests of the `organize` command: planning and placing the files of another download tree.
+"""
+
+import os
+
+import pytest
+
+import TUAA
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("S01E005 - Title.mp4", (1, 5, "Unus Annus S1E5.mp4")),
+    ("Unus Annus s0e12 - 720p.mp4", (0, 12, "Unus Annus S0E12 - 720p.mp4")),
+    ("S01E005 - Title.mp4.sha256", (1, 5, "Unus Annus S1E5.mp4.sha256")),
+    ("S1E5.en.vtt", (1, 5, "Unus Annus S1E5.en.vtt")),
+    ("S1E5.srt", (1, 5, "Unus Annus S1E5.en.srt")),
+    ("S1E5-thumb-320.JPG", (1, 5, "Unus Annus S1E5-thumb-320.jpg")),
+    ("S1E5.nfo", (1, 5, "Unus Annus S1E5.nfo")),
+    ("S1E5.json", None),
+    ("S1E5.mp4.part", None),
+    ("S1E1234.mp4", None),
+    ("notes.txt", None)
+])
+def test_organized_name(filename, expected):
+    assert TUAA._organizedName(filename) == expected
+
+
+def _touch(path: str, data: bytes = b"data") -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_plan(library):
+    _touch(os.path.join("old", "a", "S01E001 - First.mp4"))
+    _touch(os.path.join("old", "b", "S1E1 copy.mp4"))  # Same destination as the first one.
+    _touch(os.path.join("old", "S1E2.mp4"))
+    _touch(os.path.join("old", "readme.txt"))
+    _touch(os.path.join("lib", "Season 01", "Unus Annus S1E2", "Unus Annus S1E2.mp4"))  # Already in the library.
+
+    plan, skipped = TUAA.planLibrary("old", "lib")
+    assert [dst for _, dst in plan] == [os.path.join("lib", "Season 01", "Unus Annus S1E1", "Unus Annus S1E1.mp4")]
+    assert sorted(src for src, _ in plan + skipped) == [
+        os.path.join("old", "S1E2.mp4"),
+        os.path.join("old", "a", "S01E001 - First.mp4"),
+        os.path.join("old", "b", "S1E1 copy.mp4")
+    ]
+
+    # Files that are already in place are not planned again.
+    assert TUAA.planLibrary("lib", "lib") == ([], [])
+
+
+@pytest.mark.parametrize("keep", [False, True])
+def test_organize(library, keep):
+    video = os.path.join("old", "S01E003 - Third - 720p.mp4")
+    _touch(video, b"video")
+    with open(f"{video}.sha256", "w", encoding="utf-8") as f:
+        f.write(f"ABCDEF  {os.path.basename(video)}\n")
+
+    results = TUAA.organizeLibrary("old", "lib", keep=keep)
+    assert len(results["hardlink" if keep else "rename"]) == 1
+    assert results["failed"] == []
+
+    dst = os.path.join("lib", "Season 01", "Unus Annus S1E3", "Unus Annus S1E3 - 720p.mp4")
+    with open(dst, "rb") as f:
+        assert f.read() == b"video"
+
+    assert TUAA._BaseAPI._readChecksum(dst) == ("sha256", "abcdef")
+    with open(f"{dst}.sha256", "r", encoding="utf-8") as f:
+        assert f.read().endswith("  Unus Annus S1E3 - 720p.mp4\n")  # Names the new file.
+
+    assert os.path.exists(video) == keep
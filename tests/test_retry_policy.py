@@ -0,0 +1,89 @@
+"""
+Tests of `RetryPolicy`: retries with backoff, and the circuit breaker.
+"""
+
+import httpx
+import pytest
+
+import TUAA
+
+URL = "https://stream.unusann.us/01/001/1080.mp4"
+
+
+def _sender(statuses: list):
+    """
+    :returns: A function that answers with <statuses> in order (exceptions are raised), and the list of answers it gave.
+    """
+
+    sent = []
+
+    def send() -> httpx.Response:
+        status = statuses.pop(0)
+        sent.append(status)
+        if isinstance(status, Exception):
+            raise status
+
+        return httpx.Response(status, headers={"Retry-After": '0'} if status == 503 else {})
+
+    return send, sent
+
+
+def test_retries_until_success():
+    policy = TUAA.RetryPolicy(retries=3, base_delay=0)
+    send, sent = _sender([503, httpx.ConnectError("refused"), 500, 200])
+    retries = []
+    assert policy.call(URL, send, lambda *args: retries.append(args)).status_code == 200
+    assert len(sent) == 4
+    assert [attempt for attempt, _, _ in retries] == [1, 2, 3]
+    assert retries[0] == (1, 503, 0)  # `Retry-After` is used for the delay.
+
+
+def test_permanent_errors_are_not_retried():
+    send, sent = _sender([404])
+    assert TUAA.RetryPolicy(base_delay=0).call(URL, send).status_code == 404
+    assert sent == [404]
+
+
+def test_last_error_is_returned_or_raised():
+    policy = TUAA.RetryPolicy(retries=1, base_delay=0, failure_threshold=100)
+    send, _ = _sender([503, 503])
+    assert policy.call(URL, send).status_code == 503
+
+    send, _ = _sender([httpx.ReadTimeout("slow"), httpx.ReadTimeout("slow")])
+    with pytest.raises(httpx.ReadTimeout):
+        policy.call(URL, send)
+
+
+def test_delay():
+    policy = TUAA.RetryPolicy(base_delay=1, max_delay=4, max_retry_after=10)
+    assert all(0 <= policy.delay(attempt) <= min(4, 2 ** attempt) for attempt in range(10))
+    assert policy.delay(0, "3") == 3
+    assert policy.delay(0, "3600") == 10
+    assert policy.delay(0, "Wed, 21 Oct 2015 07:28:00 GMT") == 0  # In the past.
+
+
+def test_circuit_breaker(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(TUAA.time, "monotonic", lambda: clock[0])
+    policy = TUAA.RetryPolicy(retries=0, failure_threshold=3, cooldown=60)
+    for _ in range(3):
+        policy.call(URL, _sender([503])[0])
+
+    assert policy.isOpen("stream.unusann.us")
+    assert not policy.isOpen("unusann.us")  # Per host.
+    with pytest.raises(TUAA.CircuitOpenError):
+        policy.call(URL, _sender([200])[0])
+
+    clock[0] += 61  # Half-open: one request is let through.
+    assert policy.call(URL, _sender([503])[0]).status_code == 503
+    assert policy.isOpen("stream.unusann.us")  # It failed, so the circuit opens again at once.
+
+    clock[0] += 61
+    assert policy.call(URL, _sender([200])[0]).status_code == 200
+    assert not policy.isOpen("stream.unusann.us")
+
+
+def test_rate_limiting_does_not_open_circuit():
+    policy = TUAA.RetryPolicy(retries=0, failure_threshold=1)
+    policy.call(URL, _sender([429])[0])
+    assert not policy.isOpen("stream.unusann.us")
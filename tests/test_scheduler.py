@@ -0,0 +1,37 @@
+"""
+Tests of `Scheduler`, which downloads several episodes at the same time.
+"""
+
+import os
+
+import TUAA
+
+
+def test_scheduler_downloads_range(api, library):
+    results = TUAA.Scheduler(api, 3, quality=720).run([(0, 1), (1, 1), (1, 2), (1, 6)])
+    assert results == {(0, 1): 0, (1, 1): 0, (1, 2): 0, (1, 6): 1}  # S1E6 is not in the catalog.
+    assert sorted(os.listdir(os.path.join("Season 01", "Unus Annus S1E2"))) == [
+        "Unus Annus S1E2-thumb.jpg",
+        "Unus Annus S1E2.en.vtt",
+        "Unus Annus S1E2.mp4",
+        "Unus Annus S1E2.mp4." + TUAA.CHECKSUM_ALGORITHM,
+        "Unus Annus S1E2.nfo"
+    ]
+
+
+def test_scheduler_verbose_option(api, library):
+    for jobs in (1, 2):
+        assert TUAA.Scheduler(api, jobs, verbose=False, assets=["video"]).run([(1, 1), (1, 2)]) == {(1, 1): 0, (1, 2): 0}
+
+
+def test_scheduler_stops_when_sidecar_hits_open_circuit(api, library, monkeypatch):
+    calls = []
+
+    def getThumbnail(s, e):
+        calls.append((s, e))
+        raise TUAA.CircuitOpenError("The CDN is not responding.")
+
+    monkeypatch.setattr(api, "getThumbnail", getThumbnail)
+    results = TUAA.Scheduler(api, 1, assets=["thumbnail"]).run([(1, 1), (1, 2), (1, 3)])
+    assert results == {(1, 1): 1, (1, 2): 1, (1, 3): 1}
+    assert calls == [(1, 1)]  # The other episodes are not tried.
@@ -0,0 +1,77 @@
+"""
+Tests of `SeasonArchive`: streaming episodes into a tar archive, and resuming it after an interruption.
+"""
+
+import os
+import tarfile
+
+import TUAA
+from conftest import VIDEO_SIZE
+
+VIDEO = "Season 01/Unus Annus S1E1/Unus Annus S1E1.mp4"
+
+
+def _download(api, episodes) -> dict:
+    with TUAA.SeasonArchives() as archives:
+        return TUAA.Scheduler(api, 1, archives=archives, quality=720).run(episodes)
+
+
+def _members(path: str = "Season 01.tar") -> dict[str, bytes]:
+    with tarfile.open(path) as tar:
+        return {info.name: tar.extractfile(info).read() for info in tar}
+
+
+def test_episodes_are_streamed_into_archive(api, cdn, library):
+    assert _download(api, [(1, 1), (1, 2)]) == {(1, 1): 0, (1, 2): 0}
+    assert not os.path.exists("Season 01")
+    members = _members()
+    assert members[VIDEO] == cdn.video
+    hasher = TUAA._newHasher()
+    hasher.update(cdn.video)
+    assert members[f"{VIDEO}.{TUAA.CHECKSUM_ALGORITHM}"].decode("utf-8") == f"{hasher.hexdigest()}  Unus Annus S1E1.mp4\n"
+    assert {os.path.basename(name) for name in members if "S1E2" in name} == {
+        "Unus Annus S1E2.mp4",
+        f"Unus Annus S1E2.mp4.{TUAA.CHECKSUM_ALGORITHM}",
+        "Unus Annus S1E2.en.vtt",
+        "Unus Annus S1E2-thumb.jpg",
+        "Unus Annus S1E2.nfo"
+    }
+
+    assert _download(api, [(1, 1), (1, 3)]) == {(1, 1): 0, (1, 3): 0}  # Appended to; S1E1 is already there.
+    members = _members()
+    assert len([name for name in members if name.endswith(".mp4")]) == 3
+    with tarfile.open("Season 01.tar") as tar:
+        assert len([info for info in tar if info.name == VIDEO]) == 1
+
+
+def test_interrupted_video_is_resumed(api, cdn, library):
+    cdn.short_read_rate = 1  # Every attempt is cut short.
+    assert _download(api, [(1, 1)]) == {(1, 1): 1}
+    with TUAA.SeasonArchive("Season 01.tar") as archive:
+        assert archive.incomplete == VIDEO
+        written = archive.pending(VIDEO, api._videoUrl(1, 1, 720))["written"]
+        assert VIDEO_SIZE // 2 <= written < VIDEO_SIZE  # The retry resumed it, but was cut short too.
+
+    cdn.short_read_rate = 0
+    cdn.reset()
+    assert _download(api, [(1, 1)]) == {(1, 1): 0}
+    assert cdn.bytes_sent < VIDEO_SIZE - written + 64 * 1024  # Only the rest of the video, and the small files.
+    assert _members()[VIDEO] == cdn.video
+
+
+def test_lost_index_is_rebuilt(library):
+    with TUAA.SeasonArchive("Season 01.tar") as archive:
+        archive.addBytes("Season 01/a.txt", b"a" * 1000)
+        archive.addBytes("Season 01/b.txt", b"b")
+
+    os.remove("Season 01.tar.index")
+    with open("Season 01.tar", "r+b") as f:  # The end-of-archive blocks were not written, and a header was cut short.
+        f.truncate(os.path.getsize("Season 01.tar") - 2 * tarfile.BLOCKSIZE)
+        f.seek(0, os.SEEK_END)
+        f.write(b"garbage")
+
+    with TUAA.SeasonArchive("Season 01.tar") as archive:
+        assert "Season 01/a.txt" in archive and "Season 01/b.txt" in archive
+        archive.addBytes("Season 01/c.txt", b"c")
+
+    assert _members() == {"Season 01/a.txt": b"a" * 1000, "Season 01/b.txt": b"b", "Season 01/c.txt": b"c"}
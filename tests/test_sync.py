@@ -0,0 +1,48 @@
+"""
+Tests of the sync mode of `Main`. (See `Manifest`)
+"""
+
+import os
+
+import TUAA
+
+VIDEO = os.path.join("Season 01", "Unus Annus S1E1", "Unus Annus S1E1.mp4")
+
+
+def _sync(api) -> int:
+    with TUAA.Manifest() as manifest:
+        return TUAA.Main(1, 1, 720, api=api, verbose=False, assets=["video"], manifest=manifest).main()
+
+
+def _changeOnServer(api) -> None:
+    with TUAA.Manifest() as manifest:
+        manifest.record(VIDEO, api._videoUrl(1, 1, 720), os.path.getsize(VIDEO), "\"old\"")
+
+
+def test_sync_skips_current_video(api, cdn, library):
+    assert _sync(api) == 0
+    cdn.reset()
+    assert _sync(api) == 0
+    assert cdn.counts.get("video", 0) == 1  # Only the HEAD request.
+
+
+def test_sync_replaces_changed_video(api, cdn, library):
+    assert _sync(api) == 0
+    _changeOnServer(api)
+    cdn.reset()
+    assert _sync(api) == 0
+    assert cdn.counts["video"] == 3  # HEAD, GET, and the HEAD that records the new validators.
+    with TUAA.Manifest() as manifest:
+        assert manifest.get(VIDEO)["etag"] == "\"mock\""
+
+
+def test_sync_keeps_changed_video_if_download_fails(api, library, monkeypatch):
+    assert _sync(api) == 0
+    with open(VIDEO, "rb") as f:
+        old = f.read()
+
+    _changeOnServer(api)
+    monkeypatch.setattr(api, "getVideoData", lambda **kwargs: 503)
+    assert _sync(api) == 503
+    with open(VIDEO, "rb") as f:
+        assert f.read() == old
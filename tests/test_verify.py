@@ -0,0 +1,83 @@
+"""
+Tests of `verifyLibrary()` and the `verify` command.
+"""
+
+import os
+import sys
+
+import pytest
+
+import TUAA
+
+from conftest import newAPI
+
+EPISODE = os.path.join("Season 01", "Unus Annus S1E1")
+
+
+def _corrupt(path: str) -> None:
+    with open(path, "r+b") as f:
+        f.seek(100)
+        f.write(b"XXXX")
+
+
+@pytest.fixture
+def verify(cdn, monkeypatch):
+    """
+    Run the `verify` command against the mock CDN.
+    """
+
+    monkeypatch.setattr(TUAA, "_cliAPI", lambda *args: newAPI(cdn))
+
+    def run(*options: str, season: str = None) -> int:
+        args = [] if season is None else [season]
+        monkeypatch.setattr(sys, "argv", ["TUAA.py", "verify", *args, *options])
+        return TUAA._cliVerify(args)
+
+    return run
+
+
+def test_verify_library(api, library):
+    assert TUAA.Main(1, 1, 720, api=api, verbose=False, assets=["video"]).main() == 0
+    assert TUAA.Main(1, 2, 720, api=api, verbose=False, assets=["video"]).main() == 0
+    _corrupt(os.path.join("Season 01", "Unus Annus S1E2", "Unus Annus S1E2.mp4"))
+
+    results = TUAA.verifyLibrary(jobs=1)
+    assert [(s, e) for s, e, _ in results["ok"]] == [(1, 1)]
+    assert [(s, e) for s, e, _ in results["mismatch"]] == [(1, 2)]
+    assert TUAA.verifyLibrary(season=0)["ok"] == []
+
+
+def test_verify_replaces_tagged_video(api, library, verify):
+    # Only one quality of the episode is left, but its filename is still tagged.
+    assert TUAA.Main(1, 1, [720, 1080], api=api, verbose=False, assets=["video"]).main() == 0
+    os.remove(os.path.join(EPISODE, "Unus Annus S1E1 - 1080p.mp4"))
+    os.remove(os.path.join(EPISODE, "Unus Annus S1E1 - 1080p.mp4." + TUAA.CHECKSUM_ALGORITHM))
+    _corrupt(os.path.join(EPISODE, "Unus Annus S1E1 - 720p.mp4"))
+
+    assert verify(season="1") == 0
+    assert sorted(os.listdir(EPISODE)) == ["Unus Annus S1E1 - 720p.mp4", "Unus Annus S1E1 - 720p.mp4." + TUAA.CHECKSUM_ALGORITHM]
+    assert TUAA.verifyLibrary()["mismatch"] == []
+
+
+def test_verify_refuses_to_guess_quality(api, library, verify):
+    assert TUAA.Main(1, 1, 720, api=api, verbose=False, assets=["video"]).main() == 0
+    video = os.path.join(EPISODE, "Unus Annus S1E1.mp4")
+    _corrupt(video)
+
+    assert verify() == 1
+    assert len(TUAA.verifyLibrary()["mismatch"]) == 1  # Left alone.
+
+    with TUAA.Manifest() as manifest:  # `sync` records where the video came from.
+        manifest.record(video, api._videoUrl(1, 1, 720), os.path.getsize(video))
+
+    assert verify() == 0
+    assert TUAA.verifyLibrary()["mismatch"] == []
+
+
+def test_verify_keeps_video_if_download_fails(api, library, verify):
+    assert TUAA.Main(1, 1, 720, api=api, verbose=False, assets=["video"]).main() == 0
+    video = os.path.join(EPISODE, "Unus Annus S1E1.mp4")
+    _corrupt(video)
+
+    assert verify("--quality", "2160") == 1  # Missing on the mock CDN.
+    assert os.path.isfile(video)